@@ -1,13 +1,19 @@
 from google.adk.agents import ParallelAgent, LlmAgent, SequentialAgent
 from google.adk.tools import FunctionTool
+import asyncio
 import jinja2
+import json
 import os
 import pathlib
 import subprocess
+from trading_bot.core.validation import validate_strategies
 
 # --- Secure File I/O ---
+# Created on the first write, not at import
 SANDBOX_DIR = pathlib.Path("./generated_strategies").resolve()
-SANDBOX_DIR.mkdir(exist_ok=True)
+
+# Seconds a generated strategy gets to import and finish its smoke backtest
+VALIDATION_TIMEOUT = 5.0
 
 def secure_filepath(filename: str) -> pathlib.Path:
     """Resolves a filename into a secure path within the sandbox directory."""
@@ -27,6 +33,7 @@ def write_code_to_file(filename: str, code: str) -> str:
     """Writes the generated code to a specified file within a secure sandbox."""
     try:
         filepath = secure_filepath(filename)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
         with open(filepath, 'w') as f:
             f.write(code)
         return f"Successfully wrote code to {filepath}"
@@ -52,6 +59,27 @@ def lint_python_file(filename: str) -> str:
     except ValueError as e:
         return str(e)
 
+async def validate_strategy_file(filename: str, config_filename: str = "") -> str:
+    """
+    Validates a generated strategy: static checks against the BaseStrategy contract, a
+    sandboxed import, and a smoke backtest on a tiny dataset (using the indicators from
+    the config file, when it exists). Runs in a child process that is killed after a few
+    seconds, so generated code that hangs cannot stall the agent.
+    Returns "OK" or a JSON report listing the failing stage and its errors.
+    """
+    try:
+        filepath = secure_filepath(filename)
+        config_path = secure_filepath(config_filename) if config_filename else None
+    except ValueError as e:
+        return str(e)
+    if not filepath.exists():
+        return f"Error: File not found at {filepath}"
+    candidate = (str(filepath), str(config_path) if config_path else None)
+    report, = await asyncio.to_thread(validate_strategies, [candidate], 1, VALIDATION_TIMEOUT)
+    if report['ok'] and not report['warnings']:
+        return "OK"
+    return json.dumps(report)
+
 # --- Agent Definitions ---
 
 # 1. StrategyCoder Agent
@@ -61,11 +89,15 @@ strategy_coder = LlmAgent(
     1.  Read the structured strategy definition from `session.get('strategy_json')`.
     2.  Read the Jinja2 template from `templates/strategy_template.txt` using the `read_template` tool.
     3.  Your task is to populate the template with the logic from the strategy definition.
-        - The `strategy_name` should be a valid Python class name (e.g., `GoldenCrossBtc`).
-        - The `indicator_calculations` should be the Python code to calculate the required indicators (e.g., `df['SMA_50'] = df['close'].rolling(window=50).mean()`).
-        - The `entry_logic` and `exit_logic` should be valid Python boolean expressions based on the calculated indicators.
+        - The `strategy_name` should be a valid Python class name matching the file name capitalized (e.g., `Goldencrossbtc` for `goldencrossbtc.py`).
+        - The `indicator_spec` is a dict literal declaring every indicator once as name -> (type, period), with type one of 'sma', 'ema', 'rsi'
+          and periods read from the config's indicators (e.g., `{'fast': ('sma', indicators['fast_period']), 'slow': ('sma', indicators['slow_period'])}`).
+        - The `entry_logic` and `exit_logic` (and optionally `short_entry_logic` / `short_exit_logic`) are boolean expressions over
+          `ind['<name>']`, `ind['close']` and `self.params[...]`, e.g. `(ind['fast'] > ind['slow']) & (ind['close'] > self.params['min_price'])`.
+          They are evaluated on floats live and on NumPy arrays in backtests, so wrap each comparison in parentheses and combine them
+          with `&` and `|` only; never use `and`, `or`, `not` or `if`.
     4.  Generate the complete, final Python code as a string.
-    5.  Save the code to a file named after the strategy (e.g., `golden_cross_btc.py`) using the `write_code_to_file` tool.
+    5.  Save the code to a file named after the strategy (e.g., `goldencrossbtc.py` for the class `Goldencrossbtc`) using the `write_code_to_file` tool.
     6.  **Crucially, you must save the final filepath to the session state by setting `session.set('strategy_filepath', ...)`**.""",
     tools=[
         FunctionTool(read_template),
@@ -78,9 +110,11 @@ linting_agent = LlmAgent(
     name="LintingAgent",
     instruction="""You are a code quality analyst.
     1.  Read the filepath of the generated strategy code from `session.get('strategy_filepath')`.
-    2.  Run the linter on this file using the `lint_python_file` tool.
-    3.  If the result is not 'OK', you must analyze the errors and suggest fixes to the `StrategyCoder` in the next step. For now, just report the findings.""",
-    tools=[FunctionTool(lint_python_file)]
+    2.  Validate the strategy with the `validate_strategy_file` tool (pass the config file name too if
+        `session.get('config_filepath')` is set). It checks the strategy contract, imports it and runs a smoke backtest.
+    3.  Run the linter on this file using the `lint_python_file` tool.
+    4.  If either result is not 'OK', you must analyze the errors and suggest fixes to the `StrategyCoder` in the next step. For now, just report the findings.""",
+    tools=[FunctionTool(validate_strategy_file), FunctionTool(lint_python_file)]
 )
 
 # Sequential agent for the code-then-lint process
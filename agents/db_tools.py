@@ -1,9 +1,8 @@
 from google.adk.tools import FunctionTool
-from trading_bot.core.database import Database
-from decouple import config
+from trading_bot.core.database import shared_database
 
-# Create a single, shared instance of the Database
-db = Database(config('DB_URL'))
+# The single, shared instance of the Database (Postgres, or SQLite for sqlite:// URLs)
+db = shared_database()
 
 async def save_strategy_to_db(source_url: str, raw_text: str, structured_json: dict) -> str:
     """Saves a strategy to the database."""
@@ -2,10 +2,22 @@ from google.adk.agents import LlmAgent
 from google.adk.tools import FunctionTool
 import docker
 import logging
+from decouple import config
+from trading_bot.core.bus import connect_bus
+from trading_bot.core.strategy_host import host_request
 from .db_tools import db
 
 logger = logging.getLogger(__name__)
 
+# One bus connection for every host deployment, opened on first use
+_bus = None
+
+async def _host_bus():
+    global _bus
+    if _bus is None or _bus.is_closed:
+        _bus = await connect_bus(config('NATS_URL'))
+    return _bus
+
 # --- Tool Definition ---
 
 async def deploy_strategy_container(strategy_id: str, dockerfile_path: str, build_context: str) -> str:
@@ -32,6 +44,25 @@ async def deploy_strategy_container(strategy_id: str, dockerfile_path: str, buil
         logger.error(f"Failed to deploy strategy {strategy_id}: {e}")
         return f"Error: {e}"
 
+async def deploy_strategy_to_host(strategy_id: str, strategy_filepath: str, config_filepath: str, host_id: str) -> str:
+    """
+    Starts the strategy in a free slot of a running StrategyHost instead of a new container.
+    The host shares one market-data feed and bus connection among all of its strategies and
+    records the slot in the database. Returns 'host_id/slot'.
+    """
+    try:
+        reply = await host_request(await _host_bus(), host_id, {
+            'op': 'add', 'strategy_id': strategy_id,
+            'strategy_filepath': strategy_filepath, 'config_filepath': config_filepath
+        })
+        if not reply.get('ok'):
+            return f"Error: {reply.get('error')}"
+        logger.info(f"Strategy {strategy_id} started on host {host_id} in slot {reply['slot']}.")
+        return f"{host_id}/{reply['slot']}"
+    except Exception as e:
+        logger.error(f"Failed to deploy strategy {strategy_id} to host {host_id}: {e}")
+        return f"Error: {e}"
+
 # --- Agent Definition ---
 
 deployment_manager = LlmAgent(
@@ -40,7 +71,10 @@ deployment_manager = LlmAgent(
     1.  Read the strategy ID from `session.get('strategy_id')`.
     2.  Read the Dockerfile path from `session.get('dockerfile_path')`.
     3.  Read the build context path from `session.get('build_context')`.
-    4.  Deploy the strategy as a live trading container using the `deploy_strategy_container` tool.
-    5.  **Save the container ID to the session state as `session.set('container_id', ...)`**.""",
-    tools=[FunctionTool(deploy_strategy_container)]
+    4.  If `session.get('host_id')` is set, deploy the strategy into that strategy host with the
+        `deploy_strategy_to_host` tool, passing `session.get('strategy_filepath')` and
+        `session.get('config_filepath')`, and **save the result as `session.set('host_slot', ...)`**.
+    5.  Otherwise deploy the strategy as a live trading container using the `deploy_strategy_container` tool
+        and **save the container ID to the session state as `session.set('container_id', ...)`**.""",
+    tools=[FunctionTool(deploy_strategy_container), FunctionTool(deploy_strategy_to_host)]
 )
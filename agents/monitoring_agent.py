@@ -2,13 +2,20 @@ from google.adk.agents import BaseAgent
 from google.adk.tools import FunctionTool
 from pydantic import PrivateAttr
 from typing import Any, Dict
-import nats
 import docker
 import logging
 import asyncio
-import json
+import math
+import struct
+import time
+import numpy as np
 from decouple import config
-from pyparsing import Dict
+from trading_bot.core.bus import connect_bus
+from trading_bot.core.latency import LatencyHistogram
+from trading_bot.core.metrics import REGISTRY
+from trading_bot.core.strategy_host import host_request
+from trading_bot.core.telemetry import ERROR, decode_batch, decode_json, is_binary
+from trading_bot.core.timeseries import FIELDS as STORE_FIELDS, TelemetryStore
 from .db_tools import db
 
 logger = logging.getLogger(__name__)
@@ -36,6 +43,221 @@ async def send_alert(message: str) -> str:
     logger.warning(f"ALERT: {message}")
     return "Alert sent."
 
+# --- Telemetry Ingestion ---
+
+class TelemetryIngestor:
+    """
+    Batched telemetry pipeline behind the MonitoringAgent's subscription.
+
+    The bus callback only enqueues the raw message (dropping and counting when the bounded
+    queue is full), so the subscription never backs up. An ingest task drains the queue in
+    micro-batches, decodes them (binary telemetry batches, or legacy JSON), records them in a
+    TelemetryStore and keeps the latest sample per strategy; rules run at most
+    once per `debounce` seconds per strategy over that latest state. Remediation (stopping a
+    container) goes to separate workers, so a slow Docker call never stalls ingestion.
+    """
+    def __init__(self, targets: dict, alert=send_alert, stop=stop_strategy_container, max_queue=100000,
+                 batch_size=1000, debounce=1.0, alert_cooldown=60.0, drawdown_limit=0.2, remediation_workers=4,
+                 trend_window=300, drawdown_slope_limit=0.05 / 60, error_limit=5, store=None):
+        self.targets = targets                  # strategy_id -> what `stop` takes (e.g. a container ID)
+        self.alert = alert
+        self.stop = stop
+        self.batch_size = batch_size
+        self.debounce = debounce
+        self.alert_cooldown = alert_cooldown
+        self.drawdown_limit = drawdown_limit
+        self.remediation_workers = remediation_workers
+        self.trend_window = trend_window
+        self.drawdown_slope_limit = drawdown_slope_limit    # drawdown growth per second
+        self.error_limit = error_limit                      # errors within trend_window
+        self.store = store if store is not None else TelemetryStore()
+        self.latest = {}                        # strategy_id -> latest telemetry sample
+        self.stats = {'received': 0, 'dropped': 0, 'processed': 0, 'samples': 0, 'batches': 0, 'decode_errors': 0,
+                      'unknown': 0, 'alerts': 0, 'remediations': 0, 'failures': 0}
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._remediation = asyncio.Queue()
+        self._errors = {}                       # strategy_id -> latest ERROR sample not yet evaluated
+        self._dirty = set()
+        self._last_eval = {}
+        self._last_alert = {}
+        self._stopping = set()
+        self._unknown = set()
+        self._tasks = []
+        self.batch_latency = LatencyHistogram('telemetry_batch')
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def register_metrics(self, registry=REGISTRY):
+        """Exposes the pipeline counters, queue depths and batch latency; all read at scrape time."""
+        events = registry.counter('trading_bot_monitoring_events_total',
+                                  'Telemetry pipeline events (received, dropped, samples, alerts, ...)', labels=('event',))
+        for event in self.stats:
+            events.labels(event=event).set_function(lambda event=event: self.stats[event])
+        queues = registry.gauge('trading_bot_monitoring_queue_depth', 'Monitoring queue depth', labels=('queue',))
+        queues.labels(queue='telemetry').set_function(lambda: self.queue_depth)
+        queues.labels(queue='remediation').set_function(lambda: self._remediation.qsize())
+        registry.gauge('trading_bot_monitoring_strategies', 'Strategies with telemetry history').labels() \
+            .set_function(lambda: len(self.store.strategies()))
+        registry.histogram('trading_bot_monitoring_batch_seconds', 'Time to decode and store one telemetry micro-batch') \
+            .attach(self.batch_latency)
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._ingest())]
+        self._tasks += [asyncio.create_task(self._remediate()) for _ in range(self.remediation_workers)]
+        return self._tasks
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def on_message(self, msg):
+        """Bus callback: O(1), no decoding, no logging."""
+        self.stats['received'] += 1
+        try:
+            self._queue.put_nowait((msg.subject, msg.data))
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+
+    async def _ingest(self):
+        while True:
+            try:
+                batch = [await asyncio.wait_for(self._queue.get(), timeout=self.debounce)]
+            except asyncio.TimeoutError:
+                batch = []
+            while batch and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            try:
+                if batch:
+                    with self.batch_latency.time():
+                        self._apply(batch)
+                await self._evaluate_due()
+            except Exception as e:
+                # Risk monitoring must outlive any bug in one batch
+                self.stats['failures'] += 1
+                logger.error(f"Telemetry ingestion failed on a batch: {e}", exc_info=True)
+
+    def _apply(self, batch):
+        self.stats['batches'] += 1
+        samples = 0
+        for subject, payload in batch:
+            strategy_id = subject.rsplit('.', 1)[-1]
+            try:
+                if is_binary(payload):
+                    samples += self._apply_binary(strategy_id, decode_batch(payload))
+                else:
+                    samples += self._apply_json(strategy_id, decode_json(payload))
+            except (ValueError, struct.error):
+                self.stats['decode_errors'] += 1
+                continue
+            except Exception as e:
+                self.stats['failures'] += 1
+                logger.error(f"Could not apply telemetry from {subject}: {e}", exc_info=True)
+                continue
+            self._dirty.add(strategy_id)
+        self.stats['processed'] += len(batch)
+        self.stats['samples'] += samples
+        logger.debug(f"Ingested {len(batch)} telemetry messages ({samples} samples) for {len(self._dirty)} strategies.")
+
+    def _apply_binary(self, strategy_id, telemetry):
+        records = telemetry.records
+        if not len(records):
+            return 0
+        errors = records['status'] == ERROR
+        # Rules read the newest healthy sample; errors are kept separately so none is missed
+        healthy = np.flatnonzero(~errors)
+        self.latest[strategy_id] = telemetry.sample(int(healthy[-1]) if len(healthy) else -1)
+        if errors.any():
+            self._errors[strategy_id] = telemetry.sample(int(np.flatnonzero(errors)[-1]))
+        if strategy_id in self.targets:
+            # History only for strategies we monitor, so stray subjects cannot grow the store
+            self.store.record_many(strategy_id, records['time'],
+                                   np.column_stack([records[field] for field in STORE_FIELDS]), errors)
+        return len(records)
+
+    def _apply_json(self, strategy_id, samples):
+        known = strategy_id in self.targets
+        for data in samples:
+            if data.get('status') == 'ERROR':
+                self._errors[strategy_id] = data
+            else:
+                self.latest[strategy_id] = data
+            if known:
+                self.store.record(strategy_id, data, ts=data['time'])
+        if samples and strategy_id not in self.latest:
+            self.latest[strategy_id] = samples[-1]
+        return len(samples)
+
+    async def _evaluate_due(self):
+        now = time.monotonic()
+        for strategy_id in list(self._dirty):
+            if now - self._last_eval.get(strategy_id, -math.inf) < self.debounce:
+                continue
+            self._dirty.discard(strategy_id)
+            self._last_eval[strategy_id] = now
+            try:
+                await self._evaluate(strategy_id, now)
+            except Exception as e:
+                # One strategy's bad state must not stop the rules for the others
+                self.stats['failures'] += 1
+                logger.error(f"Rules for strategy {strategy_id} failed: {e}", exc_info=True)
+
+    async def _evaluate(self, strategy_id, now):
+        target = self.targets.get(strategy_id)
+        if not target:
+            self.stats['unknown'] += 1
+            if strategy_id not in self._unknown:
+                self._unknown.add(strategy_id)
+                logger.warning(f"Received telemetry for unknown strategy {strategy_id}")
+            return
+        data = self.latest[strategy_id]
+        error = self._errors.pop(strategy_id, None)
+        if error is not None:
+            await self._alert(strategy_id, 'error', now,
+                              f"Strategy {strategy_id} reported an error: {error.get('message')}")
+        if strategy_id in self._stopping:
+            return
+        if data.get("drawdown", 0) > self.drawdown_limit:
+            self._stopping.add(strategy_id)
+            await self._alert(strategy_id, 'drawdown', now, f"Strategy {strategy_id} has breached its drawdown limit.")
+            self._remediation.put_nowait((strategy_id, target))
+            return
+        # Trend rules over the stored history: warn before the hard limit is reached
+        slope = self.store.slope(strategy_id, 'drawdown', self.trend_window)
+        if slope > self.drawdown_slope_limit:
+            await self._alert(strategy_id, 'drawdown_trend', now,
+                              f"Strategy {strategy_id} drawdown rising {slope * 60:.2%} per minute "
+                              f"over the last {self.trend_window}s.")
+        errors = self.store.error_count(strategy_id, self.trend_window)
+        if errors >= self.error_limit:
+            await self._alert(strategy_id, 'error_rate', now,
+                              f"Strategy {strategy_id} reported {errors} errors in the last {self.trend_window}s.")
+
+    async def _alert(self, strategy_id, kind, now, message):
+        # One alert of each kind per strategy per cooldown, however many samples repeat it
+        key = (strategy_id, kind)
+        if now - self._last_alert.get(key, -math.inf) < self.alert_cooldown:
+            return
+        self._last_alert[key] = now
+        self.stats['alerts'] += 1
+        await self.alert(message)
+
+    async def _remediate(self):
+        while True:
+            strategy_id, target = await self._remediation.get()
+            try:
+                await self.stop(target)
+                self.stats['remediations'] += 1
+            except Exception as e:
+                logger.error(f"Remediation for strategy {strategy_id} failed: {e}")
+                # Let a later breach retry the stop
+                self._stopping.discard(strategy_id)
+
 # --- Agent Definition ---
 
 class MonitoringAgent(BaseAgent):
@@ -45,7 +267,8 @@ class MonitoringAgent(BaseAgent):
     # 2. DECLARE FIELDS HERE using PrivateAttr
     # This tells Pydantic: "Let me store this data, but don't validate it or save it to JSON."
     _nc: Any = PrivateAttr(default=None)
-    _strategy_to_container: Dict = PrivateAttr(default_factory=dict)
+    _deployments: Dict = PrivateAttr(default_factory=dict)
+    _ingestor: Any = PrivateAttr(default=None)
 
     def __init__(self):
         super().__init__(name="MonitoringAgent")
@@ -55,45 +278,49 @@ class MonitoringAgent(BaseAgent):
         logger.info("Starting MonitoringAgent...")
         await self.load_live_strategies()
         await self.connect_to_nats()
+        tasks = await self.start_ingestion()
+        # Runs until cancelled; the ingestion tasks never return on their own
+        await asyncio.gather(*tasks)
 
-        # Update variable access to use the underscore version
+    async def start_ingestion(self, bus=None, **options):
+        """
+        Subscribes to strategy telemetry on the bus (NATS by default) and starts the pipeline.
+        `options` go to the TelemetryIngestor (e.g. debounce, alert, stop).
+        """
+        if bus is not None:
+            self._nc = bus
+        options.setdefault('stop', self.stop_deployment)
+        self._ingestor = TelemetryIngestor(self._deployments, **options)
+        self._ingestor.register_metrics()
+        tasks = self._ingestor.start()
         await self._nc.subscribe("telemetry.live.*", cb=self.on_telemetry_message)
-
-        while True:
-            await asyncio.sleep(1)
+        return tasks
 
     async def load_live_strategies(self):
         # Update variable access
-        self._strategy_to_container = await db.get_live_strategies()
-        logger.info(f"Loaded {len(self._strategy_to_container)} live strategies.")
+        self._deployments = await db.get_live_deployments()
+        logger.info(f"Loaded {len(self._deployments)} live strategies.")
 
     async def connect_to_nats(self):
         try:
             # Update variable access
-            self._nc = await nats.connect(config('NATS_URL'))
+            self._nc = await connect_bus(config('NATS_URL'))
             logger.info("MonitoringAgent connected to NATS.")
         except Exception as e:
             logger.error(f"MonitoringAgent failed to connect to NATS: {e}")
             raise
 
-    async def on_telemetry_message(self, msg):
-        subject = msg.subject
-        strategy_id = subject.split('.')[-1]
-        data = json.loads(msg.data.decode())
-
-        logger.info(f"Received telemetry for strategy {strategy_id}: {data}")
-
-        # Update variable access
-        container_id = self._strategy_to_container.get(strategy_id)
-        if not container_id:
-            logger.warning(f"Received telemetry for unknown strategy {strategy_id}")
-            return
+    async def stop_deployment(self, deployment: dict) -> str:
+        """Stops a live strategy wherever it runs: its own container or a StrategyHost slot."""
+        if deployment.get('container_id'):
+            return await stop_strategy_container(deployment['container_id'])
+        reply = await host_request(self._nc, deployment['host_id'],
+                                   {'op': 'remove', 'strategy_id': deployment['strategy_id']})
+        if not reply.get('ok'):
+            raise RuntimeError(reply.get('error') or f"Strategy not found on host {deployment['host_id']}")
+        return f"Stopped strategy {deployment['strategy_id']} on host {deployment['host_id']}."
 
-        if data.get("status") == "ERROR":
-            await send_alert(f"Strategy {strategy_id} reported an error: {data.get('message')}")
-
-        if data.get("drawdown", 0) > 0.2:
-            await send_alert(f"Strategy {strategy_id} has breached its drawdown limit.")
-            await stop_strategy_container(container_id)
+    async def on_telemetry_message(self, msg):
+        await self._ingestor.on_message(msg)
 
-monitoring_agent = MonitoringAgent()
\ No newline at end of file
+monitoring_agent = MonitoringAgent()
@@ -1,7 +1,9 @@
 from google.adk.agents import LoopAgent, LlmAgent
 from google.adk.tools import FunctionTool
+import asyncio
 import subprocess
 import json
+from trading_bot.core.optimizer import SuccessiveHalving
 from .db_tools import save_backtest_results_tool
 from .code_engineer import write_code_to_file
 
@@ -29,6 +31,21 @@ def run_backtest_script(strategy_filepath: str, config_filepath: str, csv_datapa
     except (json.JSONDecodeError, IndexError) as e:
         return f"Failed to parse backtest results from stdout: {e}. Full output: {result.stdout}"
 
+async def optimize_strategy_parameters(strategy_filepath: str, config_filepath: str, csv_datapath: str,
+                                      search_space: dict, n_configs: int = 1000) -> str:
+    """
+    Searches the strategy's parameter space with successive halving, backtesting the
+    candidates in parallel on all CPU cores.
+    search_space maps config keys (dotted for nested ones, e.g. 'indicators.short_window')
+    to [low, high] numeric ranges or to lists of choices.
+    Returns a JSON summary: the best configuration and the Pareto front of
+    (Sharpe ratio, max drawdown) among the configurations tested on the full dataset.
+    """
+    search = SuccessiveHalving(strategy_filepath, config_filepath, csv_datapath, search_space, n_configs=n_configs)
+    # The sweep is CPU-bound; keep the agent's event loop responsive while it runs
+    summary = await asyncio.get_running_loop().run_in_executor(None, search.run)
+    return json.dumps(summary)
+
 # --- Agent Definitions ---
 
 # 1. BacktestRunner Agent
@@ -51,10 +68,13 @@ result_analyzer = LlmAgent(
     2.  The results contain metrics like 'sharpe_ratio', 'max_drawdown', and 'final_equity'.
     3.  Your success criterion is a `sharpe_ratio` greater than 1.5.
     4.  If the criterion is met, you must set `session.set('optimization_complete', True)` to exit the loop.
-    5.  If the criterion is NOT met, you must propose a single, specific parameter change to improve performance.
-    6.  **You must save your suggestion as a JSON object to `session.set('new_params', ...)`**. For example: `{'stop_loss_pct': 3.0}`.
+    5.  If the criterion is NOT met, search for better parameters with the `optimize_strategy_parameters` tool.
+        Build `search_space` from the parameters in the config file, with a plausible [low, high] range for each
+        (dotted keys for nested values, e.g. `indicators.short_window`). Pick one configuration from the returned
+        Pareto front, trading off Sharpe ratio against drawdown.
+    6.  **You must save the chosen parameters as a JSON object to `session.set('new_params', ...)`**. For example: `{'stop_loss_pct': 0.03}`.
     7.  Finally, you must always save the results to the database using the `save_backtest_results_tool`.""",
-    tools=[save_backtest_results_tool]
+    tools=[save_backtest_results_tool, FunctionTool(optimize_strategy_parameters)]
 )
 
 # 3. ParameterUpdater Agent
@@ -1,21 +1,23 @@
 from google.adk.agents import LlmAgent
 from google.adk.tools import FunctionTool
-import requests
-from bs4 import BeautifulSoup
 from .db_tools import save_strategy_tool
+from .web_fetch import WebFetcher
+
+# Shared fetcher: connection pool, per-host limits and the on-disk page cache
+fetcher = WebFetcher()
 
 # Tool definitions
-def web_scraper(url: str) -> str:
+async def web_scraper(url: str) -> str:
     """Scrapes the text content from a given URL."""
     try:
-        response = requests.get(url)
-        # Use html.parser for resilience
-        soup = BeautifulSoup(response.text, 'html.parser')
-        # Simple text extraction
-        return ' '.join(p.get_text() for p in soup.find_all('p'))
+        return await fetcher.scrape(url)
     except Exception as e:
         return f"Error scraping URL: {e}"
 
+async def scrape_urls(urls: list[str]) -> dict:
+    """Scrapes the text content of several URLs concurrently. Returns a mapping of URL to text."""
+    return await fetcher.scrape_many(urls)
+
 def google_search(query: str) -> str:
     """
     Performs a Google search and returns a list of relevant URLs.
@@ -36,12 +38,14 @@ strategy_researcher = LlmAgent(
     name="StrategyResearcher",
     instruction="""You are a quantitative researcher. Your goal is to find trading strategies for a given asset class.
     1.  Use your tools to search for and scrape information about trading strategies from the provided URLs.
+        Prefer `scrape_urls` to fetch all the URLs from a search at once.
     2.  Analyze the information to extract the strategy's logic, indicators, and parameters.
     3.  Format the extracted information into a structured JSON object.
     4.  **Crucially, you must save the final JSON object to the session state by setting `session.set('strategy_json', ...)`**.
     5.  You must also save the strategy to the database using the `save_strategy_tool`.""",
     tools=[
         FunctionTool(web_scraper),
+        FunctionTool(scrape_urls),
         FunctionTool(google_search),
         save_strategy_tool
     ]
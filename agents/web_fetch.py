@@ -0,0 +1,178 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from urllib.parse import urlsplit
+import aiohttp
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.getenv('WEB_CACHE_DIR', '.web_cache')
+
+
+class FetchResult:
+    __slots__ = ('url', 'status', 'text', 'from_cache', 'error', 'truncated')
+
+    def __init__(self, url, status=None, text='', from_cache=False, error=None, truncated=False):
+        self.url = url
+        self.status = status
+        self.text = text
+        self.from_cache = from_cache
+        self.error = error
+        self.truncated = truncated    # the body was cut off at max_bytes
+
+    @property
+    def ok(self):
+        return self.error is None and self.status is not None and self.status < 400
+
+
+def extract_paragraphs(html: str) -> str:
+    """Text of every <p> element. CPU-bound; run it in a worker thread."""
+    # Use html.parser for resilience
+    soup = BeautifulSoup(html, 'html.parser')
+    return ' '.join(p.get_text() for p in soup.find_all('p'))
+
+
+class WebFetcher:
+    """
+    Async page fetcher for the research agents.
+
+    Fetches run concurrently with at most `per_host` connections to any one host and a
+    timeout per request. Pages are cached on disk with their ETag / Last-Modified
+    validators: a page younger than `max_age` seconds is served from disk, an older one is
+    revalidated with a conditional request, so an unchanged page costs a 304 and no body.
+    Concurrent requests for the same URL share one fetch. Bodies longer than `max_bytes`
+    are cut off, marked `truncated` and not cached. Call `close` on shutdown.
+    """
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, per_host=4, max_connections=32, timeout=15.0,
+                 max_age=600, max_bytes=5 * 1024 * 1024, user_agent='Mozilla/5.0 (compatible; trading-bot-research)'):
+        self.cache_dir = cache_dir
+        self.per_host = per_host
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.user_agent = user_agent
+        self._session = None
+        self._inflight = {}
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.per_host)
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'User-Agent': self.user_agent}
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    # --- Fetching ---
+
+    async def fetch(self, url) -> FetchResult:
+        task = self._inflight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(url))
+            self._inflight[url] = task
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def fetch_many(self, urls) -> list:
+        """Fetches every URL concurrently; results are returned in input order."""
+        return list(await asyncio.gather(*(self.fetch(url) for url in urls)))
+
+    async def _fetch(self, url) -> FetchResult:
+        if urlsplit(url).scheme not in ('http', 'https'):
+            return FetchResult(url, error=f"Unsupported URL scheme: {url}")
+        meta, body = await asyncio.to_thread(self._read_cache, url)
+        if meta and time.time() - meta['fetched_at'] < self.max_age:
+            return FetchResult(url, meta['status'], body, from_cache=True)
+
+        headers = {}
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        try:
+            session = await self._get_session()
+            async with session.get(url, headers=headers) as response:
+                if response.status == 304 and meta:
+                    meta['fetched_at'] = time.time()
+                    await asyncio.to_thread(self._write_cache, url, meta, None)
+                    return FetchResult(url, meta['status'], body, from_cache=True)
+                raw, truncated = await self._read_body(response)
+                text = raw.decode(response.charset or 'utf-8', errors='replace')
+                if truncated:
+                    logger.warning(f"{url} is larger than {self.max_bytes} bytes; using the first part uncached.")
+                elif response.status == 200:
+                    meta = {
+                        'url': url, 'status': response.status, 'fetched_at': time.time(),
+                        'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified'),
+                    }
+                    await asyncio.to_thread(self._write_cache, url, meta, text)
+                return FetchResult(url, response.status, text, truncated=truncated)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if meta:
+                # Stale content beats no content when the site is down
+                logger.warning(f"Fetch of {url} failed ({type(e).__name__}); serving cached copy.")
+                return FetchResult(url, meta['status'], body, from_cache=True)
+            return FetchResult(url, error=f"{type(e).__name__}: {e}")
+
+    async def _read_body(self, response):
+        """Up to max_bytes of the body, and whether there was more."""
+        chunks, size = [], 0
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > self.max_bytes:
+                return b''.join(chunks)[:self.max_bytes], True
+        return b''.join(chunks), False
+
+    # --- Disk cache ---
+
+    def _cache_paths(self, url):
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json"), os.path.join(self.cache_dir, f"{key}.html")
+
+    def _read_cache(self, url):
+        meta_path, body_path = self._cache_paths(url)
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            with open(body_path, 'r', encoding='utf-8') as f:
+                return meta, f.read()
+        except (OSError, ValueError):
+            return None, None
+
+    def _write_cache(self, url, meta, text):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        meta_path, body_path = self._cache_paths(url)
+        if text is not None:
+            with open(f"{body_path}.tmp", 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(f"{body_path}.tmp", body_path)
+        # Metadata last: a crash in between leaves the previous (consistent) entry or none
+        with open(f"{meta_path}.tmp", 'w') as f:
+            json.dump(meta, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
+
+    # --- Extraction ---
+
+    async def scrape(self, url) -> str:
+        """Paragraph text of a page; parsing runs in a worker thread."""
+        result = await self.fetch(url)
+        if not result.ok:
+            raise RuntimeError(result.error or f"HTTP {result.status}")
+        return await asyncio.to_thread(extract_paragraphs, result.text)
+
+    async def scrape_many(self, urls) -> dict:
+        """url -> paragraph text (or an error message) for several pages fetched concurrently."""
+        texts = await asyncio.gather(*(self.scrape(url) for url in urls), return_exceptions=True)
+        return {url: text if isinstance(text, str) else f"Error scraping URL: {text}" for url, text in zip(urls, texts)}
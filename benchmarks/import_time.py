@@ -0,0 +1,65 @@
+"""
+Import-time guard for the BACKTEST entry point.
+
+Imports main and the backtest core in fresh interpreters, reports the median wall time
+and fails if any heavy dependency that a backtest does not use was loaded, or if the
+median exceeds --budget_ms:
+
+    python -m benchmarks.import_time --runs 5 --budget_ms 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Loading any of these means a backtest pays for a stack it never uses
+FORBIDDEN = ('google.adk', 'google.genai', 'matplotlib', 'docker', 'nats', 'bs4', 'requests', 'jinja2',
+             'aiohttp', 'agents')
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+from trading_bot.core.bot import Bot
+elapsed = time.perf_counter() - started
+print(json.dumps({'seconds': elapsed, 'modules': sorted(sys.modules)}))
+"""
+
+
+def measure(runs):
+    env = dict(os.environ)
+    # Importing must not need a reachable database
+    env.setdefault('DB_URL', 'sqlite:///:memory:')
+    timings, modules = [], set()
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', PROBE], capture_output=True, text=True, check=True, env=env)
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        timings.append(result['seconds'])
+        modules.update(result['modules'])
+    return timings, modules
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget_ms", type=float, default=1500)
+    args = parser.parse_args()
+
+    timings, modules = measure(args.runs)
+    median_ms = statistics.median(timings) * 1000
+    loaded = sorted(m for m in modules if any(m == name or m.startswith(name + '.') for name in FORBIDDEN))
+    print(f"BACKTEST import: median {median_ms:.0f} ms, min {min(timings) * 1000:.0f} ms over {args.runs} runs")
+
+    failed = False
+    if loaded:
+        print(f"FAIL: heavy modules imported: {', '.join(loaded[:20])}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print(f"FAIL: median import time above the {args.budget_ms:.0f} ms budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
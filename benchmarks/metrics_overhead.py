@@ -0,0 +1,63 @@
+"""
+Hot-path cost of the metrics registry.
+
+Times each kind of update in a tight loop against an empty loop, then renders a
+registry with --strategies strategies' worth of series, and fails if a counter
+increment costs more than --budget_ns:
+
+    python -m benchmarks.metrics_overhead --iterations 1000000 --budget_ns 200
+"""
+import argparse
+import sys
+import time
+from trading_bot.core.metrics import MetricsRegistry
+
+
+def per_call_ns(fn, iterations):
+    started = time.perf_counter_ns()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter_ns() - started) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=1_000_000)
+    parser.add_argument("--strategies", type=int, default=100)
+    parser.add_argument("--budget_ns", type=float, default=200)
+    args = parser.parse_args()
+
+    registry = MetricsRegistry()
+    counters = registry.counter('bench_total', 'Benchmark counter', labels=('strategy',))
+    counter = counters.labels(strategy='s0')
+    gauge = registry.gauge('bench_gauge', 'Benchmark gauge').labels()
+    histogram = registry.histogram('bench_seconds', 'Benchmark histogram', labels=('strategy',)).labels(strategy='s0')
+
+    baseline = per_call_ns(lambda: None, args.iterations)
+    cases = {
+        'counter.inc': lambda: counter.inc(),
+        'gauge.set': lambda: gauge.set(1.5),
+        'histogram.record': lambda: histogram.record(12_345),
+        'labels(...).inc': lambda: counters.labels(strategy='s0').inc(),
+    }
+    costs = {}
+    print(f"{'update':<20}{'ns/op':>10}   (empty call {baseline:.0f} ns subtracted)")
+    for name, fn in cases.items():
+        costs[name] = max(0.0, per_call_ns(fn, args.iterations) - baseline)
+        print(f"{name:<20}{costs[name]:>10.1f}")
+
+    for i in range(args.strategies):
+        counters.labels(strategy=f"s{i}").inc()
+        registry.histogram('bench_seconds', 'Benchmark histogram', labels=('strategy',)).labels(
+            strategy=f"s{i}").record(i * 1000)
+    started = time.perf_counter()
+    body = registry.render()
+    print(f"render: {len(body.splitlines())} lines for {args.strategies} strategies "
+          f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    if costs['counter.inc'] > args.budget_ns:
+        print(f"FAIL: counter.inc above the {args.budget_ns:.0f} ns budget")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
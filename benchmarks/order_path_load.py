@@ -0,0 +1,71 @@
+"""
+Order-path load test against the local mock Kraken exchange.
+
+Drives KrakenREST.add_order with N concurrent clients and reports throughput and
+latency percentiles, without network access:
+
+    python -m benchmarks.order_path_load --orders 5000 --concurrency 64
+"""
+import argparse
+import asyncio
+import logging
+import time
+import aiohttp
+from trading_bot.core.kraken_api import KrakenREST
+from trading_bot.core.latency import LatencyHistogram
+from trading_bot.core.mock_exchange import MockKrakenExchange, FaultInjector, MarketReplay
+
+
+async def run_load(base_url, orders, concurrency):
+    histogram = LatencyHistogram('add_order')
+    errors = 0
+    queue = asyncio.Queue()
+    for i in range(orders):
+        queue.put_nowait('buy' if i % 2 == 0 else 'sell')
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        rest = KrakenREST('', '', base_url, session=session)
+
+        async def client():
+            nonlocal errors
+            while not queue.empty():
+                side = queue.get_nowait()
+                started = time.perf_counter_ns()
+                try:
+                    await rest.add_order('XBTUSD', side, 'market', 0.001)
+                except Exception:
+                    errors += 1
+                histogram.record(time.perf_counter_ns() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return orders / elapsed, errors, histogram.summary()
+
+
+async def main():
+    logging.basicConfig(level=logging.WARNING)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency_ms", type=float, default=0.0)
+    parser.add_argument("--error_rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    replay = MarketReplay('BTC/USD').load_candles([
+        {'timestamp': 0, 'open': 100.0, 'high': 101.0, 'low': 99.0, 'close': 100.5, 'volume': 10.0}
+    ])
+    exchange = MockKrakenExchange('BTC/USD', replay, FaultInjector(args.latency_ms, error_rate=args.error_rate))
+    await exchange.start(port=args.port)
+    await asyncio.sleep(0.1)
+    try:
+        rate, errors, latency = await run_load(f"http://127.0.0.1:{args.port}", args.orders, args.concurrency)
+    finally:
+        await exchange.stop()
+    print(f"orders/s: {rate:.0f}  errors: {errors}")
+    print(f"latency: {latency}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
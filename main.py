@@ -2,12 +2,11 @@ import asyncio
 import logging
 import argparse
 import json
-from decouple import config
-from google.adk.sessions import Session
-from agents.alpha_factory import alpha_factory
-from agents.monitoring_agent import monitoring_agent
-from agents.db_tools import db
-from trading_bot.core.bot import Bot
+import os
+
+# Every mode imports only what it runs: a BACKTEST loads the backtest core (pandas and
+# NumPy), not the agent framework, Docker, NATS or the web-scraping stack. Guarded by
+# benchmarks/import_time.py.
 
 def setup_logging():
     """Configures the logging for the application."""
@@ -23,6 +22,8 @@ def setup_logging():
 
 async def run_alpha_factory():
     """Wrapper coroutine to run the Alpha Factory task."""
+    from google.adk.sessions import Session
+    from agents.alpha_factory import alpha_factory
     logging.info("--- Starting Alpha Factory ---")
     session = Session(id="123", appName="trading_bot", userId="user")
     try:
@@ -33,9 +34,14 @@ async def run_alpha_factory():
         logging.info("--- Alpha Factory Run Complete ---")
     except Exception as e:
         logging.error(f"Alpha Factory failed: {e}", exc_info=True)
+    finally:
+        from agents.strategy_researcher import fetcher
+        await fetcher.close()
 
 async def run_monitoring_agent():
     """Wrapper coroutine to run the Monitoring Agent service."""
+    from google.adk.sessions import Session
+    from agents.monitoring_agent import monitoring_agent
     logging.info("--- Starting Monitoring Agent ---")
     session = Session(id="123", appName="trading_bot", userId="user")
     try:
@@ -47,10 +53,14 @@ async def run_backtest_from_cli(args):
     """
     Runs a backtest using the provided command-line arguments and prints the results as JSON.
     """
+    from trading_bot.core.bot import Bot
+    from trading_bot.core.database import shared_database
+    db = shared_database()
     bot = Bot(
         strategy_filepath=args.strategy_filepath,
         config_filepath=args.config_filepath,
-        csv_datapath=args.csv_datapath
+        csv_datapath=args.csv_datapath,
+        checkpoint_dir=args.checkpoint_dir
     )
     await db.connect()
     results = await bot.run_backtest()
@@ -58,6 +68,76 @@ async def run_backtest_from_cli(args):
 
     print(json.dumps(results))
 
+async def run_trading_from_cli(args):
+    """
+    Runs a strategy against the live Kraken feed, with real (LIVE) or simulated (PAPER) orders.
+    """
+    from trading_bot.core.bot import Bot
+    from trading_bot.core.database import shared_database
+    db = shared_database()
+    bot = Bot(
+        strategy_filepath=args.strategy_filepath,
+        config_filepath=args.config_filepath
+    )
+    await db.connect()
+    try:
+        if args.mode == "LIVE":
+            await bot.run_live()
+        else:
+            await bot.run_paper()
+    finally:
+        await db.close()
+
+async def run_replay_from_cli(args):
+    """
+    Replays a recorded Kraken trade feed through a strategy's live path with PAPER fills
+    and prints the replay stats as JSON.
+    """
+    from trading_bot.core.bot import Bot
+    from trading_bot.core.database import shared_database
+    db = shared_database()
+    bot = Bot(strategy_filepath=args.strategy_filepath, config_filepath=args.config_filepath)
+    await db.connect()
+    try:
+        stats = await bot.run_replay(args.record_dir, speed=args.speed, session=args.session)
+    finally:
+        await db.close()
+    print(json.dumps(stats))
+
+async def run_strategy_host_from_cli(args):
+    """
+    Runs a StrategyHost: many strategies in one process on one market-data feed, added and
+    removed through its control subject on NATS.
+    """
+    from trading_bot.core.database import shared_database
+    from trading_bot.core.strategy_host import StrategyHost
+    db = shared_database()
+    host = StrategyHost(args.host_id, db, mode=args.host_mode, max_slots=args.max_slots)
+    await db.connect()
+    try:
+        await host.run()
+    finally:
+        await db.close()
+
+async def run_backtest_workers_from_cli(args):
+    """
+    Serves a distributed backtest farm: --workers processes on this node, each pulling
+    jobs from the farm's coordinator over NATS.
+    """
+    import multiprocessing
+    from trading_bot.config import cfg
+    from trading_bot.core.backtest_farm import run_worker, serve_worker
+    processes = [multiprocessing.Process(target=run_worker, args=(cfg.NATS_URL, args.farm), daemon=True)
+                 for _ in range(args.workers - 1)]
+    for process in processes:
+        process.start()
+    logging.getLogger('trading_bot').setLevel(logging.WARNING)
+    try:
+        await serve_worker(cfg.NATS_URL, args.farm)
+    finally:
+        for process in processes:
+            process.terminate()
+
 async def main():
     """
     Main entry point for the application.
@@ -66,15 +146,40 @@ async def main():
     setup_logging()
 
     parser = argparse.ArgumentParser()
-    parser.add_argument("--mode", default="AGENT", choices=["AGENT", "BACKTEST"])
+    parser.add_argument("--mode", default="AGENT", choices=["AGENT", "BACKTEST", "PAPER", "LIVE", "HOST", "WORKER", "REPLAY"])
     parser.add_argument("--strategy_filepath")
     parser.add_argument("--config_filepath")
     parser.add_argument("--csv_datapath")
+    parser.add_argument("--checkpoint_dir", help="Resume BACKTEST runs from snapshots when the CSV only grew")
+    parser.add_argument("--host_id", default="host-1")
+    parser.add_argument("--host_mode", default="PAPER", choices=["PAPER", "LIVE"])
+    parser.add_argument("--max_slots", type=int, default=64)
+    parser.add_argument("--record_dir", help="Recording (WS_RECORD_DIR of a PAPER/LIVE run) to REPLAY")
+    parser.add_argument("--speed", type=float, default=None, help="REPLAY pace: 1 = as recorded, N = N times faster; "
+                                                                   "unset = as fast as possible")
+    parser.add_argument("--session", help="REPLAY only this recording session (<start>-<host>-<pid>)")
+    parser.add_argument("--farm", default="default", help="Backtest farm a WORKER pulls jobs from")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="WORKER processes on this node")
     args = parser.parse_args()
 
+    from trading_bot.config import cfg
+    if cfg.METRICS_PORT and args.mode not in ("BACKTEST", "WORKER"):
+        from trading_bot.core.metrics import start_metrics_server
+        await start_metrics_server(cfg.METRICS_PORT)
+
     if args.mode == "BACKTEST":
         await run_backtest_from_cli(args)
+    elif args.mode in ("PAPER", "LIVE"):
+        await run_trading_from_cli(args)
+    elif args.mode == "HOST":
+        await run_strategy_host_from_cli(args)
+    elif args.mode == "WORKER":
+        await run_backtest_workers_from_cli(args)
+    elif args.mode == "REPLAY":
+        await run_replay_from_cli(args)
     else:
+        from trading_bot.core.database import shared_database
+        db = shared_database()
         await db.connect()
         try:
             await asyncio.gather(
@@ -0,0 +1,163 @@
+"""
+MonitoringAgent telemetry ingestion, driven end to end through an InMemoryBus in place of
+NATS: python -m pytest tests
+"""
+import asyncio
+import json
+import time
+from agents.monitoring_agent import MonitoringAgent
+from trading_bot.core.bus import InMemoryBus
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def start_agent(bus, deployments=('s1', 's2'), **options):
+    agent = MonitoringAgent()
+    agent._deployments = {strategy_id: {'strategy_id': strategy_id, 'container_id': f"c-{strategy_id}"}
+                          for strategy_id in deployments}
+    alerts = []
+
+    async def alert(message):
+        alerts.append(message)
+
+    options.setdefault('alert', alert)
+    options.setdefault('debounce', 0.05)
+    tasks = await agent.start_ingestion(bus=bus, **options)
+    return agent, alerts, tasks
+
+
+async def publish(bus, strategy_id, **sample):
+    sample.setdefault('time', time.time())
+    await bus.publish(f"telemetry.live.{strategy_id}", json.dumps(sample).encode())
+
+
+async def stop_agent(agent, tasks, bus):
+    await agent._ingestor.close()
+    await bus.close()
+
+
+async def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+def test_messages_are_ingested_in_micro_batches():
+    async def scenario():
+        bus = InMemoryBus()
+        agent, _, tasks = await start_agent(bus)
+        for i in range(200):
+            await publish(bus, 's1', drawdown=0.01, equity=1000 + i)
+        await wait_until(lambda: agent._ingestor.stats['processed'] == 200)
+        stats = dict(agent._ingestor.stats)
+        await stop_agent(agent, tasks, bus)
+        return stats
+
+    stats = run(scenario())
+    assert stats['samples'] == 200
+    assert stats['batches'] < 20
+
+
+def test_rules_run_at_most_once_per_debounce_per_strategy():
+    async def scenario():
+        bus = InMemoryBus()
+        agent, _, tasks = await start_agent(bus, debounce=0.3)
+        ingestor = agent._ingestor
+        evaluated = []
+        evaluate = ingestor._evaluate
+
+        async def counting_evaluate(strategy_id, now):
+            evaluated.append(strategy_id)
+            await evaluate(strategy_id, now)
+
+        ingestor._evaluate = counting_evaluate
+        for _ in range(5):
+            for strategy_id in ('s1', 's2'):
+                await publish(bus, strategy_id, drawdown=0.01)
+            await asyncio.sleep(0.02)
+        await asyncio.sleep(0.1)
+        first_window = list(evaluated)
+        await asyncio.sleep(0.4)
+        await stop_agent(agent, tasks, bus)
+        return first_window, evaluated, ingestor.stats['samples']
+
+    first_window, evaluated, samples = run(scenario())
+    assert samples == 10
+    assert sorted(first_window) == ['s1', 's2']
+    # Samples that arrived within the window are evaluated once more afterwards, not per sample
+    assert evaluated.count('s1') <= 2 and evaluated.count('s2') <= 2
+
+
+def test_repeated_errors_alert_once_per_cooldown():
+    async def scenario():
+        bus = InMemoryBus()
+        agent, alerts, tasks = await start_agent(bus, alert_cooldown=60.0)
+        for _ in range(5):
+            await publish(bus, 's1', status='ERROR', message='boom', drawdown=0.0)
+            await asyncio.sleep(0.08)
+        await wait_until(lambda: agent._ingestor.stats['samples'] == 5)
+        await asyncio.sleep(0.1)
+        await stop_agent(agent, tasks, bus)
+        return alerts
+
+    alerts = run(scenario())
+    # One alert per kind: the error itself, and the error rate once it passes error_limit
+    assert [alert for alert in alerts if 'reported an error' in alert] == ['Strategy s1 reported an error: boom']
+    assert len([alert for alert in alerts if 'errors in the last' in alert]) == 1
+
+
+def test_slow_stop_does_not_block_ingestion():
+    async def scenario():
+        bus = InMemoryBus()
+        release = asyncio.Event()
+        stopped = []
+
+        async def slow_stop(deployment):
+            stopped.append(deployment['strategy_id'])
+            await release.wait()
+
+        agent, alerts, tasks = await start_agent(bus, stop=slow_stop)
+        await publish(bus, 's1', drawdown=0.5)
+        await wait_until(lambda: stopped == ['s1'])
+        # s1's stop is still running; s2's telemetry is ingested and acted on meanwhile
+        for _ in range(3):
+            await publish(bus, 's2', drawdown=0.01)
+        await publish(bus, 's2', drawdown=0.6)
+        await wait_until(lambda: stopped == ['s1', 's2'])
+        samples = agent._ingestor.stats['samples']
+        release.set()
+        await wait_until(lambda: agent._ingestor.stats['remediations'] == 2)
+        await stop_agent(agent, tasks, bus)
+        return samples, alerts
+
+    samples, alerts = run(scenario())
+    assert samples == 5
+    assert len(alerts) == 2
+
+
+def test_malformed_sample_does_not_stop_monitoring():
+    async def scenario():
+        bus = InMemoryBus()
+        stopped = []
+
+        async def stop(deployment):
+            stopped.append(deployment['strategy_id'])
+
+        agent, alerts, tasks = await start_agent(bus, stop=stop)
+        await bus.publish('telemetry.live.s1', json.dumps({'drawdown': '0.5', 'time': 1.0}).encode())
+        await bus.publish('telemetry.live.s1', b'not json')
+        await wait_until(lambda: agent._ingestor.stats['decode_errors'] == 2)
+        await asyncio.sleep(0.1)
+        await publish(bus, 's1', drawdown=0.9)
+        await wait_until(lambda: stopped == ['s1'])
+        alive = not any(task.done() for task in tasks)
+        await stop_agent(agent, tasks, bus)
+        return alive, alerts
+
+    alive, alerts = run(scenario())
+    assert alive
+    assert any('drawdown limit' in alert for alert in alerts)
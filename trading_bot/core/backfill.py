@@ -0,0 +1,168 @@
+import argparse
+import asyncio
+import logging
+import time
+import aiohttp
+from trading_bot.config import cfg
+from trading_bot.core.candles import CandleAggregator
+from trading_bot.core.datastore import DataStore
+from trading_bot.core.kraken_api import KrakenREST, RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+def _result_rows(result):
+    """Kraken keys the payload by its own pair name (e.g. XXBTZUSD), next to `last`."""
+    for key, value in result.items():
+        if key != 'last':
+            return value
+    return []
+
+
+class Backfiller:
+    """
+    Pages historical OHLC or trade history for many pairs concurrently into a DataStore.
+
+    source="ohlc" uses the OHLC endpoint (Kraken serves only the most recent 720 candles).
+    source="trades" walks the full trade history and aggregates it into candles with
+    CandleAggregator. Progress is checkpointed per series after every page, so an
+    interrupted run resumes from its last committed cursor.
+    """
+    def __init__(self, rest: KrakenREST, store: DataStore, interval=1, source="ohlc",
+                 max_concurrency=4, max_retries=5):
+        if source not in ("ohlc", "trades"):
+            raise ValueError(f"Unknown backfill source: {source}")
+        self.rest = rest
+        self.store = store
+        self.interval = interval
+        self.source = source
+        self.max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(self, pairs, since=None, until=None) -> dict:
+        """Backfills every pair and returns {pair: rows_written}."""
+        results = await asyncio.gather(
+            *(self.backfill_pair(pair, since, until) for pair in pairs),
+            return_exceptions=True
+        )
+        summary = {}
+        for pair, result in zip(pairs, results):
+            if isinstance(result, Exception):
+                logger.error(f"Backfill failed for {pair}: {result}")
+                summary[pair] = 0
+            else:
+                summary[pair] = result
+        return summary
+
+    async def backfill_pair(self, pair, since=None, until=None) -> int:
+        async with self._semaphore:
+            series = self.store.series(pair, self.interval)
+            checkpoint = series.load_checkpoint()
+            if checkpoint.get('source') == self.source and checkpoint.get('cursor') is not None:
+                cursor = checkpoint['cursor']
+                logger.info(f"Resuming backfill of {pair} from cursor {cursor}")
+            else:
+                cursor = since
+            until = until if until is not None else time.time()
+
+            if self.source == "ohlc":
+                written = await self._backfill_ohlc(pair, series, cursor, until)
+            else:
+                written = await self._backfill_trades(pair, series, cursor, until)
+            logger.info(f"Backfill of {pair} finished: {written} new candles ({len(series)} total)")
+            return written
+
+    async def _fetch(self, method, *args, **kwargs):
+        delay = 1.0
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                return await method(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(f"Backfill request failed ({e}), retry {attempt}/{self.max_retries} in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    async def _backfill_ohlc(self, pair, series, cursor, until) -> int:
+        written = 0
+        while True:
+            result = await self._fetch(self.rest.get_ohlc, pair, self.interval, since=cursor)
+            last = int(result['last'])
+            # Candles after `last` are still forming and are not committed yet
+            rows = [
+                (int(r[0]), float(r[1]), float(r[2]), float(r[3]), float(r[4]), float(r[6]), float(r[5]))
+                for r in _result_rows(result) if int(r[0]) <= last and int(r[0]) < until
+            ]
+            written += series.append(rows)
+            series.save_checkpoint({'source': 'ohlc', 'cursor': last})
+            if (cursor is not None and last <= cursor) or last >= until or not rows:
+                return written
+            cursor = last
+
+    async def _backfill_trades(self, pair, series, cursor, until) -> int:
+        period = self.interval * 60
+        if cursor is None:
+            # Start one period before the first missing candle, or at the epoch
+            cursor = (series.last_timestamp + period) * 10**9 if series.last_timestamp is not None else 0
+        aggregator = CandleAggregator(timeframes=(self.interval,))
+        written = 0
+        while True:
+            result = await self._fetch(self.rest.get_trades, pair, since=cursor)
+            trades = _result_rows(result)
+            events = []
+            for price, volume, timestamp, *_ in trades:
+                timestamp = float(timestamp)
+                if timestamp >= until:
+                    break
+                events.extend(aggregator.add_trade(pair, float(price), float(volume), timestamp))
+            rows = [
+                (c['timestamp'], c['open'], c['high'], c['low'], c['close'], c['volume'], c['vwap'])
+                for _, timeframe, c in events if timeframe == self.interval
+            ]
+            written += series.append(rows)
+
+            next_cursor = int(result['last'])
+            done = not trades or next_cursor <= cursor or next_cursor >= until * 10**9
+            if done:
+                # Only candles whose period has fully elapsed are final
+                events = aggregator.close_elapsed(min(until, time.time()))
+                rows = [
+                    (c['timestamp'], c['open'], c['high'], c['low'], c['close'], c['volume'], c['vwap'])
+                    for _, timeframe, c in events if timeframe == self.interval
+                ]
+                written += series.append(rows)
+
+            # Resume from the start of the open candle so it is rebuilt in full after a restart
+            open_start = series.last_timestamp + period if series.last_timestamp is not None else None
+            resume = min(next_cursor, open_start * 10**9) if open_start is not None else next_cursor
+            series.save_checkpoint({'source': 'trades', 'cursor': resume})
+            if done:
+                return written
+            cursor = next_cursor
+
+
+async def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Backfill Kraken history into the local data store")
+    parser.add_argument("--pairs", nargs="+", required=True, help="Kraken pairs, e.g. XBTUSD ETHUSD")
+    parser.add_argument("--interval", type=int, default=1, help="Candle interval in minutes")
+    parser.add_argument("--source", default="ohlc", choices=["ohlc", "trades"])
+    parser.add_argument("--since", type=int, help="Start timestamp (seconds for ohlc, ns for trades)")
+    parser.add_argument("--store", default="trading_bot/data/store")
+    parser.add_argument("--rest_url", default=cfg.KRAKEN_REST_URL)
+    parser.add_argument("--rate", type=float, default=1.0, help="Requests per second across all pairs")
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    async with aiohttp.ClientSession() as session:
+        rest = KrakenREST(cfg.API_KEY, cfg.API_SECRET, args.rest_url,
+                          rate_limiter=RateLimiter(rate=args.rate, burst=args.concurrency),
+                          session=session)
+        backfiller = Backfiller(rest, DataStore(args.store), interval=args.interval,
+                                source=args.source, max_concurrency=args.concurrency)
+        summary = await backfiller.run(args.pairs, since=args.since)
+    logger.info(f"Backfill summary: {summary}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,304 @@
+import ast
+import asyncio
+import collections
+import hashlib
+import itertools
+import json
+import logging
+import os
+import socket
+import tempfile
+import time
+import uuid
+from trading_bot.core.datastore import fingerprint_file
+
+logger = logging.getLogger(__name__)
+
+# --- Protocol ---
+#
+# Jobs are pulled, not pushed: an idle worker sends a request on `backtest.<farm>.next`
+# and the coordinator replies with one job (or an empty payload when it has none). A
+# busy worker therefore never holds queued jobs, any number of workers can join or
+# leave at any time, and a job's timeout measures how long it has been running.
+#
+#   job     {"job_id", "attempt", "strategy": {"name", "digest", "source"},
+#            "config": {"name", "digest", "source"}, "overrides", "rows",
+#            "dataset": {"path", "fingerprint"}}
+#   result  {"job_id", "attempt", "worker", "result": <evaluate_config dict>, "retryable"}
+#
+# Results are published on `backtest.<farm>.results`. The coordinator keeps the first
+# result for each job_id and discards later ones, so a job retried after a timeout is
+# still collected exactly once.
+
+
+def next_subject(farm) -> str:
+    return f"backtest.{farm}.next"
+
+
+def results_subject(farm) -> str:
+    return f"backtest.{farm}.results"
+
+
+def _digest(source: bytes) -> str:
+    return hashlib.blake2b(source, digest_size=16).hexdigest()
+
+
+def _source_ref(filepath) -> dict:
+    with open(filepath, 'rb') as f:
+        source = f.read()
+    # Workers load the file on its own, outside any package
+    for node in ast.walk(ast.parse(source, filename=filepath)):
+        if isinstance(node, ast.ImportFrom) and node.level:
+            raise ValueError(f"{filepath} line {node.lineno}: relative import 'from {'.' * node.level}"
+                             f"{node.module or ''} import ...' cannot run on a backtest worker; "
+                             f"use an absolute import (e.g. from trading_bot.strategies.base import BaseStrategy)")
+    return {'name': os.path.basename(filepath), 'digest': _digest(source), 'source': source.decode('utf-8')}
+
+
+class BacktestCoordinator:
+    """
+    Hands backtest jobs to a farm of BacktestWorkers over a bus (NATS, or an InMemoryBus
+    for a single box) and collects their metrics.
+
+    A job not answered within `job_timeout` seconds of being handed out is queued again,
+    up to `max_attempts` in total; so is one whose worker reports a retryable failure
+    (e.g. the dataset is missing on that node). After the last attempt the job resolves
+    to an {'error': ...} result like a failed optimizer evaluation.
+    """
+    def __init__(self, bus, farm='default', job_timeout=300.0, max_attempts=3):
+        self.bus = bus
+        self.farm = farm
+        self.job_timeout = job_timeout
+        self.max_attempts = max_attempts
+        self.retries = 0
+        self.duplicates = 0
+        self._queue = collections.deque()    # job_ids waiting for a worker
+        self._jobs = {}                      # job_id -> {'job', 'attempts', 'deadline', 'future'}
+        self._job_ids = itertools.count()
+        self._run_id = uuid.uuid4().hex[:8]
+        self._subscriptions = []
+        self._reaper = None
+        self._fingerprints = {}
+
+    async def start(self):
+        self._subscriptions = [
+            await self.bus.subscribe(next_subject(self.farm), cb=self._on_next),
+            await self.bus.subscribe(results_subject(self.farm), cb=self._on_result),
+        ]
+        self._reaper = asyncio.create_task(self._reap())
+        logger.info(f"Backtest coordinator serving farm '{self.farm}'.")
+
+    async def close(self):
+        if self._reaper:
+            self._reaper.cancel()
+        for subscription in self._subscriptions:
+            await subscription.unsubscribe()
+        self._subscriptions = []
+        for entry in self._jobs.values():
+            if not entry['future'].done():
+                entry['future'].cancel()
+
+    @property
+    def pending(self) -> int:
+        return sum(1 for entry in self._jobs.values() if not entry['future'].done())
+
+    # --- Submitting ---
+
+    def _dataset_ref(self, csv_datapath) -> dict:
+        path = os.path.abspath(csv_datapath)
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        if key not in self._fingerprints:
+            self._fingerprints[key] = fingerprint_file(path)
+        return {'path': path, 'fingerprint': self._fingerprints[key]}
+
+    def submit(self, strategy_filepath, config_filepath, csv_datapath, overrides=None, rows=None,
+               _refs=None) -> asyncio.Future:
+        """
+        Queues one backtest; the future resolves to its evaluate_config-style result. Raises
+        ValueError for a strategy or config with relative imports, which no worker can load.
+        """
+        strategy, config, dataset = _refs or (_source_ref(strategy_filepath), _source_ref(config_filepath),
+                                              self._dataset_ref(csv_datapath))
+        job_id = f"{self._run_id}-{next(self._job_ids)}"
+        job = {'job_id': job_id, 'strategy': strategy, 'config': config, 'overrides': overrides or {},
+               'rows': rows, 'dataset': dataset}
+        future = asyncio.get_running_loop().create_future()
+        self._jobs[job_id] = {'job': job, 'attempts': 0, 'deadline': None, 'future': future}
+        future.add_done_callback(lambda _: self._jobs.pop(job_id, None))
+        self._queue.append(job_id)
+        return future
+
+    async def map(self, strategy_filepath, config_filepath, csv_datapath, overrides_list, rows=None) -> list:
+        """Runs one backtest per overrides dict on the farm; results come back in input order."""
+        refs = (_source_ref(strategy_filepath), _source_ref(config_filepath), self._dataset_ref(csv_datapath))
+        futures = [self.submit(strategy_filepath, config_filepath, csv_datapath, overrides, rows, _refs=refs)
+                   for overrides in overrides_list]
+        return await asyncio.gather(*futures)
+
+    # --- Serving workers ---
+
+    async def _on_next(self, msg):
+        while self._queue:
+            job_id = self._queue.popleft()
+            entry = self._jobs.get(job_id)
+            if entry is None or entry['future'].done():
+                continue
+            entry['attempts'] += 1
+            entry['deadline'] = time.monotonic() + self.job_timeout
+            await msg.respond(json.dumps({**entry['job'], 'attempt': entry['attempts']}).encode())
+            return
+        await msg.respond(b'')
+
+    async def _on_result(self, msg):
+        try:
+            reply = json.loads(msg.data)
+            job_id = reply['job_id']
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring malformed backtest result: {e}")
+            return
+        entry = self._jobs.get(job_id)
+        if entry is None or entry['future'].done():
+            # A retried job whose earlier attempt finished too: only the first result counts
+            self.duplicates += 1
+            return
+        result = reply.get('result') or {'error': 'Worker returned no result'}
+        if reply.get('retryable') and reply.get('attempt') != entry['attempts']:
+            # An attempt that was already given up on; the job is queued or running again
+            return
+        if reply.get('retryable') and entry['attempts'] < self.max_attempts:
+            logger.warning(f"Job {job_id} attempt {reply.get('attempt')} failed on {reply.get('worker')}, "
+                           f"retrying: {result.get('error')}")
+            self._requeue(job_id, entry)
+            return
+        entry['future'].set_result(result)
+
+    def _requeue(self, job_id, entry):
+        entry['deadline'] = None
+        self.retries += 1
+        # Retries go first: they have already waited their turn once
+        self._queue.appendleft(job_id)
+
+    async def _reap(self):
+        interval = min(1.0, self.job_timeout / 4)
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for job_id, entry in list(self._jobs.items()):
+                if entry['deadline'] is None or entry['deadline'] > now or entry['future'].done():
+                    continue
+                if entry['attempts'] < self.max_attempts:
+                    logger.warning(f"Job {job_id} timed out after {self.job_timeout}s, retrying.")
+                    self._requeue(job_id, entry)
+                else:
+                    entry['future'].set_result({'params': entry['job']['overrides'],
+                                                'error': f"Timed out {entry['attempts']} times"})
+
+
+class BacktestWorker:
+    """
+    Pulls backtest jobs from a coordinator and runs them with the optimizer's
+    evaluate_config, one at a time. Strategy and config sources arrive with the job and
+    are written once per content hash under `workdir`, outside any package, so they must
+    be self-contained files with absolute imports, as the strategy template produces
+    (`submit` rejects relative imports). The dataset is opened at the path in the job and
+    must have the coordinator's fingerprint. Throughput scales by running more workers,
+    as processes or on other nodes.
+    """
+    def __init__(self, bus, farm='default', workdir=None, worker_id=None, idle_backoff=0.5, request_timeout=2.0):
+        self.bus = bus
+        self.farm = farm
+        self.workdir = workdir or os.path.join(tempfile.gettempdir(), 'backtest_worker')
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:4]}"
+        self.idle_backoff = idle_backoff
+        self.request_timeout = request_timeout
+        self.completed = 0
+        self.running = False
+        self._fingerprints = {}
+
+    async def run(self, max_jobs=None):
+        self.running = True
+        logger.info(f"Backtest worker {self.worker_id} pulling from farm '{self.farm}'.")
+        while self.running and (max_jobs is None or self.completed < max_jobs):
+            try:
+                msg = await self.bus.request(next_subject(self.farm), self.worker_id.encode(),
+                                             timeout=self.request_timeout)
+            except Exception as e:
+                # No coordinator yet (timeout / no responders) or a reconnect in progress
+                logger.debug(f"No job from farm '{self.farm}': {e}")
+                await asyncio.sleep(self.idle_backoff)
+                continue
+            if not msg.data:
+                await asyncio.sleep(self.idle_backoff)
+                continue
+            job = json.loads(msg.data)
+            # Backtests are CPU-bound and synchronous; keep the bus connection responsive
+            reply = await asyncio.to_thread(self._run_job, job)
+            await self.bus.publish(results_subject(self.farm), json.dumps(reply).encode())
+            self.completed += 1
+
+    def stop(self):
+        self.running = False
+
+    def _materialize(self, ref) -> str:
+        if _digest(ref['source'].encode('utf-8')) != ref['digest']:
+            raise ValueError(f"Source of {ref['name']} does not match its digest")
+        # The strategy class name comes from the file name, so keep it under a per-digest directory
+        directory = os.path.join(self.workdir, ref['digest'])
+        path = os.path.join(directory, ref['name'])
+        if not os.path.exists(path):
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(ref['source'])
+            os.replace(tmp_path, path)
+        return path
+
+    def _check_dataset(self, dataset):
+        path = dataset['path']
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        if key not in self._fingerprints:
+            self._fingerprints[key] = fingerprint_file(path)
+        if self._fingerprints[key] != dataset['fingerprint']:
+            raise FileNotFoundError(f"{path} on this node is not the coordinator's dataset")
+
+    def _run_job(self, job) -> dict:
+        from trading_bot.core.optimizer import evaluate_config
+        reply = {'job_id': job['job_id'], 'attempt': job.get('attempt'), 'worker': self.worker_id,
+                 'retryable': False}
+        try:
+            strategy_filepath = self._materialize(job['strategy'])
+            config_filepath = self._materialize(job['config'])
+            self._check_dataset(job['dataset'])
+        except OSError as e:
+            # Another node may have the dataset
+            reply.update(retryable=True, result={'params': job['overrides'], 'error': f"{type(e).__name__}: {e}"})
+            return reply
+        except Exception as e:
+            reply['result'] = {'params': job['overrides'], 'error': f"{type(e).__name__}: {e}"}
+            return reply
+        reply['result'] = evaluate_config(strategy_filepath, config_filepath, job['dataset']['path'],
+                                          job['overrides'], job['rows'])
+        return reply
+
+
+async def serve_worker(nats_url, farm='default'):
+    """Connects to the bus and runs one BacktestWorker until cancelled."""
+    from trading_bot.core.bus import connect_bus
+    bus = await connect_bus(nats_url)
+    worker = BacktestWorker(bus, farm)
+    try:
+        await worker.run()
+    finally:
+        await bus.drain()
+
+
+def run_worker(nats_url, farm='default'):
+    """Entry point of a worker process."""
+    # Trade-by-trade INFO logs from thousands of backtests would swamp the log
+    logging.getLogger('trading_bot').setLevel(logging.WARNING)
+    try:
+        asyncio.run(serve_worker(nats_url, farm))
+    except KeyboardInterrupt:
+        pass
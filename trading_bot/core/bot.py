@@ -1,79 +1,465 @@
 import asyncio
-import json
+import io
 import logging
-import nats
 import pandas as pd
 import os
-import importlib.util
-from trading_bot.core.database import Database
-from trading_bot.core.kraken_api import KrakenREST
-from trading_bot.core.execution import ExecutionEngine
+import time
+from trading_bot.config import cfg
+from trading_bot.core.database import shared_database
+from trading_bot.core.execution import EXIT_SIGNALS, ExecutionEngine
 from trading_bot.core.results import Results
-from agents.db_tools import db # Use the shared DB instance
+from trading_bot.core.datastore import fingerprint_file
+from trading_bot.core.loader import compile_file, load_strategy_class, load_config_file
+from trading_bot.core.checkpoint import (CHECKPOINT_DIR, PrefixDigests, concat_history, config_digest,
+                                         find_checkpoint, pack_history, save_checkpoint)
+from trading_bot.strategies.indicators import SIGNALS, position_signal, use_indicator_cache
+from trading_bot.core.latency import LatencyHistogram
+from trading_bot.core.metrics import REGISTRY, Counter
+
+# The live stack (Kraken REST/WS, candle aggregation, orders, telemetry) is imported on
+# first use so that backtests, and every optimizer worker, load only what they run.
 
 logger = logging.getLogger(__name__)
 
 def load_strategy_from_file(filepath: str):
-    """Dynamically loads a strategy class from a Python file."""
-    spec = importlib.util.spec_from_file_location("strategy_module", filepath)
-    strategy_module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(strategy_module)
-    # Assumes the class name is the same as the file name, capitalized
-    class_name = os.path.basename(filepath).replace(".py", "").capitalize()
-    return getattr(strategy_module, class_name)
+    """Dynamically loads a strategy class from a Python file (cached by content hash)."""
+    return load_strategy_class(filepath)
+
+def apply_overrides(config: dict, overrides: dict) -> dict:
+    """
+    Applies parameter overrides to a loaded config in place. Keys are dotted paths into
+    the config, e.g. {'indicators.short_window': 20, 'stop_loss_pct': 0.01}.
+    """
+    for path, value in (overrides or {}).items():
+        target = config
+        *parents, key = path.split('.')
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[key] = value
+    return config
+
+def load_candles_csv(csv_datapath):
+    """Reads a historical candle CSV (no header; a path or a file object) into a DataFrame."""
+    return pd.read_csv(csv_datapath, header=None,
+                       names=['timestamp', 'open', 'high', 'low', 'close', 'volume', 'vwap'])
 
 class Bot:
-    def __init__(self, strategy_filepath, config_filepath, csv_datapath):
+    def __init__(self, strategy_filepath, config_filepath, csv_datapath=None, config_overrides=None, rest=None,
+                 checkpoint_dir=None):
         self.strategy_filepath = strategy_filepath
         self.config_filepath = config_filepath
         self.csv_datapath = csv_datapath
+        # Backtests on csv_datapath resume from / save checkpoints here when set
+        self.checkpoint_dir = checkpoint_dir or CHECKPOINT_DIR
+        self._history_prefix = None     # packed portfolio history restored from a checkpoint
+        # Optional IndicatorCache for the dataset, shared by the configurations of a sweep
+        self.indicator_cache = None
         
         # Load config and strategy dynamically
-        self.config = self._load_config()
+        self.config = apply_overrides(self._load_config(), config_overrides)
         StrategyClass = load_strategy_from_file(strategy_filepath)
         self.strategy = StrategyClass(self.config['indicators'])
 
-        self.db = db
-        self.rest = KrakenREST(self.config['api_key'], self.config['api_secret'], self.config['rest_url'])
-        self.execution = ExecutionEngine(self.rest, self.db)
+        self.db = shared_database()
+        # A StrategyHost passes one REST client shared by all of its strategies
+        self._rest = rest
+        # Stop-loss / take-profit from the strategy config when it sets them
+        risk_params = {key: self.config[key] for key in ('stop_loss_pct', 'take_profit_pct') if key in self.config}
+        self.execution = ExecutionEngine(rest, self.db, risk_params=risk_params or None,
+                                         symbol=self.config.get('symbol'), strategy_name=self.config.get('strategy_id'))
         self.nc = None
 
+        # Live/paper state
+        self.telemetry = None
+        self.tick_to_signal = LatencyHistogram('tick_to_signal')
+        self.signal_to_ack = LatencyHistogram('signal_to_order_ack')
+        # Replaced by the registered counter in start_live
+        self._candles_metric = Counter()
+        self._strategy_id = None
+        self._orders = None
+        self._order_in_flight = False
+        self._awaited_signal = None     # signal of the LIVE order the worker is waiting on
+        self._exit_requested = asyncio.Event()
+        # Seconds to wait for an order's execution reports before settling it over REST
+        self.order_timeout = self.config.get('order_timeout', 30.0)
+        self._order_manager = None
+        self._order_task = None
+        self._peak_equity = 0
+        self._p99_us = (0.0, 0.0)       # tick->signal and signal->ack p99 sent with telemetry
+        self._p99_due_ns = 0
+
+    @property
+    def rest(self):
+        """Kraken REST client, created on first use."""
+        if self._rest is None:
+            from trading_bot.core.kraken_api import KrakenREST
+            self._rest = KrakenREST(self.config['api_key'], self.config['api_secret'], self.config['rest_url'])
+        self.execution.rest = self._rest
+        return self._rest
+
     def _load_config(self) -> dict:
         """Loads the configuration from the specified file."""
         # This is a simplified config loader. A real implementation would be more robust.
-        config = {}
-        with open(self.config_filepath, 'r') as f:
-            exec(f.read(), config)
-        return config
+        return load_config_file(self.config_filepath)
 
-    async def run_backtest(self) -> dict:
-        """Runs the backtest and returns the performance metrics as a dictionary."""
+    async def run_backtest(self, candles=None) -> dict:
+        """
+        Runs the backtest and returns the performance metrics as a dictionary.
+        candles: optional DataFrame in the CSV layout (e.g. a slice of a dataset an
+        optimizer has already loaded); the CSV at csv_datapath is read otherwise.
+        """
         logger.info(f"Starting Backtest for {self.strategy_filepath}...")
-        if not os.path.exists(self.csv_datapath):
-            logger.error("CSV file not found.")
-            return {"error": "CSV file not found"}
+        if candles is None:
+            if not os.path.exists(self.csv_datapath):
+                logger.error("CSV file not found.")
+                return {"error": "CSV file not found"}
+            if self.checkpoint_dir:
+                await self._run_checkpointed_backtest()
+                return self._metrics()
+            candles = load_candles_csv(self.csv_datapath)
+
+        if hasattr(self.strategy, 'generate_signals'):
+            await self._run_vectorized_backtest(candles)
+        else:
+            await self._run_candle_backtest(candles)
+        return self._metrics()
+
+    def portfolio_history(self) -> dict:
+        """The full equity curve as {'timestamp', 'portfolio_value'} arrays, including any restored prefix."""
+        return concat_history(self._history_prefix, pack_history(self.execution.portfolio_history))
+
+    def _metrics(self) -> dict:
+        results = Results(self.execution.trades, self.portfolio_history(), self.config.get('capital', 10000))
+        metrics = results.calculate_metrics()
+        
+        logger.info(f"Backtest Finished. Final Value: ${metrics['final_equity']:.2f}")
+        return metrics
 
-        df = pd.read_csv(self.csv_datapath, header=None,
-                         names=['timestamp', 'open', 'high', 'low', 'close', 'volume', 'vwap'])
+    async def _run_checkpointed_backtest(self):
+        """
+        Incremental backtest of csv_datapath. The state at the end of the last run on a
+        prefix of this file (same strategy source and config) is restored and only the
+        rows appended since are processed, so a daily update costs O(new candles). The
+        candle path is used throughout because only process_candle carries strategy
+        state forward; the vectorized path gives the same results on a full run.
+        """
+        with open(self.csv_datapath, 'rb') as f:
+            data = f.read()
+        digests = PrefixDigests(data)
+        _, strategy_digest, _ = compile_file(self.strategy_filepath)
+        key = f"{strategy_digest}-{config_digest(self.config)}"
 
-        for index, row in df.iterrows():
-            candle = {'timestamp': row['timestamp'], 'close': row['close']}
+        checkpoint = find_checkpoint(self.checkpoint_dir, key, digests)
+        offset, rows, restored_from = 0, 0, None
+        if checkpoint is not None:
+            restored_from, header, state = checkpoint
+            self.strategy = state['strategy']
+            self.execution.restore(state['execution'])
+            # The restored equity curve stays in arrays; only new points are appended as dicts
+            self._history_prefix = state['history']
+            offset, rows = header['length'], header['rows']
+            logger.info(f"Resuming backtest from checkpoint at row {rows}.")
+
+        if data[offset:].strip():
+            candles = load_candles_csv(io.BytesIO(data[offset:]))
+            await self._run_candle_backtest(candles)
+            rows += len(candles)
+            if data.endswith(b'\n'):
+                execution = self.execution.state()
+                del execution['portfolio_history']
+                state = {'strategy': self.strategy, 'history': self.portfolio_history(), 'execution': execution}
+                save_checkpoint(self.checkpoint_dir, key, digests, rows, state, replaces=restored_from)
+            else:
+                # The last row may still be incomplete; resuming after it could split a line
+                logger.info("Dataset does not end with a newline; no checkpoint written.")
+
+    async def _run_candle_backtest(self, candles):
+        # Plain Python scalars: much cheaper to iterate than iterrows()
+        for timestamp, close in zip(candles['timestamp'].tolist(), candles['close'].tolist()):
+            candle = {'timestamp': timestamp, 'close': close}
             
-            await self.execution.check_exit_conditions(candle['close'], candle['timestamp'])
+            await self.execution.check_exit_conditions(close, timestamp)
             
             signal = self.strategy.process_candle(candle, self.execution.position_type)
             
             if signal:
-                await self.execution.execute_order(signal, row['close'], row['timestamp'])
+                await self.execution.execute_order(signal, close, timestamp)
             
-            self.execution.get_portfolio_value(row['close'], row['timestamp'])
-        
-        results = Results(self.execution.trades, self.execution.portfolio_history, self.config.get('capital', 10000))
-        metrics = results.calculate_metrics()
-        
-        logger.info(f"Backtest Finished. Final Value: ${metrics['final_equity']:.2f}")
-        return metrics
+            self.execution.get_portfolio_value(close, timestamp)
+
+    async def _run_vectorized_backtest(self, candles):
+        """
+        Fast path for dual-mode strategies: generate_signals evaluates the rules over the
+        whole series at once, and the loop only picks the signal for the current position.
+        Same results as calling process_candle on every candle.
+        """
+        closes = candles['close'].to_numpy(dtype=float)
+        with use_indicator_cache(self.indicator_cache):
+            signals = self.strategy.generate_signals(closes)
+        buy, sell, sell_short, cover_short = (signals[name].tolist() for name in SIGNALS)
+        for i, (timestamp, close) in enumerate(zip(candles['timestamp'].tolist(), closes.tolist())):
+            await self.execution.check_exit_conditions(close, timestamp)
+            
+            signal = position_signal(self.execution.position_type, buy[i], sell[i], sell_short[i], cover_short[i])
+            
+            if signal:
+                await self.execution.execute_order(signal, close, timestamp)
+            
+            self.execution.get_portfolio_value(close, timestamp)
+
+    def run_artifacts(self) -> dict:
+        """
+        Artifacts of the last backtest as keyword arguments for Database.save_backtest_run:
+        the equity curve, the trade list and the fingerprint of the dataset it ran on.
+        """
+        history = self.portfolio_history()
+        return {
+            'equity_curve': history['portfolio_value'].tolist(),
+            'equity_timestamps': history['timestamp'].astype('int64').tolist(),
+            'trades': self.execution.trades,
+            'dataset_fingerprint': fingerprint_file(self.csv_datapath) if self.csv_datapath else None,
+        }
+
+    # --- Live / Paper Trading ---
+
+    async def run_live(self):
+        """Trades the strategy on Kraken with real orders."""
+        await self._run_live_system('LIVE')
+
+    async def run_paper(self):
+        """Runs the strategy on the live Kraken feed with simulated fills."""
+        await self._run_live_system('PAPER')
+
+    async def _run_live_system(self, mode):
+        """
+        Streams trades from KrakenWS into a CandleAggregator and runs the same
+        process_candle hot path as the backtest on every closed candle.
+
+        The decision (exit checks + strategy) runs synchronously in on_candle; orders,
+        DB writes and telemetry are handed to background tasks so no I/O is awaited
+        between a closed candle and its signal.
+        """
+        from trading_bot.core.candles import CandleAggregator
+        from trading_bot.core.kraken_api import KrakenWS
+        from trading_bot.core.recorder import open_recorder
+        symbol = self.config.get('symbol', cfg.SYMBOL)
+        timeframe = self.config.get('timeframe', cfg.TIMEFRAME)
+        logger.info(f"Starting {mode} trading for {symbol} on {timeframe}m candles...")
+        await self.start_live(mode)
+
+        aggregator = CandleAggregator(timeframes=(timeframe,))
+        aggregator.subscribe(self.on_candle, timeframe)
+        ws = KrakenWS(self.config.get('ws_url', cfg.KRAKEN_WS_PUBLIC_URL), aggregator.on_message,
+                      recorder=open_recorder('trade'))
+
+        tasks = [
+            asyncio.create_task(ws.connect_and_stream([symbol], channel="trade")),
+            asyncio.create_task(aggregator.run_clock())
+        ]
+        try:
+            await asyncio.gather(self._order_task, *tasks)
+        finally:
+            ws.running = False
+            for task in tasks:
+                task.cancel()
+            if ws.recorder:
+                ws.recorder.close()
+            await self.stop_live()
+
+    async def run_replay(self, record_dir, speed=None, bus=None, session=None) -> dict:
+        """
+        Re-runs a recorded trade feed (WS_RECORD_DIR of an earlier run) through the live
+        path, KrakenWS -> CandleAggregator -> on_candle, with PAPER fills: at the recorded
+        pace (speed=1), N times faster, or as fast as possible (speed=None). Each frame's
+        orders are filled before the next frame is dispatched, so the decisions are the
+        same at any speed. `session` selects one recording process (see Replayer).
+        Telemetry goes to `bus`, or an in-process bus by default.
+        """
+        from trading_bot.core.bus import connect_bus
+        from trading_bot.core.candles import CandleAggregator
+        from trading_bot.core.kraken_api import KrakenWS
+        timeframe = self.config.get('timeframe', cfg.TIMEFRAME)
+        await self.start_live('PAPER', bus=bus or await connect_bus('memory://replay'))
+
+        aggregator = CandleAggregator(timeframes=(timeframe,))
+        aggregator.subscribe(self.on_candle, timeframe)
+
+        async def on_message(message):
+            await aggregator.on_message(message)
+            await self._orders.join()
+
+        ws = KrakenWS(None, on_message)
+        try:
+            stats = await ws.replay(record_dir, speed, session=session)
+        finally:
+            await self.stop_live()
+        history = self.execution.portfolio_history
+        stats['trades'] = len(self.execution.trades)
+        stats['final_equity'] = history[-1]['portfolio_value'] if history else self.execution.balance
+        logger.info(f"Replayed {stats['frames']} frames ({stats['recorded_seconds']}s recorded) in {stats['seconds']}s: "
+                    f"{stats['trades']} trades, final equity ${stats['final_equity']:.2f}")
+        return stats
+
+    async def start_live(self, mode, bus=None):
+        """
+        Prepares the strategy to receive live candles through on_candle: telemetry, the
+        order worker and, for LIVE, the OrderManager. The market-data feed is up to the
+        caller, so a StrategyHost can drive many bots from one feed (and one bus).
+        """
+        from trading_bot.core.order_manager import OrderManager
+        from trading_bot.core.telemetry import TelemetryPublisher
+        self.execution.mode = mode
+        rest = self.rest
+        symbol = self.config.get('symbol', cfg.SYMBOL)
+        strategy_id = self.config.get('strategy_id', os.getenv('STRATEGY_ID', cfg.STRATEGY_NAME))
+
+        self.telemetry = TelemetryPublisher(self.config.get('nats_url', cfg.NATS_URL), strategy_id,
+                                            flush_interval=self.config.get('telemetry_flush_interval', 0.25),
+                                            encoding=self.config.get('telemetry_encoding', 'binary'), bus=bus)
+        await self.telemetry.start()
+
+        if mode == 'LIVE':
+            # Orders are tracked on the private executions feed instead of blocking on REST
+            self._order_manager = OrderManager(rest, symbol, self.config.get('ws_auth_url', cfg.KRAKEN_WS_URL),
+                                               on_done=self.execution.on_order_done)
+            self.execution.order_manager = self._order_manager
+            await self._order_manager.start()
+
+        self._orders = asyncio.Queue()
+        self._order_task = asyncio.create_task(self._order_worker())
+        self._register_metrics(strategy_id)
+
+    def _register_metrics(self, strategy_id):
+        """Exposes this strategy's latencies and counters, labelled by strategy_id, on the metrics endpoint."""
+        self._strategy_id = strategy_id
+        REGISTRY.histogram('trading_bot_candle_decision_seconds', 'Closed candle to trading decision',
+                           labels=('strategy',)).attach(self.tick_to_signal, strategy=strategy_id)
+        REGISTRY.histogram('trading_bot_order_seconds', 'Trading decision to executed order',
+                           labels=('strategy',)).attach(self.signal_to_ack, strategy=strategy_id)
+        if self._order_manager:
+            REGISTRY.histogram('trading_bot_order_exchange_ack_seconds', 'Order submission to exchange acknowledgement',
+                               labels=('strategy',)).attach(self._order_manager.submit_to_ack, strategy=strategy_id)
+        self._candles_metric = REGISTRY.counter('trading_bot_candles_total', 'Closed candles processed',
+                                                labels=('strategy',)).labels(strategy=strategy_id)
+        history = self.execution.portfolio_history
+        REGISTRY.gauge('trading_bot_equity', 'Latest portfolio value', labels=('strategy',)).labels(
+            strategy=strategy_id).set_function(lambda: history[-1]['portfolio_value'] if history else self.execution.balance)
+        telemetry = self.telemetry
+        for name, attribute, help_text in (
+                ('trading_bot_telemetry_messages_total', 'sent_messages', 'Telemetry messages published'),
+                ('trading_bot_telemetry_bytes_total', 'sent_bytes', 'Telemetry bytes published'),
+                ('trading_bot_telemetry_dropped_total', 'dropped', 'Telemetry samples dropped on a full queue')):
+            REGISTRY.counter(name, help_text, labels=('strategy',)).labels(strategy=strategy_id).set_function(
+                lambda attribute=attribute: getattr(telemetry, attribute))
+
+    async def stop_live(self):
+        if self._strategy_id is not None:
+            REGISTRY.forget(strategy=self._strategy_id)
+            self._candles_metric = Counter()
+            self._strategy_id = None
+        if self._order_task:
+            self._order_task.cancel()
+            self._order_task = None
+        logger.info(f"Latency tick->signal: {self.tick_to_signal.summary()}")
+        logger.info(f"Latency signal->ack: {self.signal_to_ack.summary()}")
+        if self._order_manager:
+            logger.info(f"Latency submit->exchange ack: {self._order_manager.submit_to_ack.summary()}")
+            await self._order_manager.close()
+            self._order_manager = None
+        if self.telemetry:
+            await self.telemetry.close()
+
+    def on_candle(self, symbol, timeframe, candle):
+        """Decision hot path for a closed candle. Must not perform I/O."""
+        started = time.perf_counter_ns()
+        self._candles_metric.inc()
+        price = candle['close']
+        try:
+            signal = self.execution.exit_signal(price)
+            strategy_signal = self.strategy.process_candle(candle, self.execution.position_type)
+            signal = signal or strategy_signal
+        except Exception as e:
+            logger.error(f"Strategy failed on candle {candle['timestamp']}: {e}", exc_info=True)
+            self.telemetry.publish({'status': 'ERROR', 'message': str(e), 'timestamp': candle['timestamp']})
+            return
+        decided = time.perf_counter_ns()
+        self.tick_to_signal.record(decided - started)
+
+        if signal:
+            if (self._order_in_flight and signal in EXIT_SIGNALS and self._awaited_signal not in (None, *EXIT_SIGNALS)
+                    and not self._exit_requested.is_set()):
+                # An exit does not wait for an entry's fills: the worker settles the entry now, then exits
+                self._exit_requested.set()
+                self._orders.put_nowait((signal, price, candle['timestamp'], decided))
+            elif self._order_in_flight:
+                logger.warning(f"Skipping {signal}: previous order still in flight.")
+                REGISTRY.counter('trading_bot_orders_skipped_total', 'Signals skipped with an order in flight',
+                                 labels=('strategy',)).labels(strategy=self._strategy_id).inc()
+            else:
+                self._order_in_flight = True
+                self._orders.put_nowait((signal, price, candle['timestamp'], decided))
+
+        if decided >= self._p99_due_ns:
+            # Percentiles scan every histogram bucket: refresh them once per telemetry flush, not per candle
+            self._p99_us = (self.tick_to_signal.percentile(99) / 1000, self.signal_to_ack.percentile(99) / 1000)
+            self._p99_due_ns = decided + int(self.telemetry.flush_interval * 1e9)
+
+        equity = self.execution.get_portfolio_value(price, candle['timestamp'])
+        self._peak_equity = max(self._peak_equity, equity)
+        drawdown = (self._peak_equity - equity) / self._peak_equity if self._peak_equity else 0
+        self.telemetry.publish({
+            'status': 'OK',
+            'timestamp': candle['timestamp'],
+            'price': price,
+            'equity': equity,
+            'drawdown': drawdown,
+            'position': self.execution.position_type,
+            'signal': signal,
+            'tick_to_signal_p99_us': self._p99_us[0],
+            'signal_to_ack_p99_us': self._p99_us[1]
+        })
+
+    async def _order_worker(self):
+        """Executes queued signals one at a time, off the decision path."""
+        while True:
+            signal, price, timestamp, decided = await self._orders.get()
+            try:
+                await self.execution.execute_order(signal, price, timestamp)
+                REGISTRY.counter('trading_bot_orders_total', 'Orders executed by signal',
+                                 labels=('strategy', 'signal')).labels(strategy=self._strategy_id, signal=signal).inc()
+                self.signal_to_ack.record(time.perf_counter_ns() - decided)
+                order = self.execution.pending_order
+                if order is not None:
+                    # The next signal is sized from this order's fills: wait until they are reconciled
+                    await self._await_order(signal, order)
+            except Exception as e:
+                logger.error(f"Order for {signal} failed: {e}", exc_info=True)
+                self.telemetry.publish({'status': 'ERROR', 'message': f"Order for {signal} failed: {e}"})
+            finally:
+                self._awaited_signal = None
+                self._exit_requested.clear()
+                # An exit queued behind this order keeps the next signals out until it is done too
+                self._order_in_flight = not self._orders.empty()
+                self._orders.task_done()
 
-    # Note: The live trading methods (run_live_system, on_market_data, etc.) are omitted
-    # as they are not used in the agent-based backtesting workflow. They would be part of
-    # the containerized strategy that the DeploymentManager launches.
+    async def _await_order(self, signal, order):
+        """
+        Waits until `order` is done. If its execution reports are overdue (order_timeout)
+        or an exit signal arrives meanwhile, the order is settled over REST instead: its
+        unfilled remainder is cancelled and its actual fills are applied.
+        """
+        self._awaited_signal = signal
+        while not order.done.done():
+            exit_requested = asyncio.ensure_future(self._exit_requested.wait())
+            try:
+                await asyncio.wait((order.done, exit_requested), timeout=self.order_timeout,
+                                   return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                exit_requested.cancel()
+            if order.done.done():
+                break
+            reason = 'an exit signal' if self._exit_requested.is_set() else f"no report in {self.order_timeout}s"
+            logger.warning(f"Settling {signal} order {order.cl_ord_id} over REST: {reason}.")
+            if not await self._order_manager.reconcile(order):
+                # Not acknowledged yet or REST unavailable: wait again, then retry
+                self._exit_requested.clear()
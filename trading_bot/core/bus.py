@@ -0,0 +1,174 @@
+import asyncio
+import itertools
+import logging
+import weakref
+
+logger = logging.getLogger(__name__)
+
+# Named in-memory buses, so components in one process connecting to the same memory:// URL share one
+_memory_buses = {}
+
+# Every bus returned by connect_bus, for the process-wide message counters
+_connections = weakref.WeakSet()
+
+
+def subject_matches(pattern, subject) -> bool:
+    """NATS subject matching: '*' matches one token, a trailing '>' matches one or more."""
+    pattern_tokens = pattern.split('.')
+    subject_tokens = subject.split('.')
+    for i, token in enumerate(pattern_tokens):
+        if token == '>':
+            return len(subject_tokens) > i
+        if i >= len(subject_tokens) or (token != '*' and token != subject_tokens[i]):
+            return False
+    return len(pattern_tokens) == len(subject_tokens)
+
+
+class BusMessage:
+    __slots__ = ('subject', 'data', 'reply', '_bus')
+
+    def __init__(self, subject, data, reply=None, bus=None):
+        self.subject = subject
+        self.data = data
+        self.reply = reply
+        self._bus = bus
+
+    async def respond(self, data: bytes):
+        if self.reply:
+            await self._bus.publish(self.reply, data)
+
+
+class BusSubscription:
+    def __init__(self, bus, subject, cb, queue, max_pending):
+        self.bus = bus
+        self.subject = subject
+        self.queue = queue
+        self.cb = cb
+        self.dropped = 0
+        self._pending = asyncio.Queue(maxsize=max_pending)
+        self._task = asyncio.create_task(self._deliver())
+
+    def _offer(self, msg):
+        try:
+            self._pending.put_nowait(msg)
+            stats = self.bus.stats
+            stats['in_msgs'] += 1
+            stats['in_bytes'] += len(msg.data)
+        except asyncio.QueueFull:
+            # Like a NATS slow consumer: the subscriber loses messages, the publisher never waits
+            self.dropped += 1
+
+    async def _deliver(self):
+        while True:
+            msg = await self._pending.get()
+            try:
+                await self.cb(msg)
+            except Exception as e:
+                logger.error(f"Bus subscriber for {self.subject} failed: {e}", exc_info=True)
+            finally:
+                self._pending.task_done()
+
+    async def unsubscribe(self):
+        self.bus._remove(self)
+        self._task.cancel()
+
+
+class InMemoryBus:
+    """
+    In-process stand-in for the NATS client API the bot uses: publish, subscribe (with
+    wildcards and queue groups), request/respond, flush, drain, close and the `stats`
+    counters. Each subscription is delivered in order by its own task, as with nats-py callbacks. Used for tests and
+    for running multi-component setups in one process without a NATS server.
+    """
+    def __init__(self, max_pending=65536):
+        self.max_pending = max_pending
+        self.is_closed = False
+        self._subscriptions = []
+        self._inbox_ids = itertools.count()
+        self._queue_cursors = {}
+        self.stats = {'in_msgs': 0, 'out_msgs': 0, 'in_bytes': 0, 'out_bytes': 0}
+
+    async def subscribe(self, subject, queue='', cb=None):
+        subscription = BusSubscription(self, subject, cb, queue, self.max_pending)
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def _remove(self, subscription):
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+
+    async def publish(self, subject, payload=b'', reply=''):
+        msg = BusMessage(subject, payload, reply or None, self)
+        self.stats['out_msgs'] += 1
+        self.stats['out_bytes'] += len(payload)
+        groups = {}
+        for subscription in self._subscriptions:
+            if not subject_matches(subscription.subject, subject):
+                continue
+            if subscription.queue:
+                groups.setdefault(subscription.queue, []).append(subscription)
+            else:
+                subscription._offer(msg)
+        # A queue group receives each message once, round-robin across its members
+        for name, members in groups.items():
+            cursor = self._queue_cursors.get(name, 0)
+            members[cursor % len(members)]._offer(msg)
+            self._queue_cursors[name] = cursor + 1
+
+    async def request(self, subject, payload=b'', timeout=1.0):
+        inbox = f"_INBOX.{next(self._inbox_ids)}"
+        response = asyncio.get_running_loop().create_future()
+
+        async def on_reply(msg):
+            if not response.done():
+                response.set_result(msg)
+
+        subscription = await self.subscribe(inbox, cb=on_reply)
+        try:
+            await self.publish(subject, payload, reply=inbox)
+            return await asyncio.wait_for(response, timeout)
+        finally:
+            await subscription.unsubscribe()
+
+    async def flush(self, timeout=None):
+        await asyncio.gather(*(subscription._pending.join() for subscription in list(self._subscriptions)))
+
+    async def drain(self):
+        await self.flush()
+        await self.close()
+
+    async def close(self):
+        for subscription in list(self._subscriptions):
+            await subscription.unsubscribe()
+        self.is_closed = True
+
+
+def _register_metrics():
+    from trading_bot.core.metrics import REGISTRY
+
+    def total(key):
+        return lambda: sum(bus.stats.get(key, 0) for bus in list(_connections))
+
+    messages = REGISTRY.counter('trading_bot_bus_messages_total', 'Messages published (out) and received (in) on NATS',
+                                labels=('direction',))
+    payload = REGISTRY.counter('trading_bot_bus_bytes_total', 'Payload bytes published (out) and received (in) on NATS',
+                               labels=('direction',))
+    for direction in ('in', 'out'):
+        messages.labels(direction=direction).set_function(total(f'{direction}_msgs'))
+        payload.labels(direction=direction).set_function(total(f'{direction}_bytes'))
+
+
+async def connect_bus(url):
+    """Connects to NATS, or returns the shared in-process bus for memory://<name> URLs."""
+    if url.startswith('memory://'):
+        bus = _memory_buses.get(url)
+        if bus is None or bus.is_closed:
+            bus = _memory_buses[url] = InMemoryBus()
+    else:
+        import nats
+        bus = await nats.connect(url)
+    if not _connections:
+        _register_metrics()
+    # nats-py clients keep the same in/out message and byte counts in `stats`
+    _connections.add(bus)
+    return bus
@@ -0,0 +1,213 @@
+import asyncio
+import inspect
+import logging
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Timeframes in minutes. 1m candles are built from trades, the rest are rolled up from 1m.
+DEFAULT_TIMEFRAMES = (1, 5, 15, 60)
+
+
+def parse_ws_timestamp(value) -> float:
+    """Converts a Kraken WS v2 RFC3339 timestamp (or epoch number) to epoch seconds."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    return datetime.fromisoformat(value).timestamp()
+
+
+class _Bucket:
+    """Mutable OHLCV accumulator for a single candle period."""
+    __slots__ = ('start', 'open', 'high', 'low', 'close', 'volume', 'notional')
+
+    def __init__(self, start, open_, high, low, close, volume, notional):
+        self.start = start
+        self.open = open_
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.notional = notional
+
+    def add_trade(self, price, qty):
+        if price > self.high:
+            self.high = price
+        if price < self.low:
+            self.low = price
+        self.close = price
+        self.volume += qty
+        self.notional += price * qty
+
+    def merge(self, other):
+        """Folds a later, finer-grained bucket into this one."""
+        if other.high > self.high:
+            self.high = other.high
+        if other.low < self.low:
+            self.low = other.low
+        self.close = other.close
+        self.volume += other.volume
+        self.notional += other.notional
+
+    def copy(self, start):
+        return _Bucket(start, self.open, self.high, self.low, self.close, self.volume, self.notional)
+
+    def to_candle(self) -> dict:
+        vwap = self.notional / self.volume if self.volume else self.close
+        # Same keys as the columns of the historical CSV files used for backtests
+        return {
+            'timestamp': self.start,
+            'open': self.open,
+            'high': self.high,
+            'low': self.low,
+            'close': self.close,
+            'volume': self.volume,
+            'vwap': vwap
+        }
+
+
+class CandleAggregator:
+    """
+    Builds closed candles for several timeframes from the Kraken WS v2 `trade` channel.
+
+    Each trade updates the open 1m candle in O(1). When a 1m candle closes it is folded
+    into the open candle of every higher timeframe, so a single trade subscription feeds
+    any number of timeframes. Handlers are called exactly once per closed candle, with
+    (symbol, timeframe, candle). Replayed trades (e.g. the snapshot sent after a
+    reconnect) are skipped by trade_id, and late trades for an already closed minute
+    are dropped.
+    """
+    def __init__(self, timeframes=DEFAULT_TIMEFRAMES):
+        timeframes = sorted(set(timeframes) | {1})
+        for tf in timeframes:
+            if not isinstance(tf, int) or tf < 1:
+                raise ValueError(f"Invalid timeframe: {tf}")
+        self.timeframes = tuple(timeframes)
+        self._rollup_timeframes = self.timeframes[1:]
+        self._handlers = {tf: [] for tf in self.timeframes}
+        self._minutes = {}          # symbol -> open 1m _Bucket
+        self._rollups = {}          # symbol -> {timeframe: open _Bucket or None}
+        self._last_trade_id = {}    # symbol -> last trade_id seen
+        self._closed_until = {}     # symbol -> end of the last closed 1m candle
+        self.dropped_trades = 0
+
+    def subscribe(self, handler, timeframe=1):
+        """Registers handler(symbol, timeframe, candle) for closed candles; it may be async."""
+        if timeframe not in self._handlers:
+            raise ValueError(f"Timeframe {timeframe} is not aggregated. Available: {list(self.timeframes)}")
+        self._handlers[timeframe].append(handler)
+
+    def unsubscribe(self, handler, timeframe=1):
+        if handler in self._handlers.get(timeframe, []):
+            self._handlers[timeframe].remove(handler)
+
+    # --- Trade ingestion ---
+
+    def add_trade(self, symbol, price, qty, timestamp, trade_id=None) -> list:
+        """
+        Applies a single trade and returns the list of (symbol, timeframe, candle)
+        events for candles that closed because of it.
+        """
+        if trade_id is not None:
+            last_id = self._last_trade_id.get(symbol)
+            if last_id is not None and trade_id <= last_id:
+                return []
+            self._last_trade_id[symbol] = trade_id
+
+        minute_start = int(timestamp // 60) * 60
+        if minute_start < self._closed_until.get(symbol, 0):
+            self.dropped_trades += 1
+            logger.debug(f"Dropped late trade for {symbol} at {timestamp}")
+            return []
+
+        events = []
+        bucket = self._minutes.get(symbol)
+        if bucket is not None and bucket.start != minute_start:
+            self._close_minute(symbol, bucket, events)
+            bucket = None
+
+        if bucket is None:
+            self._minutes[symbol] = _Bucket(minute_start, price, price, price, price, qty, price * qty)
+        else:
+            bucket.add_trade(price, qty)
+        return events
+
+    def close_elapsed(self, now=None) -> list:
+        """
+        Closes candles whose period has fully elapsed at `now` even if no later trade
+        has arrived yet. Intended to be driven by a clock (see `run_clock`).
+        """
+        now = time.time() if now is None else now
+        events = []
+        for symbol, bucket in list(self._minutes.items()):
+            if bucket is not None and bucket.start + 60 <= now:
+                self._close_minute(symbol, bucket, events)
+        for symbol, rollups in self._rollups.items():
+            for tf, rollup in rollups.items():
+                if rollup is not None and rollup.start + tf * 60 <= now:
+                    rollups[tf] = None
+                    events.append((symbol, tf, rollup.to_candle()))
+        return events
+
+    def _close_minute(self, symbol, bucket, events):
+        self._minutes[symbol] = None
+        self._closed_until[symbol] = bucket.start + 60
+        events.append((symbol, 1, bucket.to_candle()))
+
+        rollups = self._rollups.setdefault(symbol, dict.fromkeys(self._rollup_timeframes))
+        for tf in self._rollup_timeframes:
+            period = tf * 60
+            start = bucket.start - bucket.start % period
+            rollup = rollups[tf]
+            if rollup is not None and rollup.start != start:
+                # A gap in trading skipped the end of the previous period
+                events.append((symbol, tf, rollup.to_candle()))
+                rollup = None
+            if rollup is None:
+                rollup = bucket.copy(start)
+            else:
+                rollup.merge(bucket)
+
+            if bucket.start + 60 == start + period:
+                rollups[tf] = None
+                events.append((symbol, tf, rollup.to_candle()))
+            else:
+                rollups[tf] = rollup
+
+    # --- Event dispatch ---
+
+    async def dispatch(self, events):
+        for symbol, timeframe, candle in events:
+            for handler in self._handlers[timeframe]:
+                try:
+                    result = handler(symbol, timeframe, candle)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception as e:
+                    logger.error(f"Candle handler failed for {symbol} {timeframe}m: {e}", exc_info=True)
+
+    async def on_message(self, message):
+        """KrakenWS callback for the v2 `trade` channel."""
+        if message.get('channel') != 'trade':
+            return
+        events = []
+        for trade in message.get('data', []):
+            events.extend(self.add_trade(
+                trade['symbol'],
+                float(trade['price']),
+                float(trade['qty']),
+                parse_ws_timestamp(trade['timestamp']),
+                trade.get('trade_id')
+            ))
+        if events:
+            await self.dispatch(events)
+
+    async def run_clock(self, interval=1.0, grace=2.0):
+        """Periodically closes elapsed candles so quiet markets still emit on time."""
+        while True:
+            await asyncio.sleep(interval)
+            events = self.close_elapsed(time.time() - grace)
+            if events:
+                await self.dispatch(events)
@@ -0,0 +1,125 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Optional default directory for backtest checkpoints (Bot(checkpoint_dir=...) overrides it)
+CHECKPOINT_DIR = os.getenv('BACKTEST_CHECKPOINT_DIR')
+
+FORMAT_VERSION = 1
+
+
+def config_digest(config: dict) -> str:
+    """Hash of the effective strategy config (after overrides); module internals are ignored."""
+    relevant = {key: value for key, value in config.items() if not key.startswith('__')}
+    encoded = json.dumps(relevant, sort_keys=True, default=repr).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+class PrefixDigests:
+    """
+    Digests of prefixes of one dataset. Growing prefixes extend a single running hash, so
+    matching a checkpoint and then writing the next one hashes every byte once.
+    """
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self._hasher = hashlib.blake2b(digest_size=16)
+        self._position = 0
+        self._digests = {}
+
+    def __call__(self, length) -> str:
+        digest = self._digests.get(length)
+        if digest is None:
+            if length < self._position:
+                digest = hashlib.blake2b(self.data[:length], digest_size=16).hexdigest()
+            else:
+                self._hasher.update(self.data[self._position:length])
+                self._position = length
+                digest = self._hasher.hexdigest()
+            self._digests[length] = digest
+        return digest
+
+
+def _paths(directory, key):
+    return glob.glob(os.path.join(directory, f"{key}-*.ckpt"))
+
+
+def _read_header(path):
+    try:
+        with open(path, 'rb') as f:
+            header = pickle.load(f)
+        return header if isinstance(header, dict) and header.get('version') == FORMAT_VERSION else None
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+
+
+def find_checkpoint(directory, key, digests: PrefixDigests):
+    """
+    The checkpoint for `key` (strategy + config) covering the longest prefix of the
+    dataset. Returns (path, header, state) or None. A checkpoint only matches if the
+    bytes it was taken on are, hash for hash, the start of the current dataset.
+    """
+    candidates = []
+    for path in _paths(directory, key):
+        header = _read_header(path)
+        if header is not None and header['length'] <= len(digests.data):
+            candidates.append((header['length'], path, header))
+    for length, path, header in sorted(candidates, key=lambda c: c[0], reverse=True):
+        if digests(length) != header['digest']:
+            continue
+        try:
+            with open(path, 'rb') as f:
+                pickle.load(f)
+                state = pickle.load(f)
+        except Exception as e:
+            # Typically a strategy whose class changed shape; the run simply starts over
+            logger.warning(f"Ignoring unreadable checkpoint {path}: {e}")
+            continue
+        return path, header, state
+    return None
+
+
+def save_checkpoint(directory, key, digests: PrefixDigests, rows, state, replaces=None):
+    """
+    Writes a checkpoint for the whole dataset (`rows` rows) and removes the one it was
+    resumed from. Returns the path, or None if the state cannot be pickled.
+    """
+    length = len(digests.data)
+    header = {'version': FORMAT_VERSION, 'length': length, 'rows': rows, 'digest': digests(length)}
+    path = os.path.join(directory, f"{key}-{header['digest']}.ckpt")
+    try:
+        payload = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        logger.warning(f"Backtest state is not picklable, no checkpoint written: {e}")
+        return None
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.write(payload)
+    os.replace(tmp_path, path)
+    if replaces and replaces != path:
+        try:
+            os.remove(replaces)
+        except OSError:
+            pass
+    return path
+
+
+def pack_history(history) -> dict:
+    """Portfolio history as two arrays: far smaller and faster to pickle than a list of dicts."""
+    return {
+        'timestamp': np.array([point['timestamp'] for point in history]),
+        'portfolio_value': np.array([point['portfolio_value'] for point in history], dtype=float),
+    }
+
+
+def concat_history(*packed) -> dict:
+    packed = [p for p in packed if p is not None]
+    return {column: np.concatenate([p[column] for p in packed]) for column in ('timestamp', 'portfolio_value')}
@@ -1,64 +1,197 @@
 import asyncpg
 import logging
+import math
+import time
 import uuid
 import json
+import zlib
+from decimal import Decimal
+import numpy as np
+from trading_bot.config import cfg
+from trading_bot.core.metrics import REGISTRY
+from trading_bot.core.migrations import migrate
+from trading_bot.core.trade_journal import TradeJournal, TRADE_COLUMNS
 
 logger = logging.getLogger(__name__)
 
+BACKTEST_RUN_COLUMNS = (
+    'run_id', 'strategy_id', 'iteration_number', 'parameters_used', 'sharpe_ratio', 'max_drawdown',
+    'final_equity', 'passed_criteria', 'metrics', 'trades', 'trade_count', 'equity_curve',
+    'equity_timestamps', 'equity_points', 'dataset_fingerprint'
+)
+
+# --- Equity curve encoding ---
+
+def encode_curve(values) -> bytes:
+    """zlib-compressed little-endian float64 values."""
+    return zlib.compress(np.ascontiguousarray(values, dtype='<f8').tobytes())
+
+def decode_curve(blob) -> np.ndarray:
+    """Inverse of encode_curve. The array is a read-only view over the decompressed buffer."""
+    return np.frombuffer(zlib.decompress(blob), dtype='<f8')
+
+def encode_timestamps(timestamps) -> bytes:
+    """Delta-encoded int64 timestamps; regular candle spacing compresses to almost nothing."""
+    ts = np.asarray(timestamps, dtype='<i8')
+    return zlib.compress(np.diff(ts, prepend=0).astype('<i8').tobytes())
+
+def decode_timestamps(blob) -> np.ndarray:
+    return np.cumsum(np.frombuffer(zlib.decompress(blob), dtype='<i8'))
+
+def _json_safe(value):
+    """Converts NumPy scalars and non-finite floats (e.g. an infinite win/loss ratio) to JSON-valid values."""
+    if isinstance(value, dict):
+        return {str(k): _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+def _numeric(value):
+    if value is None:
+        return None
+    value = float(value)
+    return Decimal(repr(value)) if math.isfinite(value) else None
+
+
+def open_database(db_url):
+    """
+    Returns the storage backend for a DB_URL: SQLiteDatabase for sqlite:// URLs
+    (embedded, no server), Database (Postgres) otherwise.
+    """
+    if db_url.startswith('sqlite://'):
+        from trading_bot.core.sqlite_database import SQLiteDatabase
+        return SQLiteDatabase(db_url)
+    return Database(db_url)
+
+
+_shared_database = None
+
+
+def shared_database():
+    """The process-wide database for DB_URL, created on first use (it connects on connect())."""
+    global _shared_database
+    if _shared_database is None:
+        _shared_database = open_database(cfg.DB_URL)
+    return _shared_database
+
+
+class _TimedAcquire:
+    """pool.acquire() that records how long the caller waited for a connection."""
+    __slots__ = ('_acquire', '_histogram')
+
+    def __init__(self, acquire, histogram):
+        self._acquire = acquire
+        self._histogram = histogram
+
+    async def __aenter__(self):
+        started = time.perf_counter_ns()
+        conn = await self._acquire.__aenter__()
+        self._histogram.record(time.perf_counter_ns() - started)
+        return conn
+
+    async def __aexit__(self, *exc):
+        return await self._acquire.__aexit__(*exc)
+
+
 class Database:
     def __init__(self, db_url):
         self.db_url = db_url
         self.pool = None
+        self.journal = TradeJournal(self)
+        self.acquire_latency = REGISTRY.histogram(
+            'trading_bot_db_pool_acquire_seconds', 'Time spent waiting for a pooled Postgres connection').labels()
+        self._register_metrics()
+
+    def _register_metrics(self):
+        # Read at scrape time, so an idle pool costs nothing
+        connections = REGISTRY.gauge('trading_bot_db_pool_connections', 'Postgres pool connections by state',
+                                     labels=('state',))
+        connections.labels(state='idle').set_function(lambda: self.pool.get_idle_size() if self.pool else 0)
+        connections.labels(state='busy').set_function(
+            lambda: self.pool.get_size() - self.pool.get_idle_size() if self.pool else 0)
+        REGISTRY.gauge('trading_bot_db_pool_max_connections', 'Postgres pool size limit').labels().set_function(
+            lambda: self.pool.get_max_size() if self.pool else 0)
+        REGISTRY.gauge('trading_bot_trade_journal_pending', 'Trades queued for the write-behind journal').labels() \
+            .set_function(lambda: self.journal.pending)
+
+    def _acquire(self):
+        return _TimedAcquire(self.pool.acquire(), self.acquire_latency)
 
     async def connect(self):
         try:
             self.pool = await asyncpg.create_pool(self.db_url)
             await self._init_tables()
+            await self.journal.start()
             logger.info("Connected to PostgreSQL")
         except Exception as e:
             logger.error(f"Database connection failed: {e}")
             raise
 
     async def _init_tables(self):
-        async with self.pool.acquire() as conn:
-            # Initialize trades table (existing)
-            trades_query = """
-            CREATE TABLE IF NOT EXISTS trades (
-                id SERIAL PRIMARY KEY,
-                timestamp TIMESTAMPTZ DEFAULT NOW(),
-                symbol VARCHAR(20),
-                side VARCHAR(20),
-                price DECIMAL,
-                amount DECIMAL,
-                mode VARCHAR(10),
-                strategy VARCHAR(20)
-            );
-            """
-            await conn.execute(trades_query)
+        # Versioned migrations; a single query when the schema is already current
+        async with self._acquire() as conn:
+            await migrate(conn)
+
+    async def save_trade(self, symbol, side, price, amount, mode, strategy, fill_time=None, pnl=None):
+        query = """
+        INSERT INTO trades (fill_time, symbol, side, price, amount, pnl, mode, strategy)
+        VALUES (COALESCE($1, NOW()), $2, $3, $4, $5, $6, $7, $8)
+        """
+        async with self._acquire() as conn:
+            await conn.execute(query, fill_time, symbol, side, Decimal(str(price)), Decimal(str(amount)),
+                               Decimal(str(pnl)) if pnl is not None else None, mode, strategy)
+            logger.info(f"Trade saved to DB: {side} {symbol}")
 
-            # Initialize strategy_definitions table
-            with open('trading_bot/core/sql/schema.sql', 'r') as f:
-                schema_query = f.read()
-            await conn.execute(schema_query)
+    def record_trade(self, symbol, side, price, amount, mode, strategy, fill_time=None, pnl=None):
+        """Queues a trade for the write-behind journal; never waits on Postgres."""
+        self.journal.record(symbol, side, price, amount, mode, strategy, fill_time=fill_time, pnl=pnl)
 
-            # Initialize backtest_runs table
-            with open('trading_bot/core/sql/backtest_runs.sql', 'r') as f:
-                backtest_schema_query = f.read()
-            await conn.execute(backtest_schema_query)
+    async def copy_trades(self, records):
+        """Bulk-inserts journal records (see TRADE_COLUMNS) with COPY."""
+        async with self._acquire() as conn:
+            await conn.copy_records_to_table('trades', records=records, columns=list(TRADE_COLUMNS))
 
-            # Initialize live_strategies table
-            with open('trading_bot/core/sql/live_strategies.sql', 'r') as f:
-                live_schema_query = f.read()
-            await conn.execute(live_schema_query)
+    async def ensure_trade_partitions(self, months_ahead=2):
+        """Creates monthly trades partitions from the current month; call periodically in long runs."""
+        async with self._acquire() as conn:
+            await conn.execute("SELECT ensure_trade_partitions(CURRENT_DATE, $1)", months_ahead)
 
-    async def save_trade(self, symbol, side, price, amount, mode, strategy):
+    async def get_trades(self, strategy, start, end, symbol=None, limit=None) -> list:
+        """Trades of a strategy with start <= fill_time < end, oldest first."""
         query = """
-        INSERT INTO trades (symbol, side, price, amount, mode, strategy)
-        VALUES ($1, $2, $3, $4, $5, $6)
+        SELECT fill_time, symbol, side, price, amount, pnl, mode, strategy
+        FROM trades
+        WHERE strategy = $1 AND fill_time >= $2 AND fill_time < $3
+          AND ($4::varchar IS NULL OR symbol = $4)
+        ORDER BY fill_time
+        LIMIT $5
         """
-        async with self.pool.acquire() as conn:
-            await conn.execute(query, symbol, side, price, amount, mode, strategy)
-            logger.info(f"Trade saved to DB: {side} {symbol}")
+        async with self._acquire() as conn:
+            records = await conn.fetch(query, strategy, start, end, symbol, limit)
+        return [dict(record) for record in records]
+
+    async def get_daily_pnl(self, strategy, start, end, symbol=None, mode=None) -> list:
+        """Realized P&L, trade count and traded notional per UTC day and symbol."""
+        query = """
+        SELECT (date_trunc('day', fill_time AT TIME ZONE 'UTC'))::date AS day,
+               symbol,
+               COUNT(*) AS trades,
+               COALESCE(SUM(pnl), 0) AS realized_pnl,
+               SUM(price * amount) AS notional
+        FROM trades
+        WHERE strategy = $1 AND fill_time >= $2 AND fill_time < $3
+          AND ($4::varchar IS NULL OR symbol = $4)
+          AND ($5::varchar IS NULL OR mode = $5)
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+        """
+        async with self._acquire() as conn:
+            records = await conn.fetch(query, strategy, start, end, symbol, mode)
+        return [dict(record) for record in records]
 
     async def save_strategy(self, source_url: str, raw_text: str, structured_json: dict) -> str:
         """Saves a new strategy definition to the database and returns its ID."""
@@ -68,45 +201,258 @@ class Database:
         INSERT INTO strategy_definitions (strategy_id, source_url, raw_text, structured_json)
         VALUES ($1, $2, $3, $4)
         """
-        async with self.pool.acquire() as conn:
+        async with self._acquire() as conn:
             await conn.execute(query, strategy_id, source_url, raw_text, json_str)
             logger.info(f"Strategy saved to DB with ID: {strategy_id}")
         return str(strategy_id)
 
-    async def save_backtest_run(self, strategy_id: str, iteration: int, params: dict, results: dict) -> str:
-        """Saves the results of a backtest run to the database."""
-        run_id = uuid.uuid4()
-        params_json = json.dumps(params)
+    @staticmethod
+    def _backtest_record(strategy_id, iteration, params, results, equity_curve=None, equity_timestamps=None,
+                         trades=None, dataset_fingerprint=None) -> tuple:
+        """Builds one backtest_runs row (see BACKTEST_RUN_COLUMNS)."""
+        curve = None if equity_curve is None else np.asarray(equity_curve, dtype='<f8')
+        return (
+            uuid.uuid4(), uuid.UUID(str(strategy_id)), iteration, json.dumps(_json_safe(params or {})),
+            _numeric(results.get('sharpe_ratio')), _numeric(results.get('max_drawdown')),
+            _numeric(results.get('final_equity')), results.get('passed_criteria'),
+            json.dumps(_json_safe(results)),
+            json.dumps(_json_safe(trades)) if trades is not None else None,
+            len(trades) if trades is not None else results.get('total_trades'),
+            encode_curve(curve) if curve is not None else None,
+            encode_timestamps(equity_timestamps) if equity_timestamps is not None else None,
+            len(curve) if curve is not None else None,
+            dataset_fingerprint,
+        )
+
+    async def save_backtest_run(self, strategy_id: str, iteration: int, params: dict, results: dict,
+                                equity_curve=None, equity_timestamps=None, trades=None,
+                                dataset_fingerprint=None) -> str:
+        """
+        Saves the results of a backtest run to the database, optionally with its artifacts:
+        the equity curve (values and timestamps), the trade list and the dataset fingerprint.
+        """
+        record = self._backtest_record(strategy_id, iteration, params, results, equity_curve,
+                                       equity_timestamps, trades, dataset_fingerprint)
+        placeholders = ', '.join(f'${i}' for i in range(1, len(BACKTEST_RUN_COLUMNS) + 1))
+        query = f"INSERT INTO backtest_runs ({', '.join(BACKTEST_RUN_COLUMNS)}) VALUES ({placeholders})"
+        async with self._acquire() as conn:
+            await conn.execute(query, *record)
+            logger.info(f"Backtest run saved to DB with ID: {record[0]}")
+        return str(record[0])
+
+    async def copy_backtest_runs(self, runs) -> list:
+        """
+        Bulk-inserts sweep results with a single COPY. Each run is a dict with the
+        save_backtest_run arguments (strategy_id, iteration, params, results and the
+        optional artifacts). Returns the new run IDs in input order.
+        """
+        records = [
+            self._backtest_record(run['strategy_id'], run.get('iteration'), run.get('params'), run['results'],
+                                  run.get('equity_curve'), run.get('equity_timestamps'), run.get('trades'),
+                                  run.get('dataset_fingerprint'))
+            for run in runs
+        ]
+        async with self._acquire() as conn:
+            await conn.copy_records_to_table('backtest_runs', records=records, columns=list(BACKTEST_RUN_COLUMNS))
+        logger.info(f"Bulk-saved {len(records)} backtest runs.")
+        return [str(record[0]) for record in records]
+
+    async def import_records(self, table, columns, records):
+        """
+        Bulk-loads rows that may already exist (e.g. pushed by SQLiteDatabase.sync_to):
+        COPY into a temporary table, then insert, skipping rows whose key is taken.
+        """
+        async with self._acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(f"CREATE TEMP TABLE import_{table} (LIKE {table}) ON COMMIT DROP")
+                await conn.copy_records_to_table(f'import_{table}', records=records, columns=list(columns))
+                await conn.execute(f"""
+                INSERT INTO {table} ({', '.join(columns)})
+                SELECT {', '.join(columns)} FROM import_{table}
+                ON CONFLICT DO NOTHING
+                """)
+
+    # --- Backtest run queries ---
+
+    async def get_top_runs(self, strategy_id=None, n=10, dataset_fingerprint=None) -> list:
+        """
+        Best runs by Sharpe ratio: the top n of one strategy, or the top n of every
+        strategy when strategy_id is None. Artifacts are not loaded.
+        """
+        ranked = """
+            SELECT b.run_id, b.strategy_id, b.iteration_number, b.parameters_used, b.sharpe_ratio,
+                   b.max_drawdown, b.final_equity, b.trade_count, b.dataset_fingerprint, b.created_at
+            FROM backtest_runs b
+            WHERE b.strategy_id = {strategy}
+              AND ($1::varchar IS NULL OR b.dataset_fingerprint = $1)
+              AND b.sharpe_ratio IS NOT NULL
+            ORDER BY b.sharpe_ratio DESC NULLS LAST
+            LIMIT $2
+        """
+        args = [dataset_fingerprint, n]
+        if strategy_id is not None:
+            query = ranked.format(strategy='$3')
+            args.append(uuid.UUID(str(strategy_id)))
+        else:
+            # One index range scan per strategy instead of ranking the whole table
+            query = f"""
+            SELECT top.* FROM strategy_definitions s
+            CROSS JOIN LATERAL ({ranked.format(strategy='s.strategy_id')}) top
+            ORDER BY top.strategy_id, top.sharpe_ratio DESC
+            """
+        async with self._acquire() as conn:
+            records = await conn.fetch(query, *args)
+        return [self._run_summary(record) for record in records]
+
+    async def get_runs_in_region(self, strategy_id, region: dict, limit=1000) -> list:
+        """
+        Runs of a strategy whose parameters fall in a region. Each region entry is either
+        an exact value ({'sma_period': 20}, answered by the GIN index) or an inclusive
+        (low, high) range ({'stop_loss_pct': (1.0, 3.0)}). Best Sharpe first.
+        """
+        exact = {name: value for name, value in region.items() if not isinstance(value, (list, tuple))}
+        clauses = []
+        args = [uuid.UUID(str(strategy_id)), json.dumps(_json_safe(exact)), limit]
+        for name, bounds in region.items():
+            if name in exact:
+                continue
+            low, high = bounds
+            args.extend([name, low, high])
+            i = len(args)
+            clauses.append(f"AND (b.parameters_used->>${i - 2})::numeric BETWEEN ${i - 1} AND ${i}")
+        query = f"""
+        SELECT b.run_id, b.strategy_id, b.iteration_number, b.parameters_used, b.sharpe_ratio,
+               b.max_drawdown, b.final_equity, b.trade_count, b.dataset_fingerprint, b.created_at
+        FROM backtest_runs b
+        WHERE b.strategy_id = $1 AND b.parameters_used @> $2::jsonb
+        {' '.join(clauses)}
+        ORDER BY b.sharpe_ratio DESC NULLS LAST
+        LIMIT $3
+        """
+        async with self._acquire() as conn:
+            records = await conn.fetch(query, *args)
+        return [self._run_summary(record) for record in records]
+
+    async def get_backtest_run(self, run_id) -> dict:
+        """One run with all of its artifacts decoded, or None."""
+        query = """
+        SELECT run_id, strategy_id, iteration_number, parameters_used, sharpe_ratio, max_drawdown,
+               final_equity, passed_criteria, metrics, trades, trade_count, equity_curve,
+               equity_timestamps, equity_points, dataset_fingerprint, created_at
+        FROM backtest_runs WHERE run_id = $1
+        """
+        async with self._acquire() as conn:
+            record = await conn.fetchrow(query, uuid.UUID(str(run_id)))
+        if record is None:
+            return None
+        run = self._run_summary(record)
+        run['passed_criteria'] = record['passed_criteria']
+        run['metrics'] = json.loads(record['metrics']) if record['metrics'] else None
+        run['trades'] = json.loads(record['trades']) if record['trades'] else None
+        run['equity_curve'] = decode_curve(record['equity_curve']) if record['equity_curve'] else None
+        run['equity_timestamps'] = (decode_timestamps(record['equity_timestamps'])
+                                    if record['equity_timestamps'] else None)
+        return run
+
+    async def get_equity_curves(self, run_ids) -> dict:
+        """run_id -> (timestamps, values) for several runs in one round trip."""
         query = """
-        INSERT INTO backtest_runs (run_id, strategy_id, iteration_number, parameters_used,
-                                   sharpe_ratio, max_drawdown, final_equity, passed_criteria)
-        VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-        """
-        async with self.pool.acquire() as conn:
-            await conn.execute(query, run_id, uuid.UUID(strategy_id), iteration, params_json,
-                               results.get('sharpe_ratio'), results.get('max_drawdown'),
-                               results.get('final_equity'), results.get('passed_criteria'))
-            logger.info(f"Backtest run saved to DB with ID: {run_id}")
-        return str(run_id)
-
-    async def add_live_strategy(self, strategy_id: str, container_id: str):
-        """Adds a new live strategy to the database."""
+        SELECT run_id, equity_curve, equity_timestamps
+        FROM backtest_runs WHERE run_id = ANY($1::uuid[]) AND equity_curve IS NOT NULL
+        """
+        async with self._acquire() as conn:
+            records = await conn.fetch(query, [uuid.UUID(str(run_id)) for run_id in run_ids])
+        return {
+            str(record['run_id']): (
+                decode_timestamps(record['equity_timestamps']) if record['equity_timestamps'] else None,
+                decode_curve(record['equity_curve'])
+            )
+            for record in records
+        }
+
+    async def compare_equity_curves(self, base_run_id, other_run_id) -> dict:
+        """
+        Compares two runs over their common timestamps (or bar by bar when timestamps
+        were not stored): total returns, correlation of per-bar returns and the largest
+        gap between the curves normalized to their starting equity.
+        """
+        curves = await self.get_equity_curves([base_run_id, other_run_id])
+        if str(base_run_id) not in curves or str(other_run_id) not in curves:
+            raise ValueError("Both runs need a stored equity curve to be compared.")
+        base_ts, base = curves[str(base_run_id)]
+        other_ts, other = curves[str(other_run_id)]
+        if base_ts is not None and other_ts is not None:
+            _, base_idx, other_idx = np.intersect1d(base_ts, other_ts, assume_unique=True, return_indices=True)
+            base, other = base[base_idx], other[other_idx]
+        else:
+            points = min(len(base), len(other))
+            base, other = base[:points], other[:points]
+        if len(base) < 2:
+            raise ValueError("The runs share fewer than two equity points.")
+        base_norm, other_norm = base / base[0], other / other[0]
+        base_ret, other_ret = np.diff(base) / base[:-1], np.diff(other) / other[:-1]
+        correlation = (float(np.corrcoef(base_ret, other_ret)[0, 1])
+                       if base_ret.std() > 0 and other_ret.std() > 0 else None)
+        return {
+            'points': len(base),
+            'base_return': float(base_norm[-1] - 1),
+            'other_return': float(other_norm[-1] - 1),
+            'return_correlation': correlation,
+            'max_gap': float(np.max(np.abs(other_norm - base_norm))),
+            'tracking_error': float(np.std(other_ret - base_ret)),
+        }
+
+    @staticmethod
+    def _run_summary(record) -> dict:
+        return {
+            'run_id': str(record['run_id']),
+            'strategy_id': str(record['strategy_id']),
+            'iteration': record['iteration_number'],
+            'parameters': json.loads(record['parameters_used']) if record['parameters_used'] else {},
+            'sharpe_ratio': float(record['sharpe_ratio']) if record['sharpe_ratio'] is not None else None,
+            'max_drawdown': float(record['max_drawdown']) if record['max_drawdown'] is not None else None,
+            'final_equity': float(record['final_equity']) if record['final_equity'] is not None else None,
+            'trade_count': record['trade_count'],
+            'dataset_fingerprint': record['dataset_fingerprint'],
+            'created_at': record['created_at'],
+        }
+
+    async def add_live_strategy(self, strategy_id: str, container_id: str = None, host_id: str = None, slot: int = None):
+        """
+        Adds a new live strategy to the database: either a container ID, or the
+        StrategyHost and slot it runs in.
+        """
         query = """
-        INSERT INTO live_strategies (strategy_id, container_id)
-        VALUES ($1, $2)
-        ON CONFLICT (strategy_id) DO UPDATE SET container_id = $2;
+        INSERT INTO live_strategies (strategy_id, container_id, host_id, slot)
+        VALUES ($1, $2, $3, $4)
+        ON CONFLICT (strategy_id) DO UPDATE SET container_id = $2, host_id = $3, slot = $4, deployed_at = now();
         """
-        async with self.pool.acquire() as conn:
-            await conn.execute(query, uuid.UUID(strategy_id), container_id)
-            logger.info(f"Live strategy {strategy_id} with container {container_id} saved to DB.")
+        async with self._acquire() as conn:
+            await conn.execute(query, uuid.UUID(strategy_id), container_id, host_id, slot)
+            target = f"container {container_id}" if container_id else f"host {host_id} slot {slot}"
+            logger.info(f"Live strategy {strategy_id} with {target} saved to DB.")
+
+    async def remove_live_strategy(self, strategy_id: str):
+        async with self._acquire() as conn:
+            await conn.execute("DELETE FROM live_strategies WHERE strategy_id = $1", uuid.UUID(strategy_id))
 
     async def get_live_strategies(self) -> dict:
-        """Retrieves a mapping of all live strategies and their container IDs."""
-        query = "SELECT strategy_id, container_id FROM live_strategies;"
-        async with self.pool.acquire() as conn:
+        """Retrieves a mapping of the live strategies running in containers to their container IDs."""
+        query = "SELECT strategy_id, container_id FROM live_strategies WHERE container_id IS NOT NULL;"
+        async with self._acquire() as conn:
             records = await conn.fetch(query)
         return {str(record['strategy_id']): record['container_id'] for record in records}
 
+    async def get_live_deployments(self) -> dict:
+        """strategy_id -> {'strategy_id', 'container_id', 'host_id', 'slot'} for every live strategy."""
+        query = "SELECT strategy_id, container_id, host_id, slot FROM live_strategies;"
+        async with self._acquire() as conn:
+            records = await conn.fetch(query)
+        return {str(record['strategy_id']): {'strategy_id': str(record['strategy_id']), 'container_id': record['container_id'],
+                                             'host_id': record['host_id'], 'slot': record['slot']} for record in records}
+
     async def close(self):
+        # Flush pending trades before the pool goes away
+        await self.journal.close()
         if self.pool:
             await self.pool.close()
\ No newline at end of file
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import logging
+import os
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Same column order as the historical CSV files read by Bot.run_backtest
+CANDLE_COLUMNS = (
+    ('timestamp', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+    ('vwap', '<f8'),
+)
+
+
+def _write_json_atomic(path, payload):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class CandleSeries:
+    """
+    Append-only columnar storage for the candles of one pair and interval.
+
+    Every column is a raw little-endian file, so reads are memory-mapped without copying.
+    `meta.json` holds the committed row count; bytes written past it by an interrupted
+    append are truncated the next time the series is opened.
+    """
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._meta_path = os.path.join(path, 'meta.json')
+        self._checkpoint_path = os.path.join(path, 'checkpoint.json')
+        self.meta = self._load_meta()
+        self._repair()
+
+    def _load_meta(self):
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, 'r') as f:
+                return json.load(f)
+        return {'rows': 0, 'last_timestamp': None, 'columns': [name for name, _ in CANDLE_COLUMNS]}
+
+    def _column_path(self, name):
+        return os.path.join(self.path, f"{name}.bin")
+
+    def _repair(self):
+        rows = self.meta['rows']
+        for name, dtype in CANDLE_COLUMNS:
+            column_path = self._column_path(name)
+            expected = rows * np.dtype(dtype).itemsize
+            if not os.path.exists(column_path):
+                open(column_path, 'wb').close()
+            elif os.path.getsize(column_path) != expected:
+                logger.warning(f"Truncating uncommitted rows in {column_path}")
+                with open(column_path, 'r+b') as f:
+                    f.truncate(expected)
+
+    def __len__(self):
+        return self.meta['rows']
+
+    @property
+    def last_timestamp(self):
+        return self.meta['last_timestamp']
+
+    def append(self, rows) -> int:
+        """
+        Appends candles given as (timestamp, open, high, low, close, volume, vwap) tuples.
+        Rows at or before the last stored timestamp are skipped, so replaying a page after
+        a crash never duplicates data. Returns the number of rows written.
+        """
+        last = self.meta['last_timestamp']
+        rows = [row for row in rows if last is None or row[0] > last]
+        if not rows:
+            return 0
+        rows.sort(key=lambda row: row[0])
+
+        columns = list(zip(*rows))
+        for (name, dtype), values in zip(CANDLE_COLUMNS, columns):
+            with open(self._column_path(name), 'ab') as f:
+                f.write(np.asarray(values, dtype=dtype).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+        self.meta['rows'] += len(rows)
+        self.meta['last_timestamp'] = int(rows[-1][0])
+        _write_json_atomic(self._meta_path, self.meta)
+        return len(rows)
+
+    def read(self, start=None, end=None) -> dict:
+        """Returns memory-mapped column arrays, optionally limited to [start, end) timestamps."""
+        rows = self.meta['rows']
+        columns = {}
+        for name, dtype in CANDLE_COLUMNS:
+            if rows == 0:
+                columns[name] = np.empty(0, dtype=dtype)
+            else:
+                columns[name] = np.memmap(self._column_path(name), dtype=dtype, mode='r', shape=(rows,))
+        if rows and (start is not None or end is not None):
+            ts = columns['timestamp']
+            lo = np.searchsorted(ts, start, side='left') if start is not None else 0
+            hi = np.searchsorted(ts, end, side='left') if end is not None else rows
+            columns = {name: values[lo:hi] for name, values in columns.items()}
+        return columns
+
+    def to_frame(self, start=None, end=None):
+        import pandas as pd
+        return pd.DataFrame({name: np.asarray(values) for name, values in self.read(start, end).items()})
+
+    def export_csv(self, csv_path, start=None, end=None):
+        """Writes the series in the header-less CSV layout expected by Bot.run_backtest."""
+        self.to_frame(start, end).to_csv(csv_path, header=False, index=False)
+
+    # --- Backfill checkpoints ---
+
+    def load_checkpoint(self) -> dict:
+        if os.path.exists(self._checkpoint_path):
+            with open(self._checkpoint_path, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def save_checkpoint(self, checkpoint: dict):
+        _write_json_atomic(self._checkpoint_path, checkpoint)
+
+
+class DataStore:
+    """Local on-disk market data store: one CandleSeries per (pair, interval)."""
+    def __init__(self, root='trading_bot/data/store'):
+        self.root = root
+        self._series = {}
+
+    def series(self, pair, interval=1) -> CandleSeries:
+        key = (pair, interval)
+        if key not in self._series:
+            safe_pair = pair.replace('/', '')
+            self._series[key] = CandleSeries(os.path.join(self.root, safe_pair, f"{interval}m"))
+        return self._series[key]
+
+
+def fingerprint_file(path, chunk_size=1 << 20) -> str:
+    """Content hash of a dataset file, so stored runs can be tied to the exact data they used."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -1,12 +1,21 @@
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
 from trading_bot.config import cfg
 
 logger = logging.getLogger(__name__)
 
+# Trade side recorded for each signal
+SIGNAL_SIDES = {'BUY': 'buy', 'SELL': 'sell', 'SELL_SHORT': 'sell_short', 'COVER_SHORT': 'cover_short'}
+EXIT_SIGNALS = ('SELL', 'COVER_SHORT')
+
 class ExecutionEngine:
-    def __init__(self, kraken_rest, database):
+    def __init__(self, kraken_rest, database, risk_params=None, symbol=None, strategy_name=None):
         self.mode = cfg.TRADING_MODE
+        # Per-engine market and name, so several engines can trade in one process
+        self.symbol = symbol or cfg.SYMBOL
+        self.strategy_name = strategy_name or cfg.STRATEGY_NAME
+        # stop_loss_pct / take_profit_pct; defaults to the configured strategy's entry in strategies.json
+        self.risk_params = risk_params
         self.rest = kraken_rest
         self.db = database
         self.balance = cfg.CAPITAL
@@ -18,6 +27,11 @@ class ExecutionEngine:
         self.short_proceeds = 0
         self.trades = []
         self.portfolio_history = []
+        # Optional OrderManager: LIVE orders are then submitted without waiting for the
+        # exchange and the optimistic state is reconciled from the actual fills
+        self.order_manager = None
+        self.pending_order = None   # the LIVE order whose fills have not been reconciled yet
+        self._order_seq = 0
 
     async def execute_order(self, signal, current_price, timestamp):
         """
@@ -25,20 +39,15 @@ class ExecutionEngine:
         """
         amount = 0
         executed_price = current_price
-        strategy_params = cfg.STRATEGY_CONFIG.get(cfg.STRATEGY_NAME, {})
+        strategy_params = self.risk_params or cfg.STRATEGY_CONFIG.get(self.strategy_name, {})
         stop_loss_pct = strategy_params.get('stop_loss_pct', 0)
         take_profit_pct = strategy_params.get('take_profit_pct', 0)
 
         # --- LONG ENTRY ---
-        if signal == 'BUY' and self.balance > 0:
+        if signal == 'BUY' and self.position_type is None and self.balance > 0:
             amount = (self.balance / current_price) * 0.99
-            if self.mode == 'LIVE':
-                try:
-                    resp = await self.rest.add_order(cfg.SYMBOL, 'buy', 'market', amount)
-                    logger.warning(f"LIVE BUY EXECUTED: {resp}")
-                except Exception as e:
-                    logger.error(f"LIVE ORDER FAILED: {e}")
-                    return
+            if self.mode == 'LIVE' and not await self._send_live_order(signal, 'buy', amount):
+                return
 
             self.position = amount
             self.position_type = 'long'
@@ -48,42 +57,32 @@ class ExecutionEngine:
             
             # LOCK CAPITAL
             self.balance = 0 
-            await self._finalize_trade('buy', executed_price, amount)
+            await self._finalize_trade('buy', executed_price, amount, timestamp)
 
         # --- LONG EXIT ---
         elif signal == 'SELL' and self.position_type == 'long':
             amount = self.position
-            if self.mode == 'LIVE':
-                try:
-                    resp = await self.rest.add_order(cfg.SYMBOL, 'sell', 'market', amount)
-                    logger.warning(f"LIVE SELL EXECUTED: {resp}")
-                except Exception as e:
-                    logger.error(f"LIVE ORDER FAILED: {e}")
-                    return
+            if self.mode == 'LIVE' and not await self._send_live_order(signal, 'sell', amount):
+                return
 
             revenue = self.position * current_price
             cost = self.position * self.entry_price
             pnl = revenue - cost
             
-            # UNLOCK CAPITAL + REVENUE
-            self.balance = revenue
+            # UNLOCK CAPITAL + REVENUE (cash a partial entry left unspent stays)
+            self.balance += revenue
             
             self.position = 0
             self.position_type = None
             self.entry_price = 0
             self.trades.append({'side': 'sell', 'price': executed_price, 'amount': amount, 'timestamp': timestamp, 'pnl': pnl})
-            await self._finalize_trade('sell', executed_price, amount)
+            await self._finalize_trade('sell', executed_price, amount, timestamp, pnl)
 
         # --- SHORT ENTRY ---
-        elif signal == 'SELL_SHORT' and self.balance > 0:
+        elif signal == 'SELL_SHORT' and self.position_type is None and self.balance > 0:
             amount = (self.balance / current_price) * 0.99
-            if self.mode == 'LIVE':
-                try:
-                    resp = await self.rest.add_order(cfg.SYMBOL, 'sell', 'market', amount)
-                    logger.warning(f"LIVE SELL SHORT EXECUTED: {resp}")
-                except Exception as e:
-                    logger.error(f"LIVE ORDER FAILED: {e}")
-                    return
+            if self.mode == 'LIVE' and not await self._send_live_order(signal, 'sell', amount):
+                return
             
             self.position = amount
             self.position_type = 'short'
@@ -95,51 +94,183 @@ class ExecutionEngine:
             # LOCK CAPITAL (This was missing!)
             self.balance = 0 
             
-            await self._finalize_trade('sell_short', executed_price, amount)
+            await self._finalize_trade('sell_short', executed_price, amount, timestamp)
             
         # --- SHORT EXIT ---
         elif signal == 'COVER_SHORT' and self.position_type == 'short':
             amount = self.position
-            if self.mode == 'LIVE':
-                try:
-                    resp = await self.rest.add_order(cfg.SYMBOL, 'buy', 'market', amount)
-                    logger.warning(f"LIVE COVER SHORT EXECUTED: {resp}")
-                except Exception as e:
-                    logger.error(f"LIVE ORDER FAILED: {e}")
-                    return
+            if self.mode == 'LIVE' and not await self._send_live_order(signal, 'buy', amount):
+                return
 
             buy_back_cost = self.position * current_price
             # PnL = Initial Proceeds - Cost to Buy Back
             pnl = self.short_proceeds - buy_back_cost
             
             # UNLOCK CAPITAL: The initial proceeds + PnL (or - Loss)
-            self.balance = self.short_proceeds + pnl
+            self.balance += self.short_proceeds + pnl
             
             self.position = 0
             self.position_type = None
             self.entry_price = 0
             self.short_proceeds = 0
             self.trades.append({'side': 'cover_short', 'price': executed_price, 'amount': amount, 'timestamp': timestamp, 'pnl': pnl})
-            await self._finalize_trade('cover_short', executed_price, amount)
+            await self._finalize_trade('cover_short', executed_price, amount, timestamp, pnl)
 
-    async def check_exit_conditions(self, current_price, timestamp):
+    async def _send_live_order(self, signal, side, amount):
+        """Sends a LIVE order. Returns False if the order could not be placed."""
+        if self.order_manager is not None:
+            self._order_seq += 1
+            context = {
+                'signal': signal,
+                'seq': self._order_seq,
+                'state': self._snapshot(),
+                # Exits append their trade record right after submission
+                'trade_index': len(self.trades) if signal in ('SELL', 'COVER_SHORT') else None
+            }
+            self.pending_order = self.order_manager.submit(side, amount, context=context)
+            return True
+        try:
+            resp = await self.rest.add_order(self.symbol, side, 'market', amount)
+            logger.warning(f"LIVE {signal.replace('_', ' ')} EXECUTED: {resp}")
+            return True
+        except Exception as e:
+            logger.error(f"LIVE ORDER FAILED: {e}")
+            return False
+
+    def _snapshot(self):
+        return {
+            'balance': self.balance,
+            'position': self.position,
+            'position_type': self.position_type,
+            'entry_price': self.entry_price,
+            'stop_loss_price': self.stop_loss_price,
+            'take_profit_price': self.take_profit_price,
+            'short_proceeds': self.short_proceeds
+        }
+
+    def state(self) -> dict:
+        """Complete backtest state (position, cash and history) for checkpoints."""
+        return {**self._snapshot(), 'trades': self.trades, 'portfolio_history': self.portfolio_history}
+
+    def restore(self, state: dict):
+        for key, value in state.items():
+            setattr(self, key, value)
+
+    def on_order_done(self, order):
+        """
+        OrderManager callback: replaces the optimistic fill at the candle price with the
+        actual fills of a LIVE order, or rolls the state back if nothing was filled, and
+        journals the trade as filled. The state an order was sized from is restored first,
+        so callers must not place the next order before this one is done (Bot waits).
+        """
+        context = order.context or {}
+        signal = context.get('signal')
+        if signal is None:
+            # Not placed by this engine (e.g. a manual batch through the OrderManager)
+            return
+        if self.pending_order is order:
+            self.pending_order = None
+        state = context['state']
+        if context.get('seq') != self._order_seq:
+            logger.error(f"LIVE {signal} order {order.cl_ord_id} finished after later orders were placed; "
+                         f"filled {order.filled} @ {order.avg_price:.2f}, position needs manual reconciliation.")
+            if order.filled:
+                self._journal_trade(SIGNAL_SIDES[signal], order.avg_price, order.filled)
+            return
+
+        estimated = self.trades[context['trade_index']] if context.get('trade_index') is not None else None
+        # Start again from the state the order was placed in
+        for key, value in state.items():
+            setattr(self, key, value)
+        if order.filled == 0:
+            logger.error(f"LIVE {signal} order {order.cl_ord_id} ended {order.status} without fills.")
+            if estimated is not None:
+                del self.trades[context['trade_index']:]
+            return
+
+        qty, price = order.filled, order.avg_price
+        strategy_params = self.risk_params or cfg.STRATEGY_CONFIG.get(self.strategy_name, {})
+        stop_loss_pct = strategy_params.get('stop_loss_pct', 0)
+        take_profit_pct = strategy_params.get('take_profit_pct', 0)
+        pnl = None
+
+        if signal in ('BUY', 'SELL_SHORT'):
+            self.position = qty
+            self.entry_price = price
+            if signal == 'BUY':
+                self.position_type = 'long'
+                # Cash not spent because of a partial fill or a better price stays available
+                self.balance = max(0, state['balance'] - qty * price)
+                self.stop_loss_price = price * (1 - stop_loss_pct)
+                self.take_profit_price = price * (1 + take_profit_pct)
+            else:
+                self.position_type = 'short'
+                self.balance = 0
+                self.short_proceeds = qty * price
+                self.stop_loss_price = price * (1 + stop_loss_pct)
+                self.take_profit_price = price * (1 - take_profit_pct)
+        else:
+            qty = min(qty, state['position'])
+            if signal == 'SELL':
+                pnl = qty * (price - state['entry_price'])
+                self.balance = state['balance'] + qty * price
+            else:
+                proceeds = state['short_proceeds'] * (qty / state['position'])
+                pnl = proceeds - qty * price
+                self.balance = state['balance'] + proceeds + pnl
+                self.short_proceeds = state['short_proceeds'] - proceeds
+            residual = state['position'] - qty
+            if residual > state['position'] * 1e-9:
+                # The rest of the position is still held; its stops stay armed for the next exit
+                logger.warning(f"LIVE {signal} only filled {qty} of {state['position']}; keeping {residual} open.")
+                self.position = residual
+            else:
+                self.position = 0
+                self.position_type = None
+                self.entry_price = 0
+                self.short_proceeds = 0
+            estimated.update({'price': price, 'amount': qty, 'pnl': pnl})
+        self._journal_trade(SIGNAL_SIDES[signal], price, qty, pnl=pnl)
+        logger.info(f"LIVE {signal} reconciled: {qty} @ {price:.2f} ({order.status})")
+
+    def exit_signal(self, current_price):
+        """Returns the stop-loss / take-profit exit signal for the open position, if any."""
         if self.position_type == 'long':
             if current_price <= self.stop_loss_price or current_price >= self.take_profit_price:
-                await self.execute_order('SELL', current_price, timestamp)
+                return 'SELL'
         elif self.position_type == 'short':
             if current_price >= self.stop_loss_price or current_price <= self.take_profit_price:
-                await self.execute_order('COVER_SHORT', current_price, timestamp)
+                return 'COVER_SHORT'
+        return None
+
+    async def check_exit_conditions(self, current_price, timestamp):
+        signal = self.exit_signal(current_price)
+        if signal:
+            await self.execute_order(signal, current_price, timestamp)
 
-    async def _finalize_trade(self, side, price, amount):
+    async def _finalize_trade(self, side, price, amount, timestamp=None, pnl=None):
         logger.info(f"[{self.mode}] {side.upper()} @ {price} | Vol: {amount}")
+        if self.mode == 'LIVE' and self.order_manager is not None:
+            # Journaled with the actual fills by on_order_done
+            return
+        self._journal_trade(side, price, amount, timestamp, pnl)
+
+    def _journal_trade(self, side, price, amount, timestamp=None, pnl=None):
         if self.db:
-            await self.db.save_trade(
-                symbol=cfg.SYMBOL,
+            # Backtest fills happen at the candle's time; live and paper fills happen now
+            fill_time = None
+            if self.mode == 'BACKTEST' and isinstance(timestamp, (int, float)):
+                fill_time = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+            # Write-behind: the trade is queued and flushed to Postgres in batches
+            self.db.record_trade(
+                symbol=self.symbol,
                 side=side,
                 price=price,
                 amount=amount,
                 mode=self.mode,
-                strategy=cfg.STRATEGY_NAME
+                strategy=self.strategy_name,
+                fill_time=fill_time,
+                pnl=pnl
             )
 
     def get_portfolio_value(self, current_price, timestamp):
@@ -7,23 +7,61 @@ import time
 import json
 import logging
 import asyncio
+from trading_bot.core.metrics import REGISTRY
 
 logger = logging.getLogger(__name__)
 
+REST_LATENCY = REGISTRY.histogram('trading_bot_kraken_rest_seconds', 'Kraken REST round-trip time by endpoint',
+                                  labels=('endpoint',))
+REST_ERRORS = REGISTRY.counter('trading_bot_kraken_rest_errors_total', 'Failed Kraken REST requests by endpoint',
+                               labels=('endpoint',))
+RATE_LIMIT_WAIT = REGISTRY.histogram('trading_bot_kraken_rate_limit_wait_seconds',
+                                     'Time Kraken REST requests waited for the rate limiter').labels()
+WS_FRAMES = REGISTRY.counter('trading_bot_kraken_ws_frames_total', 'Kraken WS frames received by channel',
+                             labels=('channel',))
+
+class RateLimiter:
+    """
+    Token bucket shared by concurrent callers to stay within Kraken's request budget.
+    rate: tokens added per second, burst: bucket capacity.
+    """
+    def __init__(self, rate=1.0, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
 class KrakenREST:
-    def __init__(self, api_key, api_secret, base_url):
+    def __init__(self, api_key, api_secret, base_url, rate_limiter=None, session=None):
         self.api_key = api_key
         self.api_secret = api_secret
         self.base_url = base_url
+        self.rate_limiter = rate_limiter
+        # Optional shared aiohttp session; a new one is opened per request otherwise
+        self.session = session
 
-    def _get_signature(self, urlpath, data, nonce):
-        postdata = urllib.parse.urlencode(data)
+    def _get_signature(self, urlpath, data, nonce, postdata=None):
+        if postdata is None:
+            postdata = urllib.parse.urlencode(data)
         encoded = (str(nonce) + postdata).encode()
         message = urlpath.encode() + hashlib.sha256(encoded).digest()
         mac = hmac.new(base64.b64decode(self.api_secret), message, hashlib.sha512)
         return base64.b64encode(mac.digest()).decode()
 
-    async def _request(self, method, endpoint, data=None, is_private=True):
+    async def _request(self, method, endpoint, data=None, is_private=True, json_body=False):
         if data is None: data = {}
         
         headers = {}
@@ -34,37 +72,83 @@ class KrakenREST:
                 nonce = str(int(time.time() * 1000))
                 data['nonce'] = nonce
                 headers['API-Key'] = self.api_key
-                headers['API-Sign'] = self._get_signature(path, data, nonce)
+            if json_body:
+                # Endpoints with nested arguments (e.g. AddOrderBatch) take a JSON body,
+                # and the signature is computed over that exact body
+                postdata = json.dumps(data)
+                headers['Content-Type'] = 'application/json'
+                if 'API-Key' in headers:
+                    headers['API-Sign'] = self._get_signature(path, data, data['nonce'], postdata)
+                data = postdata
+            elif 'API-Key' in headers:
+                headers['API-Sign'] = self._get_signature(path, data, data['nonce'])
         else:
             path = f"/0/public/{endpoint}"
         
         url = f"{self.base_url}{path}"
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.request(method, url, data=data, headers=headers) as resp:
-                response = await resp.json()
-                if response.get('error'):
-                    # Kraken returns errors as a list, e.g., ['EQuery:Unknown asset pair']
-                    raise Exception(f"Kraken API Error: {response['error']}")
-                return response['result']
-
-    async def get_ohlc(self, pair, interval=1):
+
+        if self.rate_limiter:
+            with RATE_LIMIT_WAIT.time():
+                await self.rate_limiter.acquire()
+
+        started = time.perf_counter_ns()
+        try:
+            if self.session is not None:
+                return await self._send(self.session, method, url, data, headers)
+            async with aiohttp.ClientSession() as session:
+                return await self._send(session, method, url, data, headers)
+        except Exception:
+            REST_ERRORS.labels(endpoint=endpoint).inc()
+            raise
+        finally:
+            REST_LATENCY.labels(endpoint=endpoint).record(time.perf_counter_ns() - started)
+
+    async def _send(self, session, method, url, data, headers):
+        # Public GET endpoints take their arguments as query parameters
+        if method == "GET":
+            request = session.request(method, url, params=data, headers=headers)
+        else:
+            request = session.request(method, url, data=data, headers=headers)
+        async with request as resp:
+            response = await resp.json(content_type=None)
+            if response.get('error'):
+                # Kraken returns errors as a list, e.g., ['EQuery:Unknown asset pair']
+                raise Exception(f"Kraken API Error: {response['error']}")
+            return response['result']
+
+    async def get_ohlc(self, pair, interval=1, since=None):
         """
         Public Endpoint: Get OHLC data
         interval: 1, 5, 15, 30, 60, 240, 1440, 10080, 21600
+        since: return committed candles after this timestamp (at most the last 720 are served)
         """
         data = {
             "pair": pair,
             "interval": interval
         }
+        if since is not None:
+            data["since"] = since
         return await self._request("GET", "OHLC", data, is_private=False)
 
+    async def get_trades(self, pair, since=None, count=1000):
+        """
+        Public Endpoint: Get Recent Trades
+        since: nanosecond timestamp cursor (the `last` field of the previous page)
+        """
+        data = {
+            "pair": pair,
+            "count": count
+        }
+        if since is not None:
+            data["since"] = since
+        return await self._request("GET", "Trades", data, is_private=False)
+
     async def get_ticker(self, pair):
         """Public Endpoint: Get Ticker Info"""
         data = {"pair": pair}
         return await self._request("GET", "Ticker", data, is_private=False)
 
-    async def add_order(self, pair, side, type, volume):
+    async def add_order(self, pair, side, type, volume, price=None, cl_ord_id=None):
         """Private Endpoint: Create Order"""
         data = {
             "pair": pair,
@@ -72,40 +156,132 @@ class KrakenREST:
             "type": side,
             "volume": volume
         }
+        if price is not None:
+            data["price"] = price
+        if cl_ord_id is not None:
+            data["cl_ord_id"] = cl_ord_id
         return await self._request("POST", "AddOrder", data, is_private=True)
 
+    async def add_order_batch(self, pair, orders):
+        """
+        Private Endpoint: Create 2-15 orders for one pair in a single request.
+        orders: list of dicts with ordertype, type, volume and optional price / cl_ord_id
+        """
+        data = {
+            "pair": pair,
+            "orders": [{key: str(value) if key in ("volume", "price") else value
+                        for key, value in order.items()} for order in orders]
+        }
+        return await self._request("POST", "AddOrderBatch", data, is_private=True, json_body=True)
+
+    async def query_orders(self, txid):
+        """Private Endpoint: Status, executed volume and cost of orders by txid (comma-separated)"""
+        return await self._request("POST", "QueryOrders", {"txid": txid}, is_private=True)
+
+    async def cancel_order(self, txid):
+        """Private Endpoint: Cancel an open order by txid or cl_ord_id"""
+        return await self._request("POST", "CancelOrder", {"txid": txid}, is_private=True)
+
+    async def get_websockets_token(self):
+        """Private Endpoint: Token for authenticated WS v2 channels such as executions"""
+        return await self._request("POST", "GetWebSocketsToken", is_private=True)
+
 
 class KrakenWS:
-    def __init__(self, ws_url, callback_func):
+    def __init__(self, ws_url, callback_func, recorder=None):
         self.ws_url = ws_url
         self.callback = callback_func
+        # Optional FrameRecorder that every received text frame is teed into
+        self.recorder = recorder
         self.running = False
+        self.symbols = None
+        self._params = None
+        self._ws = None
 
-    async def connect_and_stream(self, symbols, interval=1):
+    async def connect_and_stream(self, symbols, interval=1, channel="ohlc", token_provider=None):
+        """
+        Streams a channel to the callback.
+        channel: "ohlc" (one interval per subscription), "trade" (feed a CandleAggregator
+        to build every timeframe from a single subscription) or "executions" (private;
+        token_provider is awaited for a fresh token on every connect).
+        symbols can be changed while streaming with add_symbols / remove_symbols; a
+        reconnect subscribes to the current set.
+        """
         self.running = True
+        self._frames = WS_FRAMES.labels(channel=channel)
+        if symbols is not None:
+            # Keep symbols added before the stream started
+            self.symbols = list(dict.fromkeys([*(self.symbols or []), *symbols]))
         while self.running:
             try:
                 async with aiohttp.ClientSession() as session:
                     async with session.ws_connect(self.ws_url) as ws:
                         logger.info(f"Connected to Kraken WS v2: {self.ws_url}")
                         
-                        # Subscribe to OHLC
-                        subscribe_msg = {
-                            "method": "subscribe",
-                            "params": {
-                                "channel": "ohlc",
-                                "symbol": symbols,
-                                "interval": interval
+                        params = {"channel": channel}
+                        if channel == "ohlc":
+                            params["interval"] = interval
+                        if token_provider is not None:
+                            params["token"] = (await token_provider())["token"]
+                        self._params = dict(params)
+                        if self.symbols:
+                            params["symbol"] = list(self.symbols)
+                        # A symbol channel with no symbols yet waits for add_symbols
+                        if self.symbols is None or self.symbols:
+                            subscribe_msg = {
+                                "method": "subscribe",
+                                "params": params
                             }
-                        }
-                        await ws.send_json(subscribe_msg)
+                            await ws.send_json(subscribe_msg)
+                        self._ws = ws
                         
                         async for msg in ws:
                             if msg.type == aiohttp.WSMsgType.TEXT:
-                                data = json.loads(msg.data)
-                                await self.callback(data)
+                                self._frames.inc()
+                                if self.recorder is not None:
+                                    self.recorder.write(msg.data)
+                                await self._dispatch(msg.data)
                             elif msg.type == aiohttp.WSMsgType.ERROR:
                                 break
             except Exception as e:
                 logger.error(f"WS Connection lost: {e}, retrying in 5s...")
-                await asyncio.sleep(5)
\ No newline at end of file
+                await asyncio.sleep(5)
+            finally:
+                self._ws = None
+
+    async def _dispatch(self, frame):
+        await self.callback(json.loads(frame))
+
+    async def replay(self, directory, speed=1.0, stream='trade', session=None) -> dict:
+        """
+        Feeds a recording made with a FrameRecorder to the callback exactly as live frames
+        are, at the recorded pace (speed=1), N times faster or, with speed=None, as fast
+        as the callback keeps up; `session` picks one recording process's frames. Returns
+        the Replayer's stats.
+        """
+        from trading_bot.core.recorder import Replayer
+        self.running = True
+        try:
+            return await Replayer(directory, stream, session).run(self._dispatch, speed)
+        finally:
+            self.running = False
+
+    async def _send(self, method, symbols):
+        if self._ws is not None and not self._ws.closed:
+            await self._ws.send_json({"method": method, "params": {**self._params, "symbol": symbols}})
+
+    async def add_symbols(self, symbols):
+        """Subscribes additional symbols on the open connection (and on every reconnect)."""
+        if self.symbols is None:
+            self.symbols = []
+        new = [symbol for symbol in symbols if symbol not in self.symbols]
+        self.symbols.extend(new)
+        if new:
+            await self._send("subscribe", new)
+
+    async def remove_symbols(self, symbols):
+        removed = [symbol for symbol in symbols if symbol in (self.symbols or [])]
+        for symbol in removed:
+            self.symbols.remove(symbol)
+        if removed:
+            await self._send("unsubscribe", removed)
\ No newline at end of file
@@ -0,0 +1,119 @@
+import time
+
+
+class LatencyHistogram:
+    """
+    Log-linear latency histogram in nanoseconds.
+
+    Every power-of-two range is split into 2**sub_bucket_bits linear buckets, which
+    bounds the relative error of any reported percentile to about 2**-sub_bucket_bits
+    while recording in O(1) with no allocation.
+    """
+    def __init__(self, name, sub_bucket_bits=5, max_value_ns=2**40):
+        self.name = name
+        self._sub_bits = sub_bucket_bits
+        self._sub_count = 1 << sub_bucket_bits
+        self._max_value = max_value_ns
+        self._counts = [0] * (self._index(max_value_ns) + 1)
+        self._bound_ends = {}   # bounds passed to cumulative_counts -> bucket index ends
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def _index(self, value):
+        if value < 2 * self._sub_count:
+            return value
+        shift = value.bit_length() - self._sub_bits - 1
+        return shift * self._sub_count + (value >> shift)
+
+    def _bucket_value(self, index):
+        """Representative (midpoint) value of a bucket."""
+        if index < 2 * self._sub_count:
+            return index
+        shift = index // self._sub_count - 1
+        mantissa = index - shift * self._sub_count
+        return (mantissa << shift) + ((1 << shift) >> 1)
+
+    def record(self, value_ns):
+        value_ns = int(value_ns)
+        if value_ns < 0:
+            value_ns = 0
+        elif value_ns > self._max_value:
+            value_ns = self._max_value
+        self._counts[self._index(value_ns)] += 1
+        self.count += 1
+        self.total += value_ns
+        if value_ns > self.max:
+            self.max = value_ns
+
+    def time(self):
+        """Context manager that records the duration of its block."""
+        return _Timer(self)
+
+    def percentile(self, pct) -> int:
+        if self.count == 0:
+            return 0
+        target = max(1, int(round(self.count * pct / 100.0)))
+        seen = 0
+        for index, bucket_count in enumerate(self._counts):
+            if bucket_count:
+                seen += bucket_count
+                if seen >= target:
+                    return min(self._bucket_value(index), self.max)
+        return self.max
+
+    def cumulative_counts(self, bounds_ns) -> list:
+        """Number of recorded values at or below each of the ascending `bounds_ns`, by bucket midpoint."""
+        bounds_ns = tuple(bounds_ns)
+        ends = self._bound_ends.get(bounds_ns)
+        if ends is None:
+            ends = self._bound_ends[bounds_ns] = [self._bucket_end(bound) for bound in bounds_ns]
+        counts = []
+        seen = 0
+        start = 0
+        for end in ends:
+            seen += sum(self._counts[start:end])
+            start = max(start, end)
+            counts.append(seen)
+        return counts
+
+    def _bucket_end(self, bound) -> int:
+        """Index of the first bucket whose midpoint is above `bound`."""
+        bound = min(int(bound), self._max_value)
+        if bound < 0:
+            return 0
+        index = self._index(bound)
+        return index + 1 if self._bucket_value(index) <= bound else index
+
+    def summary(self) -> dict:
+        """Count, mean and tail percentiles in microseconds."""
+        return {
+            'count': self.count,
+            'mean_us': (self.total / self.count / 1000) if self.count else 0.0,
+            'p50_us': self.percentile(50) / 1000,
+            'p90_us': self.percentile(90) / 1000,
+            'p99_us': self.percentile(99) / 1000,
+            'p999_us': self.percentile(99.9) / 1000,
+            'max_us': self.max / 1000
+        }
+
+    def reset(self):
+        self._counts = [0] * len(self._counts)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+
+class _Timer:
+    __slots__ = ('_histogram', '_start')
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.record(time.perf_counter_ns() - self._start)
+        return False
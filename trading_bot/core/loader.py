@@ -0,0 +1,119 @@
+import hashlib
+import importlib.util
+import logging
+import marshal
+import os
+import sys
+import threading
+import types
+
+logger = logging.getLogger(__name__)
+
+# Optional on-disk bytecode cache shared by every process on the machine
+CACHE_DIR = os.getenv('STRATEGY_CACHE_DIR')
+
+_lock = threading.Lock()
+_code = {}      # (abspath, digest) -> code object
+_classes = {}   # (abspath, digest) -> strategy class
+
+
+def _reset_lock():
+    # A fork while another thread held the lock would leave it locked forever in the child
+    global _lock
+    _lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_lock)
+
+
+def _read(filepath):
+    path = os.path.abspath(filepath)
+    with open(path, 'rb') as f:
+        source = f.read()
+    return path, source, hashlib.blake2b(source, digest_size=16).hexdigest()
+
+
+def _disk_path(digest):
+    return os.path.join(CACHE_DIR, f"{digest}.{sys.implementation.cache_tag}.bin")
+
+
+def _load_from_disk(digest):
+    try:
+        with open(_disk_path(digest), 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    magic = importlib.util.MAGIC_NUMBER
+    if not data.startswith(magic):
+        return None
+    try:
+        return marshal.loads(data[len(magic):])
+    except (EOFError, ValueError, TypeError):
+        return None
+
+
+def _save_to_disk(digest, code):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        path = _disk_path(digest)
+        # Unique temp name + atomic rename: concurrent writers never expose a torn file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(importlib.util.MAGIC_NUMBER + marshal.dumps(code))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not write bytecode cache for {digest}: {e}")
+
+
+def compile_file(filepath):
+    """
+    Returns (abspath, digest, code) for a Python file. Code objects are cached by content
+    hash, so an edited file is recompiled automatically and an unchanged one never is.
+    """
+    path, source, digest = _read(filepath)
+    key = (path, digest)
+    code = _code.get(key)
+    if code is None:
+        code = _load_from_disk(digest) if CACHE_DIR else None
+        if code is None:
+            code = compile(source, path, 'exec')
+            if CACHE_DIR:
+                _save_to_disk(digest, code)
+        with _lock:
+            _code[key] = code
+    return path, digest, code
+
+
+def load_strategy_class(filepath: str):
+    """
+    Loads a strategy class from a Python file, executing the module once per content
+    version. The class name is the file name, capitalized.
+    """
+    path, digest, code = compile_file(filepath)
+    key = (path, digest)
+    cls = _classes.get(key)
+    if cls is None:
+        # A unique module name per version keeps instances picklable and versions apart
+        module = types.ModuleType(f"strategy_{digest}")
+        module.__file__ = path
+        sys.modules[module.__name__] = module
+        exec(code, module.__dict__)
+        class_name = os.path.basename(path).replace(".py", "").capitalize()
+        cls = getattr(module, class_name)
+        with _lock:
+            _classes[key] = cls
+    return cls
+
+
+def load_config_file(filepath: str) -> dict:
+    """Executes a Python config file (compiled once per content version) into a fresh dict."""
+    _, _, code = compile_file(filepath)
+    config = {}
+    exec(code, config)
+    return config
+
+
+def clear_cache():
+    with _lock:
+        _code.clear()
+        _classes.clear()
@@ -0,0 +1,251 @@
+import bisect
+import itertools
+import time
+from collections import OrderedDict, deque
+
+
+class Order:
+    __slots__ = ('order_id', 'cl_ord_id', 'symbol', 'side', 'order_type', 'price', 'volume',
+                 'filled', 'notional', 'status', 'timestamp', 'seq')
+
+    def __init__(self, order_id, symbol, side, order_type, volume, price=None, cl_ord_id=None,
+                 timestamp=None, seq=0):
+        self.order_id = order_id
+        self.cl_ord_id = cl_ord_id
+        self.symbol = symbol
+        self.side = side
+        self.order_type = order_type
+        self.price = price
+        self.volume = volume
+        self.filled = 0.0
+        self.notional = 0.0
+        self.status = 'new'
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        self.seq = seq
+
+    @property
+    def remaining(self):
+        return self.volume - self.filled
+
+    @property
+    def avg_price(self):
+        return self.notional / self.filled if self.filled else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'order_id': self.order_id,
+            'cl_ord_id': self.cl_ord_id,
+            'symbol': self.symbol,
+            'side': self.side,
+            'order_type': self.order_type,
+            'limit_price': self.price,
+            'order_qty': self.volume,
+            'cum_qty': self.filled,
+            'avg_price': self.avg_price,
+            'order_status': self.status,
+            'timestamp': self.timestamp
+        }
+
+
+class Fill:
+    __slots__ = ('order', 'price', 'qty', 'liquidity', 'timestamp')
+
+    def __init__(self, order, price, qty, liquidity, timestamp):
+        self.order = order
+        self.price = price
+        self.qty = qty
+        self.liquidity = liquidity  # 'm' (maker) or 't' (taker)
+        self.timestamp = timestamp
+
+
+class _BookSide:
+    """Price levels of one side; each level is a FIFO queue, which gives time priority."""
+    def __init__(self, descending):
+        self._descending = descending
+        self._prices = []      # ascending sort keys
+        self._levels = {}      # price -> deque[Order]
+
+    def _key(self, price):
+        return -price if self._descending else price
+
+    def add(self, order):
+        level = self._levels.get(order.price)
+        if level is None:
+            level = self._levels[order.price] = deque()
+            bisect.insort(self._prices, self._key(order.price))
+        level.append(order)
+
+    def remove(self, order):
+        level = self._levels.get(order.price)
+        if level is None:
+            return
+        try:
+            level.remove(order)
+        except ValueError:
+            return
+        if not level:
+            self._drop_level(order.price)
+
+    def _drop_level(self, price):
+        del self._levels[price]
+        index = bisect.bisect_left(self._prices, self._key(price))
+        del self._prices[index]
+
+    def best_price(self):
+        if not self._prices:
+            return None
+        key = self._prices[0]
+        return -key if self._descending else key
+
+    def best_level(self):
+        price = self.best_price()
+        return (price, self._levels[price]) if price is not None else (None, None)
+
+    def pop_front(self, price):
+        level = self._levels[price]
+        level.popleft()
+        if not level:
+            self._drop_level(price)
+
+    def depth(self, levels=10):
+        out = []
+        for key in self._prices[:levels]:
+            price = -key if self._descending else key
+            out.append((price, sum(o.remaining for o in self._levels[price])))
+        return out
+
+    def __len__(self):
+        return sum(len(level) for level in self._levels.values())
+
+
+class MatchingEngine:
+    """
+    Price-time priority order book for a single symbol.
+
+    Incoming orders first match resting orders at the best prices, oldest first.
+    The replayed market feed acts as an outside liquidity provider: market orders that
+    exhaust the book fill at the last market price, and resting limit orders fill when
+    a market trade prints through their price.
+    """
+    def __init__(self, symbol, last_price=None, max_closed=1000):
+        self.symbol = symbol
+        self.last_price = last_price
+        self.bids = _BookSide(descending=True)
+        self.asks = _BookSide(descending=False)
+        self.orders = {}        # order_id -> Order, open orders only
+        self._cl_ord_ids = {}   # cl_ord_id -> order_id of open orders
+        self.closed = OrderedDict()     # order_id -> Order, the most recent `max_closed` terminal orders
+        self.max_closed = max_closed
+        self._ids = itertools.count(1)
+        self._seq = itertools.count(1)
+
+    def _next_order_id(self):
+        n = next(self._ids)
+        return f"O{n:06d}-MOCK-{self.symbol.replace('/', '')[:6]}"
+
+    def submit(self, side, order_type, volume, price=None, cl_ord_id=None, timestamp=None):
+        """Adds an order and returns (order, fills). Fills include both sides of each match."""
+        if side not in ('buy', 'sell'):
+            raise ValueError(f"EOrder:Invalid side {side}")
+        if order_type not in ('market', 'limit'):
+            raise ValueError(f"EOrder:Unsupported order type {order_type}")
+        if volume <= 0:
+            raise ValueError("EOrder:Invalid volume")
+        if order_type == 'limit' and price is None:
+            raise ValueError("EOrder:Limit price required")
+
+        order = Order(self._next_order_id(), self.symbol, side, order_type, float(volume),
+                      float(price) if price is not None else None, cl_ord_id, timestamp, next(self._seq))
+        self.orders[order.order_id] = order
+        if cl_ord_id is not None:
+            self._cl_ord_ids[cl_ord_id] = order.order_id
+        order.status = 'open'
+        fills = self._match(order)
+
+        if order.remaining > 1e-12:
+            if order_type == 'market':
+                if self.last_price is None:
+                    order.status = 'canceled'
+                    self._forget(order)
+                    return order, fills
+                fills.append(self._fill(order, self.last_price, order.remaining, 't'))
+            else:
+                (self.bids if side == 'buy' else self.asks).add(order)
+        return order, fills
+
+    def _match(self, order):
+        fills = []
+        book = self.asks if order.side == 'buy' else self.bids
+        while order.remaining > 1e-12:
+            price, level = book.best_level()
+            if price is None:
+                break
+            if order.order_type == 'limit':
+                if order.side == 'buy' and price > order.price:
+                    break
+                if order.side == 'sell' and price < order.price:
+                    break
+            resting = level[0]
+            qty = min(order.remaining, resting.remaining)
+            fills.append(self._fill(resting, price, qty, 'm'))
+            fills.append(self._fill(order, price, qty, 't'))
+            if resting.remaining <= 1e-12:
+                book.pop_front(price)
+        return fills
+
+    def _fill(self, order, price, qty, liquidity):
+        order.filled += qty
+        order.notional += price * qty
+        if order.remaining <= 1e-12:
+            order.status = 'filled'
+            self._forget(order)
+        else:
+            order.status = 'partially_filled'
+        self.last_price = price
+        return Fill(order, price, qty, liquidity, time.time())
+
+    def _forget(self, order):
+        # Terminal orders leave the book; only the most recent are kept, for queries
+        self.orders.pop(order.order_id, None)
+        self.closed[order.order_id] = order
+        if len(self.closed) > self.max_closed:
+            self.closed.popitem(last=False)
+        if order.cl_ord_id is not None and self._cl_ord_ids.get(order.cl_ord_id) == order.order_id:
+            del self._cl_ord_ids[order.cl_ord_id]
+
+    def cancel(self, order_id):
+        """Cancels an open order by its exchange order_id or its cl_ord_id."""
+        order = self.orders.get(order_id) or self.orders.get(self._cl_ord_ids.get(order_id))
+        if order is None:
+            return None
+        (self.bids if order.side == 'buy' else self.asks).remove(order)
+        order.status = 'canceled'
+        self._forget(order)
+        return order
+
+    def on_market_trade(self, price):
+        """Applies a trade from the market feed; fills resting orders it trades through."""
+        self.last_price = price
+        fills = []
+        while True:
+            best_bid, level = self.bids.best_level()
+            if best_bid is None or best_bid < price:
+                break
+            order = level[0]
+            fills.append(self._fill(order, best_bid, order.remaining, 'm'))
+            self.bids.pop_front(best_bid)
+        while True:
+            best_ask, level = self.asks.best_level()
+            if best_ask is None or best_ask > price:
+                break
+            order = level[0]
+            fills.append(self._fill(order, best_ask, order.remaining, 'm'))
+            self.asks.pop_front(best_ask)
+        return fills
+
+    def query(self, order_id):
+        """An open or recently closed order by its order_id, or None."""
+        return self.orders.get(order_id) or self.closed.get(order_id)
+
+    def open_orders(self):
+        return list(self.orders.values())
@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import math
+from trading_bot.core.latency import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the Prometheus buckets rendered from a LatencyHistogram
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    """
+    A monotonic count. `inc` is a plain attribute add: no lock on the hot path, which is
+    safe because metrics are updated from the event loop thread. With `set_function`
+    the value is read from an existing counter at scrape time instead.
+    """
+    __slots__ = ('value', 'function')
+
+    def __init__(self):
+        self.value = 0
+        self.function = None
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def set_function(self, function):
+        self.function = function
+
+    def get(self):
+        return self.function() if self.function is not None else self.value
+
+
+class Gauge(Counter):
+    """A value that goes up and down, set directly or read from `set_function` at scrape time."""
+    __slots__ = ()
+
+    def set(self, value):
+        self.value = value
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+
+class MetricFamily:
+    """One metric name and its children, one per combination of label values."""
+    def __init__(self, name, help_text, kind, labelnames, factory):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children = {}
+        self._lookups = {}      # labels as passed (name/value pairs in call order) -> child
+
+    def labels(self, **labels):
+        """The child for these label values, created on first use."""
+        lookup = tuple(labels.items())
+        child = self._lookups.get(lookup)
+        if child is None:
+            key = tuple(str(labels[name]) for name in self.labelnames)
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._factory()
+            self._lookups[lookup] = child
+        return child
+
+    def attach(self, child, **labels):
+        """Exposes an existing child (e.g. a component's own LatencyHistogram) under these labels."""
+        self._children[tuple(str(labels[name]) for name in self.labelnames)] = child
+        self._lookups.clear()
+        return child
+
+    def forget(self, **labels):
+        """Drops every child whose labels include all of the given values."""
+        positions = [(self.labelnames.index(name), str(value)) for name, value in labels.items()
+                     if name in self.labelnames]
+        if len(positions) != len(labels):
+            return
+        for key in [key for key in self._children if all(key[i] == value for i, value in positions)]:
+            del self._children[key]
+        self._lookups.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(names, values, extra=()) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value) -> str:
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value)
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics: counters, gauges and latency histograms, rendered in the
+    Prometheus text format by `render` (served by `start_metrics_server`).
+
+    Histograms are LatencyHistograms (log-linear, nanoseconds); components that already
+    keep one, like Bot.tick_to_signal, attach it instead of recording twice. Cumulative
+    bucket counts are only computed at scrape time.
+    """
+    def __init__(self):
+        self._families = {}
+
+    def _family(self, name, help_text, kind, labels, factory) -> MetricFamily:
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = MetricFamily(name, help_text, kind, labels, factory)
+        elif family.kind != kind or family.labelnames != tuple(labels):
+            raise ValueError(f"Metric {name} is already registered as a {family.kind} with labels {family.labelnames}")
+        return family
+
+    def counter(self, name, help_text, labels=()) -> MetricFamily:
+        return self._family(name, help_text, 'counter', labels, Counter)
+
+    def gauge(self, name, help_text, labels=()) -> MetricFamily:
+        return self._family(name, help_text, 'gauge', labels, Gauge)
+
+    def histogram(self, name, help_text, labels=()) -> MetricFamily:
+        return self._family(name, help_text, 'histogram', labels, lambda: LatencyHistogram(name))
+
+    def forget(self, **labels):
+        """Drops the children with these label values from every family, e.g. forget(strategy='s1')."""
+        for family in self._families.values():
+            family.forget(**labels)
+
+    def render(self) -> str:
+        lines = []
+        for family in self._families.values():
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for key, child in list(family._children.items()):
+                if family.kind == 'histogram':
+                    lines.extend(self._render_histogram(family, key, child))
+                    continue
+                try:
+                    value = child.get()
+                except Exception as e:
+                    logger.debug(f"Metric {family.name} could not be read: {e}")
+                    continue
+                lines.append(f"{family.name}{_format_labels(family.labelnames, key)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_histogram(family, key, histogram):
+        counts = histogram.cumulative_counts([bound * 1e9 for bound in LATENCY_BUCKETS])
+        for bound, count in zip(LATENCY_BUCKETS, counts):
+            labels = _format_labels(family.labelnames, key, [('le', repr(bound))])
+            yield f"{family.name}_bucket{labels} {count}"
+        yield f"{family.name}_bucket{_format_labels(family.labelnames, key, [('le', '+Inf')])} {histogram.count}"
+        labels = _format_labels(family.labelnames, key)
+        yield f"{family.name}_sum{labels} {_format_value(histogram.total / 1e9)}"
+        yield f"{family.name}_count{labels} {histogram.count}"
+
+
+REGISTRY = MetricsRegistry()
+
+
+# --- HTTP endpoint ---
+
+async def _serve_scrape(reader, writer, registry):
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        # Headers are read and ignored
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b'\r\n', b'\n', b''):
+            pass
+        parts = request_line.decode('latin-1').split()
+        if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] in ('/metrics', '/'):
+            status, body = '200 OK', registry.render().encode()
+        else:
+            status, body = '404 Not Found', b'Not found\n'
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(port, host='127.0.0.1', registry=REGISTRY):
+    """Serves the registry at http://<host>:<port>/metrics until the returned server is closed."""
+    server = await asyncio.start_server(lambda r, w: _serve_scrape(r, w, registry), host, port)
+    logger.info(f"Metrics available at http://{host}:{port}/metrics")
+    return server
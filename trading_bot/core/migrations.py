@@ -0,0 +1,71 @@
+import logging
+import os
+import re
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), 'sql', 'migrations')
+# Serializes concurrent migrators (e.g. parallel backtest workers starting together)
+ADVISORY_LOCK_KEY = 7_301_942_113
+
+_FILENAME = re.compile(r'^(\d+)_(\w+)\.sql$')
+_migrations = {}
+
+
+def list_migrations(directory=MIGRATIONS_DIR) -> list:
+    """Returns [(version, name, path)] sorted by version. Cached; only the directory is listed."""
+    if directory not in _migrations:
+        found = []
+        for filename in os.listdir(directory):
+            match = _FILENAME.match(filename)
+            if match:
+                found.append((int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+        found.sort()
+        versions = [version for version, _, _ in found]
+        if len(versions) != len(set(versions)):
+            raise ValueError(f"Duplicate migration versions in {directory}")
+        _migrations[directory] = found
+    return _migrations[directory]
+
+
+async def migrate(conn) -> int:
+    """
+    Brings the schema up to date and returns its version.
+
+    Fast path: a single query reads the applied version and returns when it is current.
+    Otherwise pending migrations are applied in order, each in its own transaction,
+    under a Postgres advisory lock so concurrent processes apply each one exactly once.
+    """
+    migrations = list_migrations()
+    latest = migrations[-1][0] if migrations else 0
+    try:
+        current = await conn.fetchval("SELECT MAX(version) FROM schema_version")
+    except asyncpg.UndefinedTableError:
+        current = None
+    if current is not None and current >= latest:
+        return current
+
+    await conn.execute("SELECT pg_advisory_lock($1)", ADVISORY_LOCK_KEY)
+    try:
+        await conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+        """)
+        # Re-read under the lock: another process may have migrated meanwhile
+        applied = {record['version'] for record in await conn.fetch("SELECT version FROM schema_version")}
+        for version, name, path in migrations:
+            if version in applied:
+                continue
+            with open(path, 'r') as f:
+                sql = f.read()
+            async with conn.transaction():
+                await conn.execute(sql)
+                await conn.execute("INSERT INTO schema_version (version, name) VALUES ($1, $2)", version, name)
+            logger.info(f"Applied schema migration {version:04d}_{name}")
+        return latest
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", ADVISORY_LOCK_KEY)
@@ -0,0 +1,389 @@
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import random
+import time
+from datetime import datetime, timezone
+import pandas as pd
+from aiohttp import web, WSMsgType
+from trading_bot.core.matching_engine import MatchingEngine
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_symbol(symbol: str) -> str:
+    """Maps REST pairs (XBTUSD, XXBTZUSD) and WS symbols (BTC/USD) to one key."""
+    key = symbol.upper().replace('/', '')
+    if len(key) == 8 and key[0] in 'XZ' and key[4] in 'XZ':
+        key = key[1:4] + key[5:]
+    return key.replace('XBT', 'BTC')
+
+
+def rfc3339(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+class FaultInjector:
+    """Configurable latency and error injection applied to every REST call and WS push."""
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0,
+                 errors=('EService:Unavailable', 'EAPI:Rate limit exceeded'), seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.errors = errors
+        self._random = random.Random(seed)
+
+    async def delay(self):
+        if self.latency_ms or self.jitter_ms:
+            delay = self.latency_ms + self._random.uniform(0, self.jitter_ms)
+            await asyncio.sleep(delay / 1000)
+
+    def error(self):
+        if self.error_rate and self._random.random() < self.error_rate:
+            return self._random.choice(self.errors)
+        return None
+
+
+class MarketReplay:
+    """
+    Replays historical candles (Bot CSV layout) or trades as the exchange's market feed.
+
+    Each candle is expanded into open/high/low/close trades spread across its minute.
+    speed=1 replays in real time, speed=N N times faster and speed=0 as fast as possible.
+    """
+    def __init__(self, symbol, speed=0.0):
+        self.symbol = symbol
+        self.speed = speed
+        self.trades = []    # (timestamp, price, qty, side)
+        self.candles = []   # candle dicts in CSV column layout
+
+    def load_candles_csv(self, csv_path):
+        df = pd.read_csv(csv_path, header=None,
+                         names=['timestamp', 'open', 'high', 'low', 'close', 'volume', 'vwap'])
+        self.load_candles(df.to_dict('records'))
+        return self
+
+    def load_candles(self, candles):
+        for candle in candles:
+            self.candles.append(candle)
+            ts, qty = float(candle['timestamp']), float(candle['volume']) / 4 or 0.0001
+            up = candle['close'] >= candle['open']
+            path = ((candle['open'], 'buy'),
+                    (candle['low'] if up else candle['high'], 'sell' if up else 'buy'),
+                    (candle['high'] if up else candle['low'], 'buy' if up else 'sell'),
+                    (candle['close'], 'buy' if up else 'sell'))
+            for i, (price, side) in enumerate(path):
+                self.trades.append((ts + i * 15, float(price), qty, side))
+        return self
+
+    def load_trades_csv(self, csv_path):
+        """Loads a trade CSV with timestamp, price, volume[, side] columns."""
+        df = pd.read_csv(csv_path, header=None)
+        for row in df.itertuples(index=False):
+            side = row[3] if len(row) > 3 else 'buy'
+            self.trades.append((float(row[0]), float(row[1]), float(row[2]), side))
+        return self
+
+    async def run(self, on_trade):
+        previous = None
+        for trade in self.trades:
+            if self.speed and previous is not None:
+                await asyncio.sleep(max(0.0, (trade[0] - previous) / self.speed))
+            elif previous is not None:
+                await asyncio.sleep(0)
+            previous = trade[0]
+            await on_trade(*trade)
+
+
+class MockKrakenExchange:
+    """
+    Local stand-in for the Kraken REST and WS v2 APIs used by this project.
+
+    REST: public OHLC, Ticker and Trades; private AddOrder, AddOrderBatch, CancelOrder,
+    QueryOrders, OpenOrders and GetWebSocketsToken. Signatures are not verified.
+    WS v2 (/v2): trade, ohlc and executions channels.
+    """
+    def __init__(self, symbol='BTC/USD', replay: MarketReplay = None, faults: FaultInjector = None):
+        self.symbol = symbol
+        self.engines = {normalize_symbol(symbol): MatchingEngine(symbol)}
+        self.replay = replay
+        self.faults = faults or FaultInjector()
+        self.market_trades = []
+        self.candles = []
+        self._trade_ids = itertools.count(1)
+        self._subscribers = {'trade': set(), 'ohlc': set(), 'executions': set()}
+        self._replay_task = None
+        self._runner = None
+        self.app = self._build_app()
+
+    def _build_app(self):
+        app = web.Application()
+        app.router.add_route('*', '/0/public/{endpoint}', self._public)
+        app.router.add_post('/0/private/{endpoint}', self._private)
+        app.router.add_get('/v2', self._websocket)
+        return app
+
+    # --- Lifecycle ---
+
+    async def start(self, host='127.0.0.1', port=8080):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        logger.info(f"Mock Kraken exchange listening on http://{host}:{port} (WS: ws://{host}:{port}/v2)")
+        if self.replay:
+            self._replay_task = asyncio.create_task(self.replay.run(self.on_market_trade))
+
+    async def stop(self):
+        if self._replay_task:
+            self._replay_task.cancel()
+        if self._runner:
+            await self._runner.cleanup()
+
+    def engine(self, pair) -> MatchingEngine:
+        engine = self.engines.get(normalize_symbol(pair))
+        if engine is None:
+            raise ValueError('EQuery:Unknown asset pair')
+        return engine
+
+    # --- Market feed ---
+
+    async def on_market_trade(self, timestamp, price, qty, side):
+        engine = self.engines[normalize_symbol(self.symbol)]
+        self.market_trades.append((price, qty, timestamp, side[0], 'm', '', next(self._trade_ids)))
+        del self.market_trades[:-1000]
+        fills = engine.on_market_trade(price)
+        self._update_candle(timestamp, price, qty)
+        await self._broadcast('trade', {
+            'channel': 'trade', 'type': 'update',
+            'data': [{'symbol': self.symbol, 'side': side, 'price': price, 'qty': qty, 'ord_type': 'market',
+                      'trade_id': self.market_trades[-1][-1], 'timestamp': rfc3339(timestamp)}]
+        })
+        if self._subscribers['ohlc']:
+            c = self.candles[-1]
+            await self._broadcast('ohlc', {
+                'channel': 'ohlc', 'type': 'update',
+                'data': [{'symbol': self.symbol, 'open': c[1], 'high': c[2], 'low': c[3], 'close': c[4],
+                          'vwap': c[5], 'volume': c[6], 'trades': c[7], 'interval': 1,
+                          'interval_begin': rfc3339(c[0]), 'timestamp': rfc3339(timestamp)}]
+            })
+        if fills:
+            await self._publish_fills(fills)
+
+    def _update_candle(self, timestamp, price, qty):
+        start = int(timestamp // 60) * 60
+        if self.candles and self.candles[-1][0] == start:
+            c = self.candles[-1]
+            c[2], c[3], c[4] = max(c[2], price), min(c[3], price), price
+            c[6] += qty
+            c[5] = (c[5] * (c[6] - qty) + price * qty) / c[6]
+            c[7] += 1
+        else:
+            self.candles.append([start, price, price, price, price, price, qty, 1])
+            del self.candles[:-720]
+
+    # --- REST ---
+
+    def _ok(self, result):
+        return web.json_response({'error': [], 'result': result})
+
+    def _error(self, error):
+        return web.json_response({'error': [error]})
+
+    async def _params(self, request):
+        if request.method == 'GET':
+            return dict(request.query)
+        if request.content_type == 'application/json':
+            return await request.json()
+        return dict(await request.post())
+
+    async def _public(self, request):
+        await self.faults.delay()
+        error = self.faults.error()
+        if error:
+            return self._error(error)
+        endpoint = request.match_info['endpoint']
+        params = await self._params(request)
+        try:
+            self.engine(params.get('pair', self.symbol))
+        except ValueError as e:
+            return self._error(str(e))
+        symbol = normalize_symbol(self.symbol).replace('BTC', 'XBT')
+        key = f"X{symbol[:3]}Z{symbol[3:]}"
+        if endpoint == 'OHLC':
+            since = float(params.get('since', 0))
+            rows = [[c[0], str(c[1]), str(c[2]), str(c[3]), str(c[4]), str(c[5]), str(c[6]), c[7]]
+                    for c in self.candles if c[0] > since]
+            last = self.candles[-2][0] if len(self.candles) > 1 else 0
+            return self._ok({key: rows, 'last': last})
+        if endpoint == 'Trades':
+            since = int(params.get('since', 0))
+            rows = [[str(t[0]), str(t[1]), t[2], t[3], t[4], t[5], t[6]]
+                    for t in self.market_trades if t[2] * 1e9 > since][:int(params.get('count', 1000))]
+            last = str(int(rows[-1][2] * 1e9)) if rows else str(since)
+            return self._ok({key: rows, 'last': last})
+        if endpoint == 'Ticker':
+            price = self.engine(self.symbol).last_price
+            return self._ok({key: {'c': [str(price), '0']}})
+        return self._error('EGeneral:Unknown method')
+
+    async def _private(self, request):
+        await self.faults.delay()
+        error = self.faults.error()
+        if error:
+            return self._error(error)
+        endpoint = request.match_info['endpoint']
+        params = await self._params(request)
+        try:
+            if endpoint == 'AddOrder':
+                return self._ok(await self._add_order(params))
+            if endpoint == 'AddOrderBatch':
+                orders = params.get('orders')
+                if isinstance(orders, str):
+                    orders = json.loads(orders)
+                results = []
+                for order in orders:
+                    order.setdefault('pair', params.get('pair'))
+                    results.append(await self._add_order(order))
+                return self._ok({'orders': [{'descr': r['descr'], 'txid': r['txid'][0]} for r in results]})
+            if endpoint == 'CancelOrder':
+                order = self.engine(self.symbol).cancel(params.get('txid') or params.get('cl_ord_id'))
+                if order:
+                    await self._publish_execution(order, 'canceled')
+                return self._ok({'count': 1 if order else 0})
+            if endpoint == 'QueryOrders':
+                engine = self.engine(self.symbol)
+                orders = [engine.query(txid) for txid in str(params.get('txid', '')).split(',')]
+                return self._ok({o.order_id: self._order_info(o) for o in orders if o is not None})
+            if endpoint == 'OpenOrders':
+                return self._ok({'open': {o.order_id: o.to_dict() for o in self.engine(self.symbol).open_orders()}})
+            if endpoint == 'GetWebSocketsToken':
+                return self._ok({'token': 'mock-token', 'expires': 900})
+        except ValueError as e:
+            return self._error(str(e))
+        return self._error('EGeneral:Unknown method')
+
+    @staticmethod
+    def _order_info(order) -> dict:
+        """An order as QueryOrders / OpenOrders describe it."""
+        status = {'filled': 'closed', 'canceled': 'canceled'}.get(order.status, 'open')
+        return {'status': status, 'vol': str(order.volume), 'vol_exec': str(order.filled),
+                'cost': str(order.notional), 'price': str(order.avg_price),
+                'descr': {'type': order.side, 'ordertype': order.order_type, 'price': str(order.price or 0)}}
+
+    async def _add_order(self, params):
+        engine = self.engine(params['pair'])
+        order, fills = engine.submit(
+            side=params['type'],
+            order_type=params['ordertype'],
+            volume=float(params['volume']),
+            price=params.get('price'),
+            cl_ord_id=params.get('cl_ord_id')
+        )
+        await self._publish_execution(order, 'new')
+        if fills:
+            await self._publish_fills(fills)
+        price = f" @ limit {order.price}" if order.order_type == 'limit' else " @ market"
+        return {'descr': {'order': f"{order.side} {order.volume} {params['pair']}{price}"}, 'txid': [order.order_id]}
+
+    # --- WS v2 ---
+
+    async def _websocket(self, request):
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                message = json.loads(msg.data)
+                method = message.get('method')
+                params = message.get('params', {})
+                channel = params.get('channel')
+                if method == 'subscribe' and channel in self._subscribers:
+                    if channel == 'executions' and not params.get('token'):
+                        await ws.send_json({'method': method, 'success': False, 'error': 'Token required'})
+                        continue
+                    self._subscribers[channel].add(ws)
+                    await ws.send_json({'method': method, 'success': True, 'result': {'channel': channel}})
+                elif method == 'unsubscribe' and channel in self._subscribers:
+                    self._subscribers[channel].discard(ws)
+                    await ws.send_json({'method': method, 'success': True, 'result': {'channel': channel}})
+                elif method == 'ping':
+                    await ws.send_json({'method': 'pong', 'req_id': message.get('req_id')})
+        finally:
+            for subscribers in self._subscribers.values():
+                subscribers.discard(ws)
+        return ws
+
+    async def _broadcast(self, channel, payload):
+        subscribers = self._subscribers[channel]
+        if not subscribers:
+            return
+        await self.faults.delay()
+        data = json.dumps(payload)
+        for ws in list(subscribers):
+            try:
+                await ws.send_str(data)
+            except Exception:
+                subscribers.discard(ws)
+
+    async def _publish_execution(self, order, exec_type, fill=None):
+        report = {
+            'order_id': order.order_id,
+            'cl_ord_id': order.cl_ord_id,
+            'symbol': self.symbol,
+            'side': order.side,
+            'order_type': order.order_type,
+            'order_qty': order.volume,
+            'cum_qty': order.filled,
+            'avg_price': order.avg_price,
+            'order_status': order.status,
+            'exec_type': exec_type,
+            'timestamp': rfc3339(time.time())
+        }
+        if exec_type == 'new':
+            # Reported as acknowledged before any of the fills that follow it
+            report.update({'cum_qty': 0.0, 'avg_price': 0.0, 'order_status': 'new'})
+        if fill is not None:
+            report.update({'exec_id': f"T{next(self._trade_ids)}", 'last_qty': fill.qty,
+                           'last_price': fill.price, 'liquidity_ind': fill.liquidity})
+        await self._broadcast('executions', {'channel': 'executions', 'type': 'update', 'data': [report]})
+
+    async def _publish_fills(self, fills):
+        for fill in fills:
+            await self._publish_execution(fill.order, 'trade', fill)
+
+
+async def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Local mock Kraken exchange (REST + WS v2)")
+    parser.add_argument("--symbol", default="BTC/USD")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--candles_csv", help="Historical candles in the Bot CSV layout")
+    parser.add_argument("--trades_csv", help="Historical trades: timestamp, price, volume[, side]")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier, 0 for max speed")
+    parser.add_argument("--latency_ms", type=float, default=0.0)
+    parser.add_argument("--jitter_ms", type=float, default=0.0)
+    parser.add_argument("--error_rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    replay = None
+    if args.candles_csv or args.trades_csv:
+        replay = MarketReplay(args.symbol, speed=args.speed)
+        if args.candles_csv:
+            replay.load_candles_csv(args.candles_csv)
+        if args.trades_csv:
+            replay.load_trades_csv(args.trades_csv)
+    exchange = MockKrakenExchange(args.symbol, replay,
+                                  FaultInjector(args.latency_ms, args.jitter_ms, args.error_rate))
+    await exchange.start(args.host, args.port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await exchange.stop()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from trading_bot.core.loader import compile_file, load_config_file, load_strategy_class
+from trading_bot.strategies.indicators import IndicatorCache, IndicatorSet
+
+logger = logging.getLogger(__name__)
+
+# Per-process cache of loaded datasets, so each worker parses a CSV once per sweep
+_datasets = {}
+# Per-process indicator series per dataset, filled before the pool forks so workers share them
+_indicator_caches = {}
+
+
+def sample_config(space: dict, rng: random.Random) -> dict:
+    """
+    Draws one configuration from a search space. Each entry maps a dotted config path
+    to either [low, high] (two numbers: an inclusive range, integer when both bounds are
+    integers) or a list of choices, e.g.
+    {'indicators.short_window': [5, 50], 'stop_loss_pct': [0.005, 0.05], 'indicators.ma': ['sma', 'ema']}
+    """
+    config = {}
+    for path, values in space.items():
+        if (len(values) == 2 and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values)):
+            low, high = values
+            if isinstance(low, int) and isinstance(high, int):
+                config[path] = rng.randint(low, high)
+            else:
+                config[path] = rng.uniform(low, high)
+        else:
+            config[path] = rng.choice(list(values))
+    return config
+
+
+def pareto_front(results: list) -> list:
+    """Results not dominated on (higher sharpe_ratio, shallower max_drawdown), best Sharpe first."""
+    ranked = sorted(results, key=lambda r: (-r['sharpe_ratio'], -r['max_drawdown']))
+    front = []
+    best_drawdown = -math.inf
+    # max_drawdown is <= 0, so "shallower" means larger
+    for result in ranked:
+        if result['max_drawdown'] > best_drawdown:
+            front.append(result)
+            best_drawdown = result['max_drawdown']
+    return front
+
+
+def _worker_init():
+    # Trade-by-trade INFO logs from thousands of backtests would swamp the log
+    logging.getLogger('trading_bot').setLevel(logging.WARNING)
+
+
+def _candles(csv_datapath):
+    if csv_datapath not in _datasets:
+        from trading_bot.core.bot import load_candles_csv
+        _datasets[csv_datapath] = load_candles_csv(csv_datapath)
+    return _datasets[csv_datapath]
+
+
+def _indicator_cache(csv_datapath) -> IndicatorCache:
+    if csv_datapath not in _indicator_caches:
+        _indicator_caches[csv_datapath] = IndicatorCache(_candles(csv_datapath)['close'].to_numpy(dtype=float))
+    return _indicator_caches[csv_datapath]
+
+
+def evaluate_config(strategy_filepath, config_filepath, csv_datapath, overrides, rows=None) -> dict:
+    """Backtests one configuration on the first `rows` candles of a dataset. Runs in a worker process."""
+    from trading_bot.core.bot import Bot
+    try:
+        candles = _candles(csv_datapath)
+        if rows is not None:
+            candles = candles.iloc[:rows]
+        bot = Bot(strategy_filepath, config_filepath, csv_datapath, config_overrides=overrides)
+        # Sweep results stay in memory; nothing is journaled per trade
+        bot.execution.db = None
+        bot.indicator_cache = _indicator_cache(csv_datapath)
+        metrics = asyncio.run(bot.run_backtest(candles))
+        sharpe = float(metrics['sharpe_ratio'])
+        return {
+            'params': overrides,
+            'sharpe_ratio': sharpe if math.isfinite(sharpe) else -math.inf,
+            'max_drawdown': float(metrics['max_drawdown']),
+            'final_equity': float(metrics['final_equity']),
+            'total_trades': int(metrics['total_trades']),
+        }
+    except Exception as e:
+        return {'params': overrides, 'error': f"{type(e).__name__}: {e}"}
+
+
+class SuccessiveHalving:
+    """
+    Random-search + successive-halving parameter optimizer for a generated strategy.
+
+    `n_configs` configurations are sampled from the search space and backtested on a
+    short prefix of the dataset. Each rung keeps the best 1/eta (by Sharpe) and gives
+    the survivors eta times more data, until about `final_configs` remain and are run on
+    the full dataset. Evaluations are spread over a process pool, so with the defaults
+    (1000 configurations, eta=3) a sweep costs about as much as 60 full backtests.
+
+    Indicators declared through an IndicatorSet are computed once per distinct
+    (kind, period) on the full dataset before the pool starts; the forked workers share
+    those arrays and slice them for every rung, so indicator work scales with the
+    number of distinct indicators rather than with the number of configurations.
+    """
+    def __init__(self, strategy_filepath, config_filepath, csv_datapath, space: dict, n_configs=1000,
+                 eta=3, final_configs=10, min_rows=200, max_workers=None, seed=None):
+        self.strategy_filepath = strategy_filepath
+        self.config_filepath = config_filepath
+        self.csv_datapath = csv_datapath
+        self.space = space
+        self.n_configs = n_configs
+        self.eta = eta
+        self.final_configs = final_configs
+        self.min_rows = min_rows
+        self.max_workers = max_workers or os.cpu_count()
+        self.rng = random.Random(seed)
+
+    def schedule(self, total_rows) -> list:
+        """[(configs, rows)] per rung; the last rung always uses the full dataset."""
+        rungs = 1 + max(0, int(math.log(max(self.n_configs / self.final_configs, 1)) / math.log(self.eta)))
+        # The first rung needs enough candles for indicators to warm up and trades to happen
+        while rungs > 1 and total_rows / self.eta ** (rungs - 1) < self.min_rows:
+            rungs -= 1
+        return [
+            (max(1, self.n_configs // self.eta ** rung), total_rows if rung == rungs - 1
+             else int(total_rows / self.eta ** (rungs - 1 - rung)))
+            for rung in range(rungs)
+        ]
+
+    def _prefetch_indicators(self, candidates) -> int:
+        """Computes every distinct indicator the candidates declare. Returns how many there are."""
+        from trading_bot.core.bot import apply_overrides
+        StrategyClass = load_strategy_class(self.strategy_filepath)
+        declared = set()
+        for overrides in candidates:
+            try:
+                config = apply_overrides(load_config_file(self.config_filepath), dict(overrides))
+                indicators = getattr(StrategyClass(config['indicators']), 'indicators', None)
+            except Exception:
+                # The worker reports it as a failed evaluation
+                continue
+            if isinstance(indicators, IndicatorSet):
+                declared.update(indicators.spec.values())
+        _indicator_cache(self.csv_datapath).prefetch(declared)
+        return len(declared)
+
+    def _search(self, candidates, schedule):
+        """
+        Drives the rungs independently of where backtests run: yields (candidates, rows)
+        for each rung, receives their results, and returns the summary.
+        """
+        evaluations = errors = 0
+        first_error = None
+        results = []
+        for rung, (keep, rows) in enumerate(schedule):
+            candidates = candidates[:keep] if rung else candidates
+            results = yield candidates, rows
+            evaluations += len(results)
+            failed = [r for r in results if 'error' in r]
+            errors += len(failed)
+            first_error = first_error or (failed[0]['error'] if failed else None)
+            results = sorted((r for r in results if 'error' not in r),
+                             key=lambda r: (-r['sharpe_ratio'], -r['max_drawdown']))
+            if not results:
+                logger.warning(f"Rung {rung}: every configuration failed ({first_error})")
+                break
+            logger.info(f"Rung {rung}: {len(candidates)} configs on {rows} candles, {len(failed)} failed, "
+                        f"best Sharpe {results[0]['sharpe_ratio']:.3f}")
+            candidates = [r['params'] for r in results]
+
+        front = pareto_front(results)
+        return {
+            'best': front[0] if front else None,
+            'pareto_front': front,
+            'configs_sampled': self.n_configs,
+            'evaluations': evaluations,
+            'failed_evaluations': errors,
+            'full_data_candidates': len(results),
+            'rungs': [{'configs': keep, 'candles': rows} for keep, rows in schedule],
+            'first_error': first_error,
+        }
+
+    def run(self) -> dict:
+        started = time.perf_counter()
+        # Loaded before the pool forks, so workers inherit the dataset and compiled strategy
+        total_rows = len(_candles(self.csv_datapath))
+        load_strategy_class(self.strategy_filepath)
+        compile_file(self.config_filepath)
+        candidates = [sample_config(self.space, self.rng) for _ in range(self.n_configs)]
+        distinct_indicators = self._prefetch_indicators(candidates)
+        search = self._search(candidates, self.schedule(total_rows))
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_worker_init) as pool:
+            try:
+                candidates, rows = next(search)
+                while True:
+                    chunksize = max(1, len(candidates) // (self.max_workers * 4))
+                    results = list(pool.map(
+                        evaluate_config,
+                        [self.strategy_filepath] * len(candidates), [self.config_filepath] * len(candidates),
+                        [self.csv_datapath] * len(candidates), candidates, [rows] * len(candidates),
+                        chunksize=chunksize,
+                    ))
+                    candidates, rows = search.send(results)
+            except StopIteration as done:
+                summary = done.value
+        summary['distinct_indicators'] = distinct_indicators
+        summary['elapsed_seconds'] = round(time.perf_counter() - started, 2)
+        return summary
+
+    async def run_on_farm(self, coordinator) -> dict:
+        """
+        The same search with every backtest sent to a started BacktestCoordinator, so the
+        evaluations of a rung are spread over however many farm workers are connected.
+        """
+        started = time.perf_counter()
+        total_rows = len(_candles(self.csv_datapath))
+        candidates = [sample_config(self.space, self.rng) for _ in range(self.n_configs)]
+        search = self._search(candidates, self.schedule(total_rows))
+        try:
+            candidates, rows = next(search)
+            while True:
+                results = await coordinator.map(self.strategy_filepath, self.config_filepath, self.csv_datapath,
+                                                candidates, rows)
+                candidates, rows = search.send(results)
+        except StopIteration as done:
+            summary = done.value
+        summary['elapsed_seconds'] = round(time.perf_counter() - started, 2)
+        return summary
@@ -0,0 +1,260 @@
+import asyncio
+import logging
+import time
+import uuid
+from trading_bot.core.kraken_api import KrakenWS
+from trading_bot.core.latency import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ('filled', 'canceled', 'expired', 'rejected')
+
+
+class ManagedOrder:
+    """Client-side view of an order, keyed by its client order ID."""
+    __slots__ = ('cl_ord_id', 'order_id', 'symbol', 'side', 'order_type', 'volume', 'price',
+                 'status', 'filled', 'notional', 'error', 'submitted_ns', 'context', 'done')
+
+    def __init__(self, symbol, side, order_type, volume, price=None, context=None):
+        self.cl_ord_id = str(uuid.uuid4())
+        self.order_id = None
+        self.symbol = symbol
+        self.side = side
+        self.order_type = order_type
+        self.volume = volume
+        self.price = price
+        self.status = 'pending_new'
+        self.filled = 0.0
+        self.notional = 0.0
+        self.error = None
+        self.submitted_ns = time.perf_counter_ns()
+        self.context = context
+        self.done = asyncio.get_running_loop().create_future()
+
+    @property
+    def avg_price(self):
+        return self.notional / self.filled if self.filled else 0.0
+
+    @property
+    def is_open(self):
+        return self.status not in TERMINAL_STATUSES
+
+    def to_leg(self) -> dict:
+        leg = {'ordertype': self.order_type, 'type': self.side, 'volume': self.volume, 'cl_ord_id': self.cl_ord_id}
+        if self.price is not None:
+            leg['price'] = self.price
+        return leg
+
+
+class OrderManager:
+    """
+    Submits orders without blocking the caller and tracks them through the WS v2
+    `executions` channel.
+
+    `submit` returns a ManagedOrder immediately while the REST call runs in a background
+    task. Fills arrive as execution reports and are applied exactly once (by exec_id),
+    updating the order and the net position. Callers react through the on_fill /
+    on_done callbacks, or by awaiting `order.done`.
+    """
+    def __init__(self, rest, symbol, ws_url, on_fill=None, on_done=None):
+        self.rest = rest
+        self.symbol = symbol
+        self.ws_url = ws_url
+        self.on_fill = on_fill          # on_fill(order, qty, price)
+        self.on_done = on_done          # on_done(order) once the order is terminal
+        self.orders = {}                # cl_ord_id -> ManagedOrder
+        self.position = 0.0             # net filled base volume, positive when long
+        self.submit_to_ack = LatencyHistogram('submit_to_ack')
+        self.submit_to_fill = LatencyHistogram('submit_to_fill')
+        self._order_ids = {}            # exchange order_id -> cl_ord_id
+        self._exec_ids = set()
+        self._tasks = set()
+        self._ws = None
+        self._ws_task = None
+
+    async def start(self):
+        self._ws = KrakenWS(self.ws_url, self.on_execution_message)
+        self._ws_task = asyncio.create_task(
+            self._ws.connect_and_stream(None, channel="executions", token_provider=self.rest.get_websockets_token)
+        )
+
+    async def close(self):
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._ws:
+            self._ws.running = False
+        if self._ws_task:
+            self._ws_task.cancel()
+
+    @property
+    def open_orders(self) -> list:
+        return [order for order in self.orders.values() if order.is_open]
+
+    # --- Submission ---
+
+    def submit(self, side, volume, order_type='market', price=None, context=None) -> ManagedOrder:
+        """Queues an order for submission and returns its ManagedOrder without waiting."""
+        order = ManagedOrder(self.symbol, side, order_type, volume, price, context)
+        self.orders[order.cl_ord_id] = order
+        self._spawn(self._send_order(order))
+        return order
+
+    def submit_batch(self, legs, context=None) -> list:
+        """
+        Submits several orders in one AddOrderBatch request, e.g. the legs of a
+        multi-leg exit. legs: dicts with side, volume and optional order_type / price.
+        """
+        orders = [
+            ManagedOrder(self.symbol, leg['side'], leg.get('order_type', 'market'), leg['volume'],
+                         leg.get('price'), context)
+            for leg in legs
+        ]
+        for order in orders:
+            self.orders[order.cl_ord_id] = order
+        if len(orders) == 1:
+            self._spawn(self._send_order(orders[0]))
+        else:
+            self._spawn(self._send_batch(orders))
+        return orders
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send_order(self, order):
+        try:
+            resp = await self.rest.add_order(order.symbol, order.side, order.order_type, order.volume,
+                                             price=order.price, cl_ord_id=order.cl_ord_id)
+            self._acknowledge(order, resp['txid'][0])
+        except Exception as e:
+            self._reject(order, e)
+
+    async def _send_batch(self, orders):
+        try:
+            resp = await self.rest.add_order_batch(self.symbol, [order.to_leg() for order in orders])
+            for order, result in zip(orders, resp['orders']):
+                if result.get('error'):
+                    self._reject(order, result['error'])
+                else:
+                    self._acknowledge(order, result['txid'])
+        except Exception as e:
+            for order in orders:
+                self._reject(order, e)
+
+    def _acknowledge(self, order, order_id):
+        self.submit_to_ack.record(time.perf_counter_ns() - order.submitted_ns)
+        order.order_id = order_id
+        self._order_ids[order_id] = order.cl_ord_id
+        if order.status == 'pending_new':
+            order.status = 'new'
+        logger.info(f"Order {order.cl_ord_id} acknowledged as {order_id}")
+
+    def _reject(self, order, error):
+        logger.error(f"Order {order.cl_ord_id} ({order.side} {order.volume}) rejected: {error}")
+        order.error = str(error)
+        self._finish(order, 'rejected')
+
+    def _finish(self, order, status):
+        if not order.is_open:
+            return
+        order.status = status
+        if not order.done.done():
+            order.done.set_result(order)
+        if self.on_done:
+            self._callback(self.on_done, order)
+
+    def _callback(self, callback, *args):
+        # A failing consumer must not take down the executions stream
+        try:
+            callback(*args)
+        except Exception as e:
+            logger.error(f"Order callback {callback.__name__} failed: {e}", exc_info=True)
+
+    # --- Reconciliation ---
+
+    async def reconcile(self, order):
+        """
+        Settles an order whose execution reports are overdue (e.g. lost in a WS reconnect)
+        from its state over REST: missing fills are applied like execution reports, an
+        order still open is cancelled first, so the order ends with its actual fills.
+        Returns False if the order could not be settled (not acknowledged yet, REST down).
+        """
+        if not order.is_open:
+            return True
+        if order.order_id is None:
+            logger.warning(f"Order {order.cl_ord_id} is not acknowledged yet; cannot reconcile it.")
+            return False
+        try:
+            info = await self._query(order)
+            if info.get('status') in ('pending', 'open'):
+                await self.rest.cancel_order(order.order_id)
+                info = await self._query(order)
+        except Exception as e:
+            logger.error(f"Could not reconcile order {order.cl_ord_id} over REST: {e}")
+            return False
+        executed = float(info.get('vol_exec', 0))
+        if executed > order.filled * (1 + 1e-9):
+            qty = executed - order.filled
+            self.apply_execution({
+                'order_id': order.order_id, 'exec_type': 'trade', 'exec_id': f"rest-{order.order_id}-{executed}",
+                'last_qty': qty, 'last_price': (float(info.get('cost', 0)) - order.notional) / qty
+            })
+        if order.is_open:
+            status = info.get('status')
+            self._finish(order, status if status in ('canceled', 'expired') else 'canceled')
+        logger.warning(f"Order {order.cl_ord_id} reconciled over REST: {order.filled} filled ({order.status}).")
+        return True
+
+    async def _query(self, order) -> dict:
+        result = await self.rest.query_orders(order.order_id)
+        if order.order_id not in result:
+            raise KeyError(f"QueryOrders did not return {order.order_id}")
+        return result[order.order_id]
+
+    # --- Execution reports ---
+
+    async def on_execution_message(self, message):
+        """KrakenWS callback for the v2 `executions` channel."""
+        if message.get('channel') != 'executions':
+            return
+        for report in message.get('data', []):
+            self.apply_execution(report)
+
+    def apply_execution(self, report):
+        cl_ord_id = report.get('cl_ord_id') or self._order_ids.get(report.get('order_id'))
+        order = self.orders.get(cl_ord_id)
+        if order is None:
+            return
+        if order.order_id is None and report.get('order_id'):
+            order.order_id = report['order_id']
+            self._order_ids[order.order_id] = cl_ord_id
+
+        exec_type = report.get('exec_type')
+        if exec_type == 'trade':
+            exec_id = report.get('exec_id')
+            if exec_id is not None:
+                if exec_id in self._exec_ids:
+                    return
+                self._exec_ids.add(exec_id)
+            qty = float(report['last_qty'])
+            price = float(report['last_price'])
+            order.filled += qty
+            order.notional += qty * price
+            self.position += qty if order.side == 'buy' else -qty
+            if order.status in ('pending_new', 'new'):
+                order.status = 'partially_filled'
+            if self.on_fill:
+                self._callback(self.on_fill, order, qty, price)
+
+        status = report.get('order_status')
+        if order.filled >= order.volume * (1 - 1e-9):
+            # Completion is judged from applied fills, so a report that already says
+            # 'filled' cannot finish the order before its last fill has been seen
+            if order.is_open:
+                self.submit_to_fill.record(time.perf_counter_ns() - order.submitted_ns)
+            self._finish(order, 'filled')
+        elif status in ('canceled', 'expired') or exec_type in ('canceled', 'expired'):
+            self._finish(order, status if status in ('canceled', 'expired') else exec_type)
+        elif status in ('new', 'partially_filled') and order.status == 'pending_new':
+            order.status = status
@@ -0,0 +1,223 @@
+import asyncio
+import calendar
+import glob
+import logging
+import math
+import mmap
+import os
+import re
+import socket
+import struct
+import time
+from trading_bot.config import cfg
+
+logger = logging.getLogger(__name__)
+
+# --- Segment format ---
+#
+# A recording is a directory of append-only segments `<stream>-<session>-<seq>.wsr`, where
+# the session (`<UTC start>-<host>-<pid>`) identifies the recording process, so several
+# processes can record into one directory without sharing a file:
+#
+#   header   '<4sHH'   magic b'WSRC', version, reserved (0)
+#   frames   '<qI'     receive time (ns since the epoch), frame length, then the raw frame bytes
+#
+# A crash can only leave a torn last frame, which readers stop at.
+
+MAGIC = b'WSRC'
+VERSION = 1
+HEADER = struct.Struct('<4sHH')
+FRAME = struct.Struct('<qI')
+SUFFIX = '.wsr'
+SESSION_TIME_FORMAT = '%Y%m%dT%H%M%S'
+
+
+def new_session() -> str:
+    host = re.sub(r'[^A-Za-z0-9_.-]', '_', socket.gethostname())
+    return f"{time.strftime(SESSION_TIME_FORMAT, time.gmtime())}-{host}-{os.getpid()}"
+
+
+def _segment_paths(directory, stream) -> dict:
+    """session -> its segment paths in sequence order"""
+    pattern = re.compile(rf"^{re.escape(stream)}-(.+)-(\d+){re.escape(SUFFIX)}$")
+    numbered = []
+    for path in glob.glob(os.path.join(glob.escape(directory), f"{glob.escape(stream)}-*{SUFFIX}")):
+        match = pattern.match(os.path.basename(path))
+        if match:
+            numbered.append((match.group(1), int(match.group(2)), path))
+    sessions = {}
+    for session, _, path in sorted(numbered):
+        sessions.setdefault(session, []).append(path)
+    return sessions
+
+
+class FrameRecorder:
+    """
+    Tees raw WS frames with their receive time into `directory`. Writes are buffered and
+    flushed within `flush_interval` seconds (by an event loop timer, so a quiet feed does
+    not hold frames back); a new segment starts once the current one reaches `segment_bytes`.
+    """
+    def __init__(self, directory, stream='trade', segment_bytes=64 << 20, flush_interval=1.0, session=None):
+        self.directory = directory
+        self.stream = stream
+        self.session = session or new_session()
+        self.segment_bytes = segment_bytes
+        self.flush_interval = flush_interval
+        self.frames = 0
+        self.bytes = 0
+        self._file = None
+        self._size = 0
+        self._seq = len(_segment_paths(directory, stream).get(self.session, []))
+        self._flushed_at = 0.0
+        self._flush_timer = None
+
+    def _open_segment(self):
+        if self._file is not None:
+            self._file.close()
+        os.makedirs(self.directory, exist_ok=True)
+        while True:
+            self._seq += 1
+            path = os.path.join(self.directory, f"{self.stream}-{self.session}-{self._seq:06d}{SUFFIX}")
+            try:
+                self._file = open(path, 'xb', buffering=1 << 20)
+                break
+            except FileExistsError:
+                continue
+        self._file.write(HEADER.pack(MAGIC, VERSION, 0))
+        self._size = HEADER.size
+        logger.info(f"Recording {self.stream} frames to {path}")
+
+    def write(self, frame, received_ns=None):
+        if isinstance(frame, str):
+            frame = frame.encode('utf-8')
+        if self._file is None or self._size >= self.segment_bytes:
+            self._open_segment()
+        self._file.write(FRAME.pack(time.time_ns() if received_ns is None else received_ns, len(frame)))
+        self._file.write(frame)
+        self._size += FRAME.size + len(frame)
+        self.frames += 1
+        self.bytes += FRAME.size + len(frame)
+        if self._flush_timer is None:
+            try:
+                self._flush_timer = asyncio.get_running_loop().call_later(self.flush_interval, self.flush)
+            except RuntimeError:
+                # No event loop to time the flush: flush on the first write after the interval
+                if time.monotonic() - self._flushed_at >= self.flush_interval:
+                    self.flush()
+
+    def flush(self):
+        self._flush_timer = None
+        if self._file is not None:
+            self._file.flush()
+        self._flushed_at = time.monotonic()
+
+    def close(self):
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def open_recorder(stream='trade'):
+    """A FrameRecorder under WS_RECORD_DIR, or None when recording is off."""
+    if not cfg.WS_RECORD_DIR:
+        return None
+    return FrameRecorder(cfg.WS_RECORD_DIR, stream)
+
+
+class Replayer:
+    """
+    Reads a recording through memory-mapped segments and feeds the frames to an async
+    handler, typically KrakenWS.replay's dispatch, i.e. the same path live frames take.
+
+    Without a `session` every session of the stream is replayed, one after the other in
+    start order; sessions that were recorded at the same time (several processes on
+    one directory) must be replayed one at a time.
+    """
+    def __init__(self, directory, stream='trade', session=None):
+        self.directory = directory
+        self.stream = stream
+        self.session = session
+
+    def sessions(self) -> list:
+        return sorted(_segment_paths(self.directory, self.stream))
+
+    def segments(self) -> list:
+        sessions = _segment_paths(self.directory, self.stream)
+        if self.session is not None:
+            if self.session not in sessions:
+                raise ValueError(f"No {self.stream} session {self.session} in {self.directory}")
+            return sessions[self.session]
+        names = sorted(sessions)
+        for previous, name in zip(names, names[1:]):
+            # A session still being written when the next one started was a concurrent feed
+            if os.path.getmtime(sessions[previous][-1]) > self._started(name) + 1:
+                raise ValueError(f"Sessions {previous} and {name} overlap; replay one of them "
+                                 f"(sessions: {', '.join(names)})")
+        return [path for name in names for path in sessions[name]]
+
+    @staticmethod
+    def _started(session) -> float:
+        return calendar.timegm(time.strptime(session.split('-', 1)[0], SESSION_TIME_FORMAT))
+
+    def frames(self):
+        """Yields (received_ns, frame bytes) in recording order."""
+        for path in self.segments():
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size < HEADER.size:
+                    continue
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    view = memoryview(mapped)
+                    try:
+                        magic, version, _ = HEADER.unpack_from(view)
+                        if magic != MAGIC or version != VERSION:
+                            logger.warning(f"Skipping {path}: not a version {VERSION} recording")
+                            continue
+                        offset, end = HEADER.size, len(view)
+                        while offset + FRAME.size <= end:
+                            received_ns, length = FRAME.unpack_from(view, offset)
+                            offset += FRAME.size
+                            if offset + length > end:
+                                logger.warning(f"{path} ends with a torn frame; stopping there")
+                                break
+                            yield received_ns, bytes(view[offset:offset + length])
+                            offset += length
+                    finally:
+                        view.release()
+
+    async def run(self, handler, speed=1.0) -> dict:
+        """
+        Replays every frame through `await handler(frame_bytes)`. speed=1 keeps the recorded
+        gaps, speed=N divides them by N, None (or inf) sends frames as fast as the
+        handler takes them. Returns the frame count, wall and recorded duration and the
+        worst lag behind schedule.
+        """
+        realtime = speed is not None and math.isfinite(speed) and speed > 0
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        first_ns = last_ns = None
+        frames = 0
+        max_lag = 0.0
+        for received_ns, frame in self.frames():
+            if first_ns is None:
+                first_ns = received_ns
+            last_ns = received_ns
+            if realtime:
+                delay = max(0, received_ns - first_ns) / 1e9 / speed - (loop.time() - started)
+                if delay > 0.001:
+                    await asyncio.sleep(delay)
+                else:
+                    max_lag = max(max_lag, -delay)
+            if not realtime and frames % 256 == 0:
+                # Let order workers and telemetry run even at full speed
+                await asyncio.sleep(0)
+            await handler(frame)
+            frames += 1
+        return {
+            'frames': frames,
+            'seconds': round(loop.time() - started, 3),
+            'recorded_seconds': round((last_ns - first_ns) / 1e9, 3) if frames else 0.0,
+            'max_lag_ms': round(max_lag * 1000, 3),
+        }
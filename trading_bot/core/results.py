@@ -1,11 +1,10 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 from trading_bot.config import cfg
 
 class Results:
     def __init__(self, trades, portfolio_history, initial_capital, risk_free_rate=0.0401):
-        self.trades = pd.DataFrame(trades)
+        self.trades = pd.DataFrame(trades, columns=['side', 'price', 'amount', 'timestamp', 'pnl'])
         self.portfolio_history = pd.DataFrame(portfolio_history)
         self.initial_capital = initial_capital
         self.risk_free_rate = risk_free_rate
@@ -52,7 +51,8 @@ class Results:
             'avg_loss': avg_loss,
             'sharpe_ratio': sharpe_ratio,
             'max_drawdown': max_drawdown,
-            'final_portfolio_value': equity_curve.iloc[-1]
+            'final_portfolio_value': equity_curve.iloc[-1],
+            'final_equity': equity_curve.iloc[-1]
         }
 
     def calculate_sharpe_ratio(self, returns):
@@ -74,6 +74,8 @@ class Results:
         return drawdown.min()
 
     def generate_equity_curve(self, output_path='equity_curve.png'):
+        # matplotlib costs ~0.5 s to import; only plotting pays for it
+        import matplotlib.pyplot as plt
         plt.figure(figsize=(12, 6))
         plt.plot(self.portfolio_history['timestamp'], self.portfolio_history['portfolio_value'])
         plt.title('Equity Curve')
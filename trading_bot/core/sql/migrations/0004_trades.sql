@@ -0,0 +1,86 @@
+-- Trades, range-partitioned by fill time into monthly partitions.
+-- Rows outside every monthly partition land in trades_default.
+
+-- The original trades table was unpartitioned and keyed its timestamp on insert time
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_class
+               WHERE oid = to_regclass('trades') AND relkind = 'r') THEN
+        ALTER TABLE trades RENAME TO trades_legacy;
+        ALTER SEQUENCE IF EXISTS trades_id_seq RENAME TO trades_legacy_id_seq;
+    END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS trades (
+    id BIGSERIAL,
+    fill_time TIMESTAMPTZ NOT NULL,
+    recorded_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    symbol VARCHAR(20) NOT NULL,
+    side VARCHAR(20) NOT NULL,
+    price NUMERIC(24, 10) NOT NULL,
+    amount NUMERIC(24, 10) NOT NULL,
+    pnl NUMERIC(24, 10),
+    mode VARCHAR(10) NOT NULL,
+    strategy VARCHAR(64) NOT NULL,
+    PRIMARY KEY (id, fill_time)
+) PARTITION BY RANGE (fill_time);
+
+CREATE TABLE IF NOT EXISTS trades_default PARTITION OF trades DEFAULT;
+
+-- Per-strategy window scans and P&L rollups; propagated to every partition
+CREATE INDEX IF NOT EXISTS trades_strategy_symbol_time_idx ON trades (strategy, symbol, fill_time);
+CREATE INDEX IF NOT EXISTS trades_strategy_time_idx ON trades (strategy, fill_time) INCLUDE (pnl);
+
+-- Creates the monthly partitions covering [start_month, start_month + months).
+-- Rows already in the default partition for a new month are moved into it.
+CREATE OR REPLACE FUNCTION ensure_trade_partitions(start_month DATE, months INTEGER)
+RETURNS void AS $$
+DECLARE
+    month_start DATE;
+    month_end DATE;
+    partition_name TEXT;
+BEGIN
+    FOR i IN 0..months - 1 LOOP
+        month_start := (date_trunc('month', start_month) + make_interval(months => i))::date;
+        month_end := (month_start + INTERVAL '1 month')::date;
+        partition_name := 'trades_' || to_char(month_start, 'YYYYMM');
+        IF to_regclass(partition_name) IS NULL THEN
+            CREATE TEMP TABLE IF NOT EXISTS trades_moved (LIKE trades) ON COMMIT DROP;
+            WITH moved AS (
+                DELETE FROM trades_default
+                WHERE fill_time >= month_start AND fill_time < month_end
+                RETURNING *
+            )
+            INSERT INTO trades_moved SELECT * FROM moved;
+            EXECUTE format('CREATE TABLE %I PARTITION OF trades FOR VALUES FROM (%L) TO (%L)',
+                           partition_name, month_start, month_end);
+            INSERT INTO trades SELECT * FROM trades_moved;
+            DELETE FROM trades_moved;
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    first_month DATE;
+BEGIN
+    IF to_regclass('trades_legacy') IS NOT NULL THEN
+        SELECT date_trunc('month', MIN(timestamp))::date INTO first_month FROM trades_legacy;
+        IF first_month IS NOT NULL THEN
+            PERFORM ensure_trade_partitions(
+                first_month,
+                ((EXTRACT(YEAR FROM AGE(NOW(), first_month)) * 12
+                  + EXTRACT(MONTH FROM AGE(NOW(), first_month)))::integer + 1)
+            );
+        END IF;
+        INSERT INTO trades (fill_time, recorded_at, symbol, side, price, amount, mode, strategy)
+        SELECT COALESCE(timestamp, NOW()), COALESCE(timestamp, NOW()), COALESCE(symbol, ''), COALESCE(side, ''),
+               COALESCE(price, 0), COALESCE(amount, 0), COALESCE(mode, ''), COALESCE(strategy, '')
+        FROM trades_legacy;
+        DROP TABLE trades_legacy;
+    END IF;
+END $$;
+
+-- Current and next month
+SELECT ensure_trade_partitions(CURRENT_DATE, 2);
@@ -0,0 +1,28 @@
+-- Full run artifacts next to the headline metrics.
+-- equity_curve: zlib-compressed little-endian float64 portfolio values
+-- equity_timestamps: zlib-compressed little-endian int64 deltas (first value absolute)
+ALTER TABLE backtest_runs
+    ADD COLUMN IF NOT EXISTS metrics JSONB,
+    ADD COLUMN IF NOT EXISTS trades JSONB,
+    ADD COLUMN IF NOT EXISTS trade_count INTEGER,
+    ADD COLUMN IF NOT EXISTS equity_curve BYTEA,
+    ADD COLUMN IF NOT EXISTS equity_timestamps BYTEA,
+    ADD COLUMN IF NOT EXISTS equity_points INTEGER,
+    ADD COLUMN IF NOT EXISTS dataset_fingerprint VARCHAR(64);
+
+-- Curves are compressed client-side; keep TOAST from trying again
+ALTER TABLE backtest_runs ALTER COLUMN equity_curve SET STORAGE EXTERNAL;
+ALTER TABLE backtest_runs ALTER COLUMN equity_timestamps SET STORAGE EXTERNAL;
+
+-- Leaderboard: top-N by Sharpe per strategy without touching the heap for the ranking
+CREATE INDEX IF NOT EXISTS backtest_runs_strategy_sharpe_idx
+    ON backtest_runs (strategy_id, sharpe_ratio DESC NULLS LAST)
+    INCLUDE (max_drawdown, final_equity);
+
+-- Leaderboard restricted to one dataset
+CREATE INDEX IF NOT EXISTS backtest_runs_dataset_sharpe_idx
+    ON backtest_runs (dataset_fingerprint, strategy_id, sharpe_ratio DESC NULLS LAST);
+
+-- Parameter regions: exact-value filters are answered by containment (@>)
+CREATE INDEX IF NOT EXISTS backtest_runs_params_idx
+    ON backtest_runs USING GIN (parameters_used jsonb_path_ops);
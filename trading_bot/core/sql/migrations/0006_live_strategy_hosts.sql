@@ -0,0 +1,11 @@
+-- A live strategy runs either in its own container or in a slot of a StrategyHost process
+ALTER TABLE live_strategies ALTER COLUMN container_id DROP NOT NULL;
+ALTER TABLE live_strategies
+    ADD COLUMN IF NOT EXISTS host_id VARCHAR(255),
+    ADD COLUMN IF NOT EXISTS slot INTEGER;
+ALTER TABLE live_strategies ADD CONSTRAINT live_strategies_target_check
+    CHECK (container_id IS NOT NULL OR (host_id IS NOT NULL AND slot IS NOT NULL));
+
+-- One strategy per host slot
+CREATE UNIQUE INDEX IF NOT EXISTS live_strategies_host_slot_idx
+    ON live_strategies (host_id, slot) WHERE host_id IS NOT NULL;
@@ -0,0 +1,57 @@
+-- Embedded (SQLite) counterpart of the Postgres migrations 0001-0005.
+-- UUIDs and JSON are TEXT, timestamps are UTC epoch seconds (REAL), amounts are REAL.
+CREATE TABLE IF NOT EXISTS strategy_definitions (
+    strategy_id TEXT PRIMARY KEY,
+    source_url TEXT,
+    raw_text TEXT,
+    structured_json TEXT,
+    created_at REAL DEFAULT ((julianday('now') - 2440587.5) * 86400.0)
+);
+
+CREATE TABLE IF NOT EXISTS backtest_runs (
+    run_id TEXT PRIMARY KEY,
+    strategy_id TEXT,
+    iteration_number INTEGER,
+    parameters_used TEXT,
+    sharpe_ratio REAL,
+    max_drawdown REAL,
+    final_equity REAL,
+    passed_criteria INTEGER,
+    metrics TEXT,
+    trades TEXT,
+    trade_count INTEGER,
+    equity_curve BLOB,
+    equity_timestamps BLOB,
+    equity_points INTEGER,
+    dataset_fingerprint TEXT,
+    created_at REAL DEFAULT ((julianday('now') - 2440587.5) * 86400.0)
+);
+CREATE INDEX IF NOT EXISTS backtest_runs_strategy_sharpe_idx ON backtest_runs (strategy_id, sharpe_ratio DESC);
+CREATE INDEX IF NOT EXISTS backtest_runs_dataset_sharpe_idx
+    ON backtest_runs (dataset_fingerprint, strategy_id, sharpe_ratio DESC);
+
+CREATE TABLE IF NOT EXISTS live_strategies (
+    strategy_id TEXT PRIMARY KEY,
+    container_id TEXT NOT NULL,
+    deployed_at REAL DEFAULT ((julianday('now') - 2440587.5) * 86400.0)
+);
+
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY,
+    fill_time REAL NOT NULL,
+    recorded_at REAL DEFAULT ((julianday('now') - 2440587.5) * 86400.0),
+    symbol TEXT,
+    side TEXT,
+    price REAL,
+    amount REAL,
+    pnl REAL,
+    mode TEXT,
+    strategy TEXT
+);
+CREATE INDEX IF NOT EXISTS trades_strategy_time_idx ON trades (strategy, fill_time);
+
+-- High-water marks (rowid) of rows already pushed to Postgres by SQLiteDatabase.sync_to
+CREATE TABLE IF NOT EXISTS sync_state (
+    table_name TEXT PRIMARY KEY,
+    last_rowid INTEGER NOT NULL
+);
@@ -0,0 +1,17 @@
+-- Counterpart of Postgres migration 0006: live strategies in a container or a StrategyHost slot.
+-- SQLite cannot drop NOT NULL in place, so the table is rebuilt.
+CREATE TABLE live_strategies_new (
+    strategy_id TEXT PRIMARY KEY,
+    container_id TEXT,
+    host_id TEXT,
+    slot INTEGER,
+    deployed_at REAL DEFAULT ((julianday('now') - 2440587.5) * 86400.0),
+    CHECK (container_id IS NOT NULL OR (host_id IS NOT NULL AND slot IS NOT NULL))
+);
+INSERT INTO live_strategies_new (strategy_id, container_id, deployed_at)
+    SELECT strategy_id, container_id, deployed_at FROM live_strategies;
+DROP TABLE live_strategies;
+ALTER TABLE live_strategies_new RENAME TO live_strategies;
+
+CREATE UNIQUE INDEX IF NOT EXISTS live_strategies_host_slot_idx
+    ON live_strategies (host_id, slot) WHERE host_id IS NOT NULL;
@@ -0,0 +1,385 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from decimal import Decimal
+from trading_bot.core.database import (
+    Database, BACKTEST_RUN_COLUMNS, decode_curve, decode_timestamps, _json_safe
+)
+from trading_bot.core.migrations import list_migrations
+from trading_bot.core.trade_journal import TRADE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+SQLITE_MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), 'sql', 'sqlite')
+
+_RUN_SUMMARY_COLUMNS = ('run_id, strategy_id, iteration_number, parameters_used, sharpe_ratio, max_drawdown, '
+                        'final_equity, trade_count, dataset_fingerprint, created_at')
+
+
+def sqlite_path(db_url) -> str:
+    """sqlite:///relative.db -> relative.db, sqlite:////abs/path.db -> /abs/path.db, sqlite:// -> :memory:"""
+    path = db_url[len('sqlite://'):]
+    if path.startswith('/'):
+        path = path[1:]
+    return path or ':memory:'
+
+
+def _epoch(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return float(value)
+
+
+def _from_epoch(value):
+    return datetime.fromtimestamp(value, timezone.utc) if value is not None else None
+
+
+def _to_sqlite(value):
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+class SQLiteDatabase(Database):
+    """
+    Embedded storage behind the Database interface, selected with a sqlite:// DB_URL.
+
+    Meant for backtests and sweep workers that only need local results: there is no
+    server, pool or network round trip. The file runs in WAL mode so several worker
+    processes can write to it, and every call runs on a single background thread so
+    the event loop never blocks on disk. Bulk paths (copy_trades, copy_backtest_runs)
+    write each batch in one transaction. `sync_to` pushes new rows to Postgres later.
+    """
+    def __init__(self, db_url):
+        super().__init__(db_url)
+        self.path = sqlite_path(db_url)
+        self._conn = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite')
+
+    async def _call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def connect(self):
+        try:
+            await self._call(self._open)
+            await self.journal.start()
+            logger.info(f"Connected to SQLite database {self.path}")
+        except Exception as e:
+            logger.error(f"Database connection failed: {e}")
+            raise
+
+    def _open(self):
+        if self.path != ':memory:' and os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Autocommit; batches open their own transactions
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn = conn
+        self._migrate()
+
+    def _migrate(self):
+        current = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        for version, name, path in list_migrations(SQLITE_MIGRATIONS_DIR):
+            if version <= current:
+                continue
+            with open(path, 'r') as f:
+                sql = f.read()
+            with self._transaction():
+                # Re-check inside the write lock in case another worker migrated first
+                if self._conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                    continue
+                for statement in sql.split(';'):
+                    if statement.strip():
+                        self._conn.execute(statement)
+                self._conn.execute(f"PRAGMA user_version = {version}")
+            logger.info(f"Applied SQLite migration {version:04d}_{name}")
+
+    def _transaction(self):
+        return _Transaction(self._conn)
+
+    def _write(self, query, rows):
+        with self._transaction():
+            self._conn.executemany(query, rows)
+
+    def _fetch(self, query, args=()):
+        return self._conn.execute(query, args).fetchall()
+
+    async def close(self):
+        await self.journal.close()
+        if self._conn is not None:
+            await self._call(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=True)
+
+    # --- Trades ---
+
+    async def save_trade(self, symbol, side, price, amount, mode, strategy, fill_time=None, pnl=None):
+        await self.copy_trades([(fill_time or datetime.now(timezone.utc), symbol, side, price, amount, pnl,
+                                 mode, strategy)])
+        logger.info(f"Trade saved to DB: {side} {symbol}")
+
+    async def copy_trades(self, records):
+        rows = [(_epoch(fill_time), symbol, side, float(price), float(amount),
+                 float(pnl) if pnl is not None else None, mode, strategy)
+                for fill_time, symbol, side, price, amount, pnl, mode, strategy in records]
+        query = f"INSERT INTO trades ({', '.join(TRADE_COLUMNS)}) VALUES ({', '.join('?' * len(TRADE_COLUMNS))})"
+        await self._call(self._write, query, rows)
+
+    async def ensure_trade_partitions(self, months_ahead=2):
+        # SQLite tables are not partitioned
+        return None
+
+    async def get_trades(self, strategy, start, end, symbol=None, limit=None) -> list:
+        query = f"""
+        SELECT {', '.join(TRADE_COLUMNS)} FROM trades
+        WHERE strategy = ? AND fill_time >= ? AND fill_time < ? AND (? IS NULL OR symbol = ?)
+        ORDER BY fill_time
+        LIMIT ?
+        """
+        rows = await self._call(self._fetch, query, (strategy, _epoch(start), _epoch(end), symbol, symbol,
+                                                     -1 if limit is None else limit))
+        trades = []
+        for row in rows:
+            trade = dict(row)
+            trade['fill_time'] = _from_epoch(trade['fill_time'])
+            trades.append(trade)
+        return trades
+
+    async def get_daily_pnl(self, strategy, start, end, symbol=None, mode=None) -> list:
+        query = """
+        SELECT date(fill_time, 'unixepoch') AS day, symbol, COUNT(*) AS trades,
+               COALESCE(SUM(pnl), 0) AS realized_pnl, SUM(price * amount) AS notional
+        FROM trades
+        WHERE strategy = ? AND fill_time >= ? AND fill_time < ?
+          AND (? IS NULL OR symbol = ?) AND (? IS NULL OR mode = ?)
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+        """
+        rows = await self._call(self._fetch, query, (strategy, _epoch(start), _epoch(end), symbol, symbol,
+                                                     mode, mode))
+        days = []
+        for row in rows:
+            day = dict(row)
+            day['day'] = datetime.strptime(day['day'], '%Y-%m-%d').date()
+            days.append(day)
+        return days
+
+    # --- Strategies and backtest runs ---
+
+    async def save_strategy(self, source_url: str, raw_text: str, structured_json: dict) -> str:
+        strategy_id = str(uuid.uuid4())
+        query = "INSERT INTO strategy_definitions (strategy_id, source_url, raw_text, structured_json) VALUES (?, ?, ?, ?)"
+        await self._call(self._write, query, [(strategy_id, source_url, raw_text, json.dumps(structured_json))])
+        logger.info(f"Strategy saved to DB with ID: {strategy_id}")
+        return strategy_id
+
+    async def save_backtest_run(self, strategy_id: str, iteration: int, params: dict, results: dict,
+                                equity_curve=None, equity_timestamps=None, trades=None,
+                                dataset_fingerprint=None) -> str:
+        run_ids = await self.copy_backtest_runs([{
+            'strategy_id': strategy_id, 'iteration': iteration, 'params': params, 'results': results,
+            'equity_curve': equity_curve, 'equity_timestamps': equity_timestamps, 'trades': trades,
+            'dataset_fingerprint': dataset_fingerprint,
+        }])
+        logger.info(f"Backtest run saved to DB with ID: {run_ids[0]}")
+        return run_ids[0]
+
+    async def copy_backtest_runs(self, runs) -> list:
+        records = [
+            self._backtest_record(run['strategy_id'], run.get('iteration'), run.get('params'), run['results'],
+                                  run.get('equity_curve'), run.get('equity_timestamps'), run.get('trades'),
+                                  run.get('dataset_fingerprint'))
+            for run in runs
+        ]
+        query = (f"INSERT INTO backtest_runs ({', '.join(BACKTEST_RUN_COLUMNS)}) "
+                 f"VALUES ({', '.join('?' * len(BACKTEST_RUN_COLUMNS))})")
+        await self._call(self._write, query, [tuple(_to_sqlite(value) for value in record) for record in records])
+        return [str(record[0]) for record in records]
+
+    async def get_top_runs(self, strategy_id=None, n=10, dataset_fingerprint=None) -> list:
+        if strategy_id is not None:
+            query = f"""
+            SELECT {_RUN_SUMMARY_COLUMNS} FROM backtest_runs
+            WHERE strategy_id = ? AND (? IS NULL OR dataset_fingerprint = ?) AND sharpe_ratio IS NOT NULL
+            ORDER BY sharpe_ratio DESC
+            LIMIT ?
+            """
+            args = (str(strategy_id), dataset_fingerprint, dataset_fingerprint, n)
+        else:
+            query = f"""
+            SELECT {_RUN_SUMMARY_COLUMNS} FROM (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY strategy_id ORDER BY sharpe_ratio DESC) AS rank
+                FROM backtest_runs
+                WHERE (? IS NULL OR dataset_fingerprint = ?) AND sharpe_ratio IS NOT NULL
+            ) WHERE rank <= ?
+            ORDER BY strategy_id, sharpe_ratio DESC
+            """
+            args = (dataset_fingerprint, dataset_fingerprint, n)
+        return [self._summary(row) for row in await self._call(self._fetch, query, args)]
+
+    async def get_runs_in_region(self, strategy_id, region: dict, limit=1000) -> list:
+        clauses = []
+        args = [str(strategy_id)]
+        for name, value in region.items():
+            path = '$.' + json.dumps(name)
+            if isinstance(value, (list, tuple)):
+                clauses.append("AND json_extract(parameters_used, ?) BETWEEN ? AND ?")
+                args.extend([path, value[0], value[1]])
+            else:
+                clauses.append("AND json_extract(parameters_used, ?) = ?")
+                args.extend([path, _json_safe(value)])
+        query = f"""
+        SELECT {_RUN_SUMMARY_COLUMNS} FROM backtest_runs
+        WHERE strategy_id = ? {' '.join(clauses)}
+        ORDER BY sharpe_ratio IS NULL, sharpe_ratio DESC
+        LIMIT ?
+        """
+        args.append(limit)
+        return [self._summary(row) for row in await self._call(self._fetch, query, tuple(args))]
+
+    async def get_backtest_run(self, run_id) -> dict:
+        query = f"SELECT {', '.join(BACKTEST_RUN_COLUMNS)}, created_at FROM backtest_runs WHERE run_id = ?"
+        rows = await self._call(self._fetch, query, (str(run_id),))
+        if not rows:
+            return None
+        row = rows[0]
+        run = self._summary(row)
+        run['passed_criteria'] = bool(row['passed_criteria']) if row['passed_criteria'] is not None else None
+        run['metrics'] = json.loads(row['metrics']) if row['metrics'] else None
+        run['trades'] = json.loads(row['trades']) if row['trades'] else None
+        run['equity_curve'] = decode_curve(row['equity_curve']) if row['equity_curve'] else None
+        run['equity_timestamps'] = decode_timestamps(row['equity_timestamps']) if row['equity_timestamps'] else None
+        return run
+
+    async def get_equity_curves(self, run_ids) -> dict:
+        run_ids = [str(run_id) for run_id in run_ids]
+        query = f"""
+        SELECT run_id, equity_curve, equity_timestamps FROM backtest_runs
+        WHERE run_id IN ({', '.join('?' * len(run_ids))}) AND equity_curve IS NOT NULL
+        """
+        rows = await self._call(self._fetch, query, tuple(run_ids))
+        return {
+            row['run_id']: (decode_timestamps(row['equity_timestamps']) if row['equity_timestamps'] else None,
+                            decode_curve(row['equity_curve']))
+            for row in rows
+        }
+
+    def _summary(self, row) -> dict:
+        summary = self._run_summary(row)
+        summary['created_at'] = _from_epoch(row['created_at'])
+        return summary
+
+    # --- Live strategies ---
+
+    async def add_live_strategy(self, strategy_id: str, container_id: str = None, host_id: str = None, slot: int = None):
+        query = """
+        INSERT INTO live_strategies (strategy_id, container_id, host_id, slot) VALUES (?, ?, ?, ?)
+        ON CONFLICT (strategy_id) DO UPDATE SET container_id = excluded.container_id, host_id = excluded.host_id,
+            slot = excluded.slot, deployed_at = excluded.deployed_at
+        """
+        await self._call(self._write, query, [(str(strategy_id), container_id, host_id, slot)])
+        target = f"container {container_id}" if container_id else f"host {host_id} slot {slot}"
+        logger.info(f"Live strategy {strategy_id} with {target} saved to DB.")
+
+    async def remove_live_strategy(self, strategy_id: str):
+        await self._call(self._write, "DELETE FROM live_strategies WHERE strategy_id = ?", [(str(strategy_id),)])
+
+    async def get_live_strategies(self) -> dict:
+        rows = await self._call(self._fetch, "SELECT strategy_id, container_id FROM live_strategies "
+                                             "WHERE container_id IS NOT NULL")
+        return {row['strategy_id']: row['container_id'] for row in rows}
+
+    async def get_live_deployments(self) -> dict:
+        rows = await self._call(self._fetch, "SELECT strategy_id, container_id, host_id, slot FROM live_strategies")
+        return {row['strategy_id']: {'strategy_id': row['strategy_id'], 'container_id': row['container_id'],
+                                     'host_id': row['host_id'], 'slot': row['slot']} for row in rows}
+
+    # --- Sync to Postgres ---
+
+    async def sync_to(self, target: Database, batch_size=5000) -> dict:
+        """
+        Pushes rows written since the last sync to a connected Postgres Database in bulk:
+        strategy definitions and backtest runs (idempotent, keyed by their IDs) and trades.
+        Trades have no natural key, so a crash between the Postgres commit and the local
+        high-water mark update can push the last batch twice.
+        Returns the number of rows pushed per table.
+        """
+        pushed = {}
+        pushed['strategy_definitions'] = await self._sync_table(
+            'strategy_definitions', ('strategy_id', 'source_url', 'raw_text', 'structured_json', 'created_at'),
+            lambda row: (uuid.UUID(row['strategy_id']), row['source_url'], row['raw_text'],
+                         row['structured_json'], _from_epoch(row['created_at'])),
+            lambda columns, records: target.import_records('strategy_definitions', columns, records),
+            batch_size)
+        pushed['backtest_runs'] = await self._sync_table(
+            'backtest_runs', BACKTEST_RUN_COLUMNS + ('created_at',), self._postgres_run,
+            lambda columns, records: target.import_records('backtest_runs', columns, records),
+            batch_size)
+        pushed['trades'] = await self._sync_table(
+            'trades', TRADE_COLUMNS,
+            lambda row: (_from_epoch(row['fill_time']), row['symbol'], row['side'],
+                         Decimal(repr(row['price'])), Decimal(repr(row['amount'])),
+                         Decimal(repr(row['pnl'])) if row['pnl'] is not None else None, row['mode'], row['strategy']),
+            lambda columns, records: target.copy_trades(records),
+            batch_size)
+        logger.info(f"Synced local results to Postgres: {pushed}")
+        return pushed
+
+    async def _sync_table(self, table, columns, convert, push, batch_size) -> int:
+        total = 0
+        while True:
+            rows = await self._call(self._fetch, f"""
+                SELECT rowid AS sync_rowid, {', '.join(columns)} FROM {table}
+                WHERE rowid > COALESCE((SELECT last_rowid FROM sync_state WHERE table_name = ?), 0)
+                ORDER BY rowid LIMIT ?
+            """, (table, batch_size))
+            if not rows:
+                return total
+            await push(list(columns), [convert(row) for row in rows])
+            await self._call(self._write, """
+                INSERT INTO sync_state (table_name, last_rowid) VALUES (?, ?)
+                ON CONFLICT (table_name) DO UPDATE SET last_rowid = excluded.last_rowid
+            """, [(table, rows[-1]['sync_rowid'])])
+            total += len(rows)
+
+    @staticmethod
+    def _postgres_run(row) -> tuple:
+        def numeric(value):
+            return Decimal(repr(value)) if value is not None else None
+        return (
+            uuid.UUID(row['run_id']), uuid.UUID(row['strategy_id']) if row['strategy_id'] else None,
+            row['iteration_number'], row['parameters_used'], numeric(row['sharpe_ratio']),
+            numeric(row['max_drawdown']), numeric(row['final_equity']),
+            bool(row['passed_criteria']) if row['passed_criteria'] is not None else None,
+            row['metrics'], row['trades'], row['trade_count'], row['equity_curve'], row['equity_timestamps'],
+            row['equity_points'], row['dataset_fingerprint'], _from_epoch(row['created_at']),
+        )
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT; takes the write lock up front so concurrent writers wait instead of deadlocking."""
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
@@ -0,0 +1,182 @@
+import asyncio
+import json
+import logging
+from trading_bot.config import cfg
+from trading_bot.core.bot import Bot
+from trading_bot.core.bus import connect_bus
+from trading_bot.core.candles import CandleAggregator, DEFAULT_TIMEFRAMES
+from trading_bot.core.kraken_api import KrakenREST, KrakenWS
+from trading_bot.core.metrics import REGISTRY
+from trading_bot.core.recorder import open_recorder
+
+logger = logging.getLogger(__name__)
+
+
+def control_subject(host_id) -> str:
+    return f"strategy_host.{host_id}.control"
+
+
+class StrategyHost:
+    """
+    Runs many strategies in one process instead of one container each.
+
+    The host owns a single Kraken trade feed, CandleAggregator, REST client and bus
+    connection. Every strategy gets a slot: its own Bot, and therefore its own strategy
+    object and ExecutionEngine state, telemetry stream and order worker. Closed candles
+    are routed to the slots trading that symbol and timeframe.
+
+    Strategies are added and removed while running via `add_strategy` / `remove_strategy`,
+    or over the bus with JSON requests on `strategy_host.<host_id>.control`:
+        {"op": "add", "strategy_id": ..., "strategy_filepath": ..., "config_filepath": ..., "overrides": {...}}
+        {"op": "remove", "strategy_id": ...}
+        {"op": "list"}
+    Every slot is recorded in live_strategies as (host_id, slot).
+    """
+    def __init__(self, host_id, database, mode='PAPER', nats_url=None, ws_url=None,
+                 timeframes=DEFAULT_TIMEFRAMES, max_slots=64):
+        if mode not in ('PAPER', 'LIVE'):
+            raise ValueError(f"StrategyHost mode must be PAPER or LIVE, not {mode}")
+        self.host_id = host_id
+        self.db = database
+        self.mode = mode
+        self.nats_url = nats_url or cfg.NATS_URL
+        self.max_slots = max_slots
+        self.rest = KrakenREST(cfg.API_KEY, cfg.API_SECRET, cfg.KRAKEN_REST_URL)
+        self.aggregator = CandleAggregator(timeframes=timeframes)
+        self.ws = KrakenWS(ws_url or cfg.KRAKEN_WS_PUBLIC_URL, self.aggregator.on_message,
+                           recorder=open_recorder('trade'))
+        for timeframe in self.aggregator.timeframes:
+            self.aggregator.subscribe(self._on_candle, timeframe)
+        self._bus = None
+        self._control = None
+        self._tasks = []
+        self._slots = {}        # strategy_id -> (slot, bot, symbol, timeframe)
+        self._routes = {}       # (symbol, timeframe) -> {strategy_id: bot}
+        self._lock = asyncio.Lock()
+
+    # --- Lifecycle ---
+
+    async def start(self, bus=None):
+        self._bus = bus or await connect_bus(self.nats_url)
+        self._control = await self._bus.subscribe(control_subject(self.host_id), cb=self._on_control)
+        REGISTRY.gauge('trading_bot_host_strategies', 'Strategies running in a StrategyHost', labels=('host',)) \
+            .labels(host=self.host_id).set_function(lambda: len(self._slots))
+        self._tasks = [
+            asyncio.create_task(self.ws.connect_and_stream([], channel="trade")),
+            asyncio.create_task(self.aggregator.run_clock()),
+        ]
+        logger.info(f"StrategyHost {self.host_id} started in {self.mode} mode.")
+
+    async def run(self, bus=None):
+        """Starts the host and serves until cancelled, then stops every strategy."""
+        await self.start(bus)
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            await self.close()
+
+    async def close(self):
+        self.ws.running = False
+        for task in self._tasks:
+            task.cancel()
+        if self._control is not None:
+            await self._control.unsubscribe()
+            self._control = None
+        for strategy_id in list(self._slots):
+            await self.remove_strategy(strategy_id)
+        if self.ws.recorder:
+            self.ws.recorder.close()
+
+    # --- Slots ---
+
+    def strategies(self) -> list:
+        return [{'strategy_id': strategy_id, 'slot': slot, 'symbol': symbol, 'timeframe': timeframe,
+                 'position': bot.execution.position_type}
+                for strategy_id, (slot, bot, symbol, timeframe) in sorted(self._slots.items(), key=lambda i: i[1][0])]
+
+    async def add_strategy(self, strategy_id, strategy_filepath, config_filepath, overrides=None) -> int:
+        """Loads a strategy into a free slot and starts trading it on the shared feed. Returns the slot."""
+        async with self._lock:
+            if strategy_id in self._slots:
+                raise ValueError(f"Strategy {strategy_id} is already running in slot {self._slots[strategy_id][0]}")
+            used = {slot for slot, *_ in self._slots.values()}
+            slot = next((i for i in range(self.max_slots) if i not in used), None)
+            if slot is None:
+                raise RuntimeError(f"StrategyHost {self.host_id} has no free slot (max {self.max_slots})")
+
+            bot = Bot(strategy_filepath, config_filepath, config_overrides={**(overrides or {}), 'strategy_id': strategy_id},
+                      rest=self.rest)
+            symbol = bot.config.get('symbol', cfg.SYMBOL)
+            timeframe = bot.config.get('timeframe', cfg.TIMEFRAME)
+            if timeframe not in self.aggregator.timeframes:
+                raise ValueError(f"Timeframe {timeframe} is not aggregated by this host. "
+                                 f"Available: {list(self.aggregator.timeframes)}")
+
+            await bot.start_live(self.mode, bus=self._bus)
+            try:
+                await self.db.add_live_strategy(strategy_id, host_id=self.host_id, slot=slot)
+                await self.ws.add_symbols([symbol])
+            except Exception:
+                await bot.stop_live()
+                raise
+            self._slots[strategy_id] = (slot, bot, symbol, timeframe)
+            self._routes.setdefault((symbol, timeframe), {})[strategy_id] = bot
+            logger.info(f"Strategy {strategy_id} started in slot {slot} ({symbol} {timeframe}m).")
+            return slot
+
+    async def remove_strategy(self, strategy_id) -> bool:
+        async with self._lock:
+            entry = self._slots.pop(strategy_id, None)
+            if entry is None:
+                return False
+            slot, bot, symbol, timeframe = entry
+            route = self._routes.get((symbol, timeframe), {})
+            route.pop(strategy_id, None)
+            if not route:
+                self._routes.pop((symbol, timeframe), None)
+            # Stopped and deregistered first, so a failed unsubscribe cannot leave it running untracked
+            await bot.stop_live()
+            await self.db.remove_live_strategy(strategy_id)
+            if not any(key[0] == symbol for key in self._routes):
+                try:
+                    await self.ws.remove_symbols([symbol])
+                except Exception as e:
+                    # Candles for the symbol now have no route and are simply ignored
+                    logger.warning(f"Could not unsubscribe {symbol} after removing {strategy_id}: {e}")
+            logger.info(f"Strategy {strategy_id} removed from slot {slot}.")
+            return True
+
+    def _on_candle(self, symbol, timeframe, candle):
+        for strategy_id, bot in list(self._routes.get((symbol, timeframe), {}).items()):
+            # One strategy's failure must not keep the candle from the others
+            try:
+                bot.on_candle(symbol, timeframe, candle)
+            except Exception as e:
+                logger.error(f"Strategy {strategy_id} failed on {symbol} {timeframe}m candle: {e}", exc_info=True)
+
+    # --- Control API ---
+
+    async def _on_control(self, msg):
+        try:
+            request = json.loads(msg.data)
+            op = request.get('op')
+            if op == 'add':
+                slot = await self.add_strategy(request['strategy_id'], request['strategy_filepath'],
+                                               request['config_filepath'], request.get('overrides'))
+                reply = {'ok': True, 'host_id': self.host_id, 'slot': slot}
+            elif op == 'remove':
+                reply = {'ok': await self.remove_strategy(request['strategy_id'])}
+            elif op == 'list':
+                reply = {'ok': True, 'host_id': self.host_id, 'strategies': self.strategies()}
+            else:
+                reply = {'ok': False, 'error': f"Unknown op: {op}"}
+        except Exception as e:
+            logger.error(f"StrategyHost control request failed: {e}")
+            reply = {'ok': False, 'error': str(e)}
+        await msg.respond(json.dumps(reply).encode())
+
+
+async def host_request(bus, host_id, request: dict, timeout=10.0) -> dict:
+    """Sends a control request to a StrategyHost and returns its JSON reply."""
+    response = await bus.request(control_subject(host_id), json.dumps(request).encode(), timeout=timeout)
+    return json.loads(response.data)
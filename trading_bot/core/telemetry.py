@@ -0,0 +1,249 @@
+import asyncio
+import json
+import logging
+import math
+import struct
+import time
+import numpy as np
+from trading_bot.core.bus import connect_bus
+
+logger = logging.getLogger(__name__)
+
+# --- Wire format ---
+#
+# A telemetry message on `telemetry.live.<strategy_id>` is a batch of samples:
+#
+#   header   '<2sBBHH'   magic b'TL', version, flags (reserved, 0), sample count, message count
+#   records  count x 48-byte RECORD rows (little-endian, packed)
+#   messages message count x ('<HH' record index, byte length, UTF-8 text), for ERROR samples
+#
+# Records are fixed-size so the receiver can view them in place as a NumPy structured array.
+# Anything not starting with the magic is decoded as legacy JSON (one sample or a list).
+
+MAGIC = b'TL'
+VERSION = 1
+HEADER = struct.Struct('<2sBBHH')
+RECORD = struct.Struct('<ddddfffBBBx')
+RECORD_DTYPE = np.dtype([
+    ('time', '<f8'),                    # wall-clock time the sample was produced
+    ('timestamp', '<f8'),               # candle timestamp
+    ('price', '<f8'),
+    ('equity', '<f8'),
+    ('drawdown', '<f4'),
+    ('tick_to_signal_p99_us', '<f4'),
+    ('signal_to_ack_p99_us', '<f4'),
+    ('status', 'u1'),
+    ('position', 'u1'),
+    ('signal', 'u1'),
+    ('_pad', 'u1'),
+])
+MESSAGE = struct.Struct('<HH')
+assert RECORD.size == RECORD_DTYPE.itemsize
+
+FLOAT_FIELDS = ('time', 'timestamp', 'price', 'equity', 'drawdown', 'tick_to_signal_p99_us', 'signal_to_ack_p99_us')
+STATUSES = ('OK', 'ERROR')
+POSITIONS = (None, 'long', 'short')
+SIGNALS = (None, 'BUY', 'SELL', 'SELL_SHORT', 'COVER_SHORT')
+ERROR = STATUSES.index('ERROR')
+MAX_BATCH = 0xFFFF
+MAX_MESSAGE_BYTES = 1024
+
+
+def _code(values, value):
+    try:
+        return values.index(value)
+    except ValueError:
+        return 0
+
+
+def encode_batch(samples) -> bytes:
+    """Encodes telemetry sample dicts into one binary message; missing numbers become NaN."""
+    samples = samples[:MAX_BATCH]
+    messages = [(i, s['message']) for i, s in enumerate(samples) if s.get('message')]
+    buffer = bytearray(HEADER.size + RECORD.size * len(samples))
+    HEADER.pack_into(buffer, 0, MAGIC, VERSION, 0, len(samples), len(messages))
+    offset = HEADER.size
+    for sample in samples:
+        numbers = []
+        for field in FLOAT_FIELDS:
+            value = sample.get(field)
+            numbers.append(value if isinstance(value, (int, float)) else math.nan)
+        RECORD.pack_into(buffer, offset, *numbers, _code(STATUSES, sample.get('status', 'OK')),
+                         _code(POSITIONS, sample.get('position')), _code(SIGNALS, sample.get('signal')))
+        offset += RECORD.size
+    for index, message in messages:
+        text = str(message).encode('utf-8')[:MAX_MESSAGE_BYTES]
+        buffer += MESSAGE.pack(index, len(text)) + text
+    return bytes(buffer)
+
+
+class TelemetryBatch:
+    """
+    A decoded telemetry message. `records` is a structured array (RECORD_DTYPE) that views
+    the payload without copying; `sample(i)` builds the dict form of one sample on demand.
+    """
+    __slots__ = ('records', 'messages')
+
+    def __init__(self, records, messages=None):
+        self.records = records
+        self.messages = messages or {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def error_indices(self):
+        return np.flatnonzero(self.records['status'] == ERROR)
+
+    def sample(self, index) -> dict:
+        index = range(len(self.records))[index]
+        record = self.records[index]
+        sample = {'status': STATUSES[record['status']] if record['status'] < len(STATUSES) else 'OK'}
+        for field in FLOAT_FIELDS:
+            value = float(record[field])
+            if not math.isnan(value):
+                sample[field] = value
+        if record['position'] or sample['status'] == 'OK':
+            sample['position'] = POSITIONS[record['position']] if record['position'] < len(POSITIONS) else None
+        if record['signal'] or sample['status'] == 'OK':
+            sample['signal'] = SIGNALS[record['signal']] if record['signal'] < len(SIGNALS) else None
+        if index in self.messages:
+            sample['message'] = self.messages[index]
+        return sample
+
+    def samples(self) -> list:
+        return [self.sample(i) for i in range(len(self.records))]
+
+
+def is_binary(payload) -> bool:
+    return payload[:2] == MAGIC
+
+
+def decode_json(payload) -> list:
+    """Legacy JSON telemetry (one sample or a list) as a list of sample dicts."""
+    samples = json.loads(payload)
+    if isinstance(samples, dict):
+        samples = [samples]
+    if not isinstance(samples, list) or not all(isinstance(s, dict) for s in samples):
+        raise ValueError("Telemetry JSON must be an object or a list of objects")
+    now = time.time()
+    for sample in samples:
+        sample.setdefault('time', now)
+        # Rules compare these against limits and time windows
+        for field in ('time', 'drawdown'):
+            value = sample.get(field, 0)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"Telemetry field {field} must be a number, got {value!r}")
+    return samples
+
+
+def decode_batch(payload) -> TelemetryBatch:
+    """Decodes a binary telemetry message, or legacy JSON. Raises ValueError on malformed input."""
+    view = memoryview(payload)
+    if len(view) >= HEADER.size and is_binary(view):
+        _, version, _, count, message_count = HEADER.unpack_from(view)
+        if version != VERSION:
+            raise ValueError(f"Unsupported telemetry version {version}")
+        end = HEADER.size + count * RECORD.size
+        if len(view) < end:
+            raise ValueError("Truncated telemetry batch")
+        records = np.frombuffer(view, dtype=RECORD_DTYPE, count=count, offset=HEADER.size)
+        messages = {}
+        offset = end
+        for _ in range(message_count):
+            index, length = MESSAGE.unpack_from(view, offset)
+            offset += MESSAGE.size
+            messages[index] = bytes(view[offset:offset + length]).decode('utf-8', errors='replace')
+            offset += length
+        return TelemetryBatch(records, messages)
+
+    return decode_batch(encode_batch(decode_json(bytes(view))))
+
+
+# --- Publisher ---
+
+class TelemetryPublisher:
+    """
+    Publishes strategy telemetry to `telemetry.live.<strategy_id>` for the MonitoringAgent.
+
+    `publish` only stamps and enqueues the sample; a background task owns the bus
+    connection and sends everything queued within `flush_interval` seconds (at most
+    `max_batch` samples) as one message, binary by default or a JSON list with
+    encoding='json'. When the queue is full new samples are dropped and counted rather
+    than applying backpressure to trading. An already connected `bus` can be passed in
+    to share one connection between publishers; it is left open on close.
+    """
+    def __init__(self, nats_url, strategy_id, max_queue=10000, flush_interval=0.25, max_batch=512, encoding='binary',
+                 bus=None):
+        if encoding not in ('binary', 'json'):
+            raise ValueError(f"Unknown telemetry encoding '{encoding}'")
+        self.nats_url = nats_url
+        self.subject = f"telemetry.live.{strategy_id}"
+        self.flush_interval = flush_interval
+        self.max_batch = min(max_batch, MAX_BATCH)
+        self.encoding = encoding
+        self.dropped = 0
+        self.sent_messages = 0
+        self.sent_bytes = 0
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._nc = bus
+        self._owns_connection = bus is None
+        self._task = None
+
+    async def start(self):
+        if not self._owns_connection:
+            self._task = asyncio.create_task(self._run())
+            return
+        try:
+            self._nc = await connect_bus(self.nats_url)
+            logger.info(f"Telemetry publisher connected to NATS on {self.subject}.")
+        except Exception as e:
+            logger.error(f"Telemetry publisher failed to connect to NATS: {e}")
+            raise
+        self._task = asyncio.create_task(self._run())
+
+    def publish(self, data: dict):
+        data.setdefault('time', time.time())
+        try:
+            self._queue.put_nowait(data)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch:
+            if self._queue.empty():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            else:
+                batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                if self.encoding == 'binary':
+                    payload = encode_batch(batch)
+                else:
+                    payload = json.dumps(batch).encode()
+                await self._nc.publish(self.subject, payload)
+                self.sent_messages += 1
+                self.sent_bytes += len(payload)
+            except Exception as e:
+                logger.error(f"Failed to publish telemetry: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def close(self):
+        if self._task:
+            await self._queue.join()
+            self._task.cancel()
+        if self._nc and self._owns_connection:
+            await self._nc.drain()
@@ -0,0 +1,285 @@
+import logging
+import math
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Numeric telemetry fields retained per strategy
+FIELDS = ('equity', 'drawdown', 'price')
+# Columns kept per field in the downsampled tiers
+STATS = ('mean', 'min', 'max', 'last')
+
+
+class Ring:
+    """Fixed-capacity ring of timestamped float32 rows; the oldest row is overwritten when full."""
+    def __init__(self, capacity, width):
+        self.capacity = capacity
+        self.ts = np.zeros(capacity, dtype=np.float64)
+        self.values = np.zeros((capacity, width), dtype=np.float32)
+        self.size = 0
+        self._head = 0      # next write position
+
+    def append(self, ts, row):
+        self.ts[self._head] = ts
+        self.values[self._head] = row
+        self._head = (self._head + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+    def extend(self, ts, rows):
+        n = len(ts)
+        if n >= self.capacity:
+            ts, rows, n = ts[-self.capacity:], rows[-self.capacity:], self.capacity
+        first = min(n, self.capacity - self._head)
+        self.ts[self._head:self._head + first] = ts[:first]
+        self.values[self._head:self._head + first] = rows[:first]
+        self.ts[:n - first] = ts[first:]
+        self.values[:n - first] = rows[first:]
+        self._head = (self._head + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def oldest(self):
+        if self.size == 0:
+            return math.inf
+        return self.ts[0] if self.size < self.capacity else self.ts[self._head]
+
+    def since(self, start):
+        """(timestamps, rows) with ts >= start, oldest first."""
+        if self.size < self.capacity:
+            ts, values = self.ts[:self.size], self.values[:self.size]
+        else:
+            order = np.r_[self._head:self.capacity, 0:self._head]
+            ts, values = self.ts[order], self.values[order]
+        i = np.searchsorted(ts, start, side='left')
+        return ts[i:], values[i:]
+
+    @property
+    def nbytes(self):
+        return self.ts.nbytes + self.values.nbytes
+
+
+class _Tier:
+    """
+    A downsampling tier: samples are folded into a `resolution`-second bucket held in plain
+    Python floats, and the bucket becomes one ring row (mean/min/max/last per field, the
+    sample count and the error count) once a sample for a later bucket arrives.
+    """
+    def __init__(self, resolution, capacity):
+        self.resolution = resolution
+        self.ring = Ring(capacity, len(FIELDS) * len(STATS) + 2)
+        self._bucket = None
+        self._open = None
+
+    def add(self, ts, values, error):
+        bucket = ts - ts % self.resolution
+        if bucket != self._bucket:
+            if self._open is not None:
+                self.ring.append(self._bucket, self._row())
+            self._bucket = bucket
+            self._open = [[0.0, v, v, v] for v in values] + [0, 0]
+        stats = self._open
+        for i, v in enumerate(values):
+            s = stats[i]
+            s[0] += v
+            if v < s[1] or s[1] != s[1]:
+                s[1] = v
+            if v > s[2] or s[2] != s[2]:
+                s[2] = v
+            s[3] = v
+        stats[-2] += 1
+        stats[-1] += error
+
+    def add_many(self, ts, values, errors):
+        """Folds a time-ordered block of samples with one reduction per bucket it spans."""
+        buckets = ts - ts % self.resolution
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(ts)]
+        totals = np.add.reduceat(values, starts, axis=0)
+        lows = np.fmin.reduceat(values, starts, axis=0)
+        highs = np.fmax.reduceat(values, starts, axis=0)
+        error_counts = np.add.reduceat(errors, starts)
+        for j, (start, end) in enumerate(zip(starts, ends)):
+            bucket = buckets[start]
+            if bucket != self._bucket:
+                if self._open is not None:
+                    self.ring.append(self._bucket, self._row())
+                self._bucket = bucket
+                self._open = [[0.0, math.nan, math.nan, math.nan] for _ in FIELDS] + [0, 0]
+            stats = self._open
+            for i in range(len(FIELDS)):
+                s = stats[i]
+                s[0] += float(totals[j, i])
+                low, high = float(lows[j, i]), float(highs[j, i])
+                if low < s[1] or s[1] != s[1]:
+                    s[1] = low
+                if high > s[2] or s[2] != s[2]:
+                    s[2] = high
+                s[3] = float(values[end - 1, i])
+            stats[-2] += int(end - start)
+            stats[-1] += int(error_counts[j])
+
+    def _row(self):
+        count = self._open[-2]
+        row = []
+        for total, low, high, last in self._open[:-2]:
+            row += (total / count, low, high, last)
+        return row + self._open[-2:]
+
+    def since(self, start):
+        """Closed buckets since `start` plus the bucket still being filled."""
+        ts, values = self.ring.since(start)
+        if self._open is not None and self._bucket >= start:
+            ts = np.append(ts, self._bucket)
+            values = np.vstack([values, np.asarray(self._row(), dtype=np.float32)])
+        return ts, values
+
+
+class StrategySeries:
+    """Raw samples plus 1-minute and 1-hour tiers for one strategy, in bounded memory."""
+    def __init__(self, raw_capacity=256, minute_capacity=120, hour_capacity=168):
+        self.raw = Ring(raw_capacity, len(FIELDS) + 1)
+        self.tiers = (_Tier(60, minute_capacity), _Tier(3600, hour_capacity))
+        self.last_ts = None
+        self.last_values = [math.nan] * len(FIELDS)
+
+    def add(self, ts, values, error):
+        # Rings are searched by time, so a late sample is filed at the newest timestamp
+        if self.last_ts is not None and ts < self.last_ts:
+            ts = self.last_ts
+        self.raw.append(ts, values + [error])
+        for tier in self.tiers:
+            tier.add(ts, values, error)
+        self.last_ts = ts
+
+    def add_many(self, ts, values, errors):
+        if self.last_ts is not None:
+            ts = np.maximum(ts, self.last_ts)
+        ts = np.maximum.accumulate(ts)
+        self.raw.extend(ts, np.column_stack([values, errors]))
+        for tier in self.tiers:
+            tier.add_many(ts, values, errors)
+        self.last_ts = float(ts[-1])
+
+    @property
+    def nbytes(self):
+        return self.raw.nbytes + sum(tier.ring.nbytes for tier in self.tiers)
+
+
+class TelemetryStore:
+    """
+    Per-strategy telemetry history for the MonitoringAgent.
+
+    Every sample goes into a raw ring and is folded into 1-minute and 1-hour buckets, each
+    tier a fixed-size NumPy ring, so memory per strategy is constant (about 25 KB with the
+    defaults: ~4 minutes of raw samples at 1 Hz, 2 hours of minutes, a week of hours).
+    Queries pick the finest tier that still covers the requested window, so trend rules
+    over minutes or hours cost a slice of a few hundred rows.
+    """
+    def __init__(self, raw_capacity=256, minute_capacity=120, hour_capacity=168):
+        self.capacities = (raw_capacity, minute_capacity, hour_capacity)
+        self._series = {}
+
+    def record(self, strategy_id, sample: dict, ts=None):
+        """Stores the numeric fields of a telemetry sample; a missing field repeats its last value."""
+        series = self._series.get(strategy_id)
+        if series is None:
+            series = self._series[strategy_id] = StrategySeries(*self.capacities)
+        values = []
+        for field, previous in zip(FIELDS, series.last_values):
+            value = sample.get(field)
+            values.append(float(value) if isinstance(value, (int, float)) else previous)
+        series.last_values = values
+        series.add(time.time() if ts is None else ts, values, 1 if sample.get('status') == 'ERROR' else 0)
+
+    def record_many(self, strategy_id, ts, values, errors):
+        """
+        Stores a block of samples at once: `ts` (n,), `values` (n, len(FIELDS)) in FIELDS
+        order with NaN for missing numbers, `errors` (n,) 1 for ERROR samples. Missing
+        numbers repeat the last value, as in `record`.
+        """
+        if len(ts) == 0:
+            return
+        series = self._series.get(strategy_id)
+        if series is None:
+            series = self._series[strategy_id] = StrategySeries(*self.capacities)
+        values = np.vstack([series.last_values, np.asarray(values, dtype=np.float64)])
+        # Forward-fill NaNs down each column
+        index = np.where(np.isnan(values), 0, np.arange(len(values))[:, None])
+        np.maximum.accumulate(index, axis=0, out=index)
+        values = np.take_along_axis(values, index, axis=0)
+        series.last_values = values[-1].tolist()
+        series.add_many(np.asarray(ts, dtype=np.float64), values[1:], np.asarray(errors, dtype=np.float64))
+
+    def strategies(self):
+        return list(self._series)
+
+    def drop(self, strategy_id):
+        self._series.pop(strategy_id, None)
+
+    def memory_bytes(self) -> int:
+        return sum(series.nbytes for series in self._series.values())
+
+    # --- Queries ---
+
+    def _window(self, strategy_id, window, now=None):
+        """(resolution, timestamps, rows) from the finest tier covering the last `window` seconds."""
+        series = self._series.get(strategy_id)
+        if series is None:
+            return None, np.empty(0), np.empty((0, 0), dtype=np.float32)
+        now = series.last_ts if now is None else now
+        start = now - window
+        if series.raw.oldest() <= start or series.raw.size < series.raw.capacity:
+            ts, rows = series.raw.since(start)
+            return 0, ts, rows
+        for tier in series.tiers:
+            if tier.ring.oldest() <= start or tier.ring.size < tier.ring.capacity or tier is series.tiers[-1]:
+                ts, rows = tier.since(start - tier.resolution)
+                return tier.resolution, ts, rows
+
+    def series(self, strategy_id, field, window, stat='mean', now=None):
+        """(timestamps, values) of one field over the last `window` seconds, at the finest available resolution."""
+        resolution, ts, rows = self._window(strategy_id, window, now)
+        if resolution is None or len(ts) == 0:
+            return ts, np.empty(0, dtype=np.float32)
+        column = FIELDS.index(field)
+        if resolution:
+            column = column * len(STATS) + STATS.index(stat)
+        return ts, rows[:, column]
+
+    def aggregate(self, strategy_id, field, window, how='mean', now=None):
+        """mean, min, max, last or change (last - first) of a field over the window; NaN when empty."""
+        stat = {'min': 'min', 'max': 'max', 'mean': 'mean'}.get(how, 'last')
+        _, values = self.series(strategy_id, field, window, stat, now)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return math.nan
+        if how == 'change':
+            return float(values[-1] - values[0])
+        if how == 'last':
+            return float(values[-1])
+        return float(getattr(np, how)(values))
+
+    def pnl(self, strategy_id, window, now=None) -> float:
+        """Equity change over the window."""
+        return self.aggregate(strategy_id, 'equity', window, 'change', now)
+
+    def slope(self, strategy_id, field, window, now=None) -> float:
+        """Least-squares slope of a field per second over the window; NaN with fewer than 2 points."""
+        ts, values = self.series(strategy_id, field, window, 'mean', now)
+        mask = ~np.isnan(values)
+        if mask.sum() < 2:
+            return math.nan
+        t = ts[mask] - ts[mask][0]
+        v = values[mask].astype(np.float64)
+        t_centered = t - t.mean()
+        denominator = float(np.dot(t_centered, t_centered))
+        if denominator == 0:
+            return math.nan
+        return float(np.dot(t_centered, v - v.mean()) / denominator)
+
+    def error_count(self, strategy_id, window, now=None) -> int:
+        resolution, ts, rows = self._window(strategy_id, window, now)
+        if resolution is None or len(ts) == 0:
+            return 0
+        return int(rows[:, -1].sum())
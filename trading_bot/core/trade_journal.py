@@ -0,0 +1,172 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+logger = logging.getLogger(__name__)
+
+TRADE_COLUMNS = ('fill_time', 'symbol', 'side', 'price', 'amount', 'pnl', 'mode', 'strategy')
+
+
+class TradeJournal:
+    """
+    Write-behind journal for trades.
+
+    `record` only appends to an in-process queue, so the order path never waits on
+    Postgres. A background task flushes the queue with COPY in batches of up to
+    `batch_size` rows or every `flush_interval` seconds, whichever comes first. Batches
+    that cannot be written are appended to a local spill file (JSON lines, fsynced) and
+    replayed into Postgres once it is reachable again. `close` drains everything.
+    """
+    def __init__(self, database, batch_size=500, flush_interval=0.5, spill_path=None,
+                 max_queue=100000, retry_interval=5.0):
+        self.database = database
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path or os.getenv('TRADE_SPILL_PATH', 'trade_journal.spill.jsonl')
+        self.retry_interval = retry_interval
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._task = None
+        self._closing = False
+        self._last_retry = 0.0
+        self.partition_check_interval = 6 * 3600
+        self._last_partition_check = 0.0
+
+    def record(self, symbol, side, price, amount, mode, strategy, fill_time=None, pnl=None):
+        """Enqueues a fill without blocking. Falls back to the spill file if the queue is full."""
+        row = (fill_time or datetime.now(timezone.utc), symbol, side, price, amount, pnl, mode, strategy)
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            logger.warning("Trade journal queue full, spilling trade to disk.")
+            self._spill([row])
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def start(self):
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Flushes every queued trade (to Postgres or the spill file) and stops the writer."""
+        self._closing = True
+        if self._task:
+            await self._task
+            self._task = None
+        # Trades recorded after the writer stopped
+        while not self._queue.empty():
+            await self._flush(self._drain(self.batch_size))
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _run(self):
+        await self._replay_spill()
+        await self._ensure_partitions()
+        while True:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+                batch.extend(self._drain(self.batch_size - len(batch)))
+            if batch:
+                await self._flush(batch)
+            if self._has_spill() and time.monotonic() - self._last_retry > self.retry_interval:
+                await self._replay_spill()
+            if time.monotonic() - self._last_partition_check > self.partition_check_interval:
+                await self._ensure_partitions()
+            if self._closing and self._queue.empty():
+                return
+
+    async def _ensure_partitions(self):
+        # Keeps monthly trades partitions ahead of the clock in long-running processes
+        self._last_partition_check = time.monotonic()
+        try:
+            await self.database.ensure_trade_partitions()
+        except Exception as e:
+            logger.warning(f"Could not ensure trades partitions: {e}")
+
+    async def _flush(self, batch):
+        try:
+            await self.database.copy_trades([self._to_record(row) for row in batch])
+            logger.debug(f"Flushed {len(batch)} trades to the database.")
+        except Exception as e:
+            logger.error(f"Trade flush failed ({e}); spilling {len(batch)} trades to {self.spill_path}.")
+            self._spill(batch)
+
+    @staticmethod
+    def _to_record(row):
+        fill_time, symbol, side, price, amount, pnl, mode, strategy = row
+        return (fill_time, symbol, side, Decimal(str(price)), Decimal(str(amount)),
+                Decimal(str(pnl)) if pnl is not None else None, mode, strategy)
+
+    # --- Spill file ---
+
+    def _spill(self, rows):
+        with open(self.spill_path, 'a') as f:
+            for fill_time, symbol, side, price, amount, pnl, mode, strategy in rows:
+                f.write(json.dumps({
+                    'fill_time': fill_time.isoformat(), 'symbol': symbol, 'side': side, 'price': price,
+                    'amount': amount, 'pnl': pnl, 'mode': mode, 'strategy': strategy
+                }) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    @property
+    def _replay_path(self):
+        return f"{self.spill_path}.replay"
+
+    def _has_spill(self) -> bool:
+        return os.path.exists(self._replay_path) or os.path.exists(self.spill_path)
+
+    async def _replay_spill(self):
+        """
+        Loads spilled trades into the database. The spill file is first moved aside, so
+        trades spilled while the replay is running go to a new spill file and are not
+        removed with the replayed one. A replay that fails is retried from the moved file.
+        """
+        self._last_retry = time.monotonic()
+        replay_path = self._replay_path
+        if not os.path.exists(replay_path):
+            if not os.path.exists(self.spill_path):
+                return
+            os.replace(self.spill_path, replay_path)
+        rows = []
+        with open(replay_path, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    t = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-write
+                    logger.warning(f"Skipping corrupt spill line: {line[:80]!r}")
+                    continue
+                rows.append((datetime.fromisoformat(t['fill_time']), t['symbol'], t['side'],
+                             t['price'], t['amount'], t.get('pnl'), t['mode'], t['strategy']))
+        try:
+            # A single COPY, so a failed replay leaves nothing half-written
+            await self.database.copy_trades([self._to_record(row) for row in rows])
+        except Exception as e:
+            logger.warning(f"Database still unavailable, keeping {len(rows)} spilled trades: {e}")
+            return
+        os.remove(replay_path)
+        logger.info(f"Replayed {len(rows)} spilled trades into the database.")
@@ -0,0 +1,317 @@
+import ast
+import builtins
+import importlib.util
+import logging
+import multiprocessing
+from multiprocessing.connection import wait
+import os
+import random
+import time
+import types
+import numpy as np
+from trading_bot.core.loader import compile_file, load_config_file
+from trading_bot.strategies.indicators import SIGNALS as BATCH_SIGNALS, position_signal
+
+logger = logging.getLogger(__name__)
+
+SIGNALS = (None, 'BUY', 'SELL', 'SELL_SHORT', 'COVER_SHORT')
+
+# Top-level modules a generated strategy may import
+ALLOWED_IMPORTS = (
+    'abc', 'bisect', 'collections', 'dataclasses', 'enum', 'functools', 'heapq', 'itertools', 'math',
+    'numpy', 'pandas', 'statistics', 'typing', 'trading_bot.strategies',
+)
+# Builtins a strategy has no business calling; they are also removed from the sandbox
+FORBIDDEN_NAMES = ('open', 'exec', 'eval', 'compile', 'input', 'breakpoint', 'exit', 'quit', '__import__',
+                   'globals', 'locals', 'vars', 'setattr', 'delattr')
+# Introspection attributes that lead out of the sandbox
+FORBIDDEN_ATTRIBUTES = ('__class__', '__bases__', '__mro__', '__subclasses__', '__globals__', '__builtins__',
+                        '__code__', '__dict__', '__getattribute__', '__loader__', '__spec__')
+
+SMOKE_CANDLES = 300
+_smoke_candles = None
+
+
+def _import_allowed(name) -> bool:
+    return any(name == allowed or name.startswith(allowed + '.') for allowed in ALLOWED_IMPORTS)
+
+
+def check_source(source: str, class_name: str) -> list:
+    """
+    Static checks against the strategy contract Bot relies on. Returns a list of errors:
+    the class exists, `__init__` takes the indicators argument, `process_candle(candle,
+    position)` is defined, imports are allowed and resolvable, forbidden builtins are unused.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError as e:
+        return [f"SyntaxError: {e.msg} (line {e.lineno})"]
+
+    errors = []
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            if isinstance(node, ast.ImportFrom) and node.level:
+                errors.append(f"line {node.lineno}: relative imports are not supported in strategy files")
+                continue
+            names = [alias.name for alias in node.names] if isinstance(node, ast.Import) else [node.module]
+            for name in names:
+                if not _import_allowed(name):
+                    errors.append(f"line {node.lineno}: import of '{name}' is not allowed")
+                elif importlib.util.find_spec(name.split('.')[0]) is None or (
+                        '.' in name and _find_spec(name) is None):
+                    errors.append(f"line {node.lineno}: module '{name}' does not exist")
+        elif isinstance(node, ast.Name) and node.id in FORBIDDEN_NAMES:
+            errors.append(f"line {node.lineno}: use of '{node.id}' is not allowed")
+        elif isinstance(node, ast.Attribute) and node.attr in FORBIDDEN_ATTRIBUTES:
+            errors.append(f"line {node.lineno}: access to '{node.attr}' is not allowed")
+
+    classes = {node.name: node for node in tree.body if isinstance(node, ast.ClassDef)}
+    cls = classes.get(class_name)
+    if cls is None:
+        errors.append(f"class '{class_name}' not found (Bot expects the file name, capitalized)")
+        return errors
+    methods = {node.name: node for node in cls.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))}
+    process = methods.get('process_candle')
+    if process is None:
+        errors.append(f"{class_name} does not define process_candle(self, candle, position)")
+    else:
+        if isinstance(process, ast.AsyncFunctionDef):
+            errors.append("process_candle must be a plain (non-async) method")
+        if _positional_count(process.args) != 3 and not process.args.vararg:
+            errors.append("process_candle must take (self, candle, position)")
+    init = methods.get('__init__')
+    if init is not None and not init.args.vararg:
+        positional = _positional_count(init.args)
+        if positional < 2 or positional - len(init.args.defaults) > 2:
+            errors.append("__init__ must accept the indicators config as its only required argument")
+    return errors
+
+
+def _find_spec(name):
+    try:
+        return importlib.util.find_spec(name)
+    except ModuleNotFoundError:
+        return None
+
+
+def _positional_count(args) -> int:
+    return len(args.posonlyargs) + len(args.args)
+
+
+def _guarded_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or not _import_allowed(name):
+        raise ImportError(f"import of '{name}' is not allowed in strategies")
+    return builtins.__import__(name, globals, locals, fromlist, level)
+
+
+def sandbox_import(filepath, class_name):
+    """
+    Executes a strategy module with a restricted set of builtins and a guarded __import__,
+    and returns its class. This catches mistakes and stray side effects early; it is not a
+    security boundary (run untrusted code in a separate process, see validate_strategies).
+    """
+    path, digest, code = compile_file(filepath)
+    safe_builtins = {name: value for name, value in vars(builtins).items() if name not in FORBIDDEN_NAMES}
+    safe_builtins['__import__'] = _guarded_import
+    module = types.ModuleType(f"sandboxed_strategy_{digest}")
+    module.__file__ = path
+    module.__dict__['__builtins__'] = safe_builtins
+    exec(code, module.__dict__)
+    cls = getattr(module, class_name, None)
+    if not isinstance(cls, type):
+        raise TypeError(f"'{class_name}' is not a class")
+    return cls
+
+
+def smoke_candles() -> list:
+    """A small, deterministic random-walk dataset in the CSV candle layout (built once per process)."""
+    global _smoke_candles
+    if _smoke_candles is None:
+        rng = random.Random(7)
+        price = 30000.0
+        candles = []
+        for i in range(SMOKE_CANDLES):
+            open_ = price
+            # Alternating drift regimes so trend and mean-reversion logic both fire
+            price *= 1 + rng.gauss(0.002 if (i // 50) % 2 == 0 else -0.002, 0.004)
+            candles.append({
+                'timestamp': 1_700_000_000 + 60 * i, 'open': open_, 'high': max(open_, price) * 1.001,
+                'low': min(open_, price) * 0.999, 'close': price, 'volume': 1.0, 'vwap': (open_ + price) / 2,
+            })
+        _smoke_candles = candles
+    return _smoke_candles
+
+
+def smoke_backtest(strategy) -> dict:
+    """
+    Feeds the smoke dataset through a fresh strategy instance, tracking the position the
+    way ExecutionEngine does, and checks every returned signal. Returns signal counts.
+    """
+    position = None
+    counts = {}
+    for candle in smoke_candles():
+        signal = strategy.process_candle(dict(candle), position)
+        if signal not in SIGNALS:
+            raise ValueError(f"process_candle returned {signal!r}; expected one of {SIGNALS}")
+        if signal is None:
+            continue
+        counts[signal] = counts.get(signal, 0) + 1
+        if signal == 'BUY' and position is None:
+            position = 'long'
+        elif signal == 'SELL_SHORT' and position is None:
+            position = 'short'
+        elif (signal == 'SELL' and position == 'long') or (signal == 'COVER_SHORT' and position == 'short'):
+            position = None
+    return counts
+
+
+def check_dual_mode(cls, indicators):
+    """
+    Checks that generate_signals (batch) and process_candle (incremental) agree on every
+    candle of the smoke dataset. Returns an error message, or None when they match.
+    """
+    candles = smoke_candles()
+    live = cls(indicators)
+    signals = cls(indicators).generate_signals(np.array([candle['close'] for candle in candles]))
+    missing = [name for name in BATCH_SIGNALS if name not in signals]
+    if missing:
+        return f"generate_signals must return boolean arrays for {BATCH_SIGNALS}; missing {missing}"
+    batch = [signals[name] for name in BATCH_SIGNALS]
+    if any(len(flags) != len(candles) for flags in batch):
+        return "generate_signals must return one flag per candle"
+    position = None
+    for i, candle in enumerate(candles):
+        expected = live.process_candle(dict(candle), position)
+        actual = position_signal(position, *(bool(flags[i]) for flags in batch))
+        if expected != actual:
+            return (f"generate_signals and process_candle disagree at candle {i}: "
+                    f"{actual!r} (batch) vs {expected!r} (incremental)")
+        if expected in ('BUY', 'SELL_SHORT'):
+            position = 'long' if expected == 'BUY' else 'short'
+        elif expected in ('SELL', 'COVER_SHORT'):
+            position = None
+    return None
+
+
+def validate_strategy(strategy_filepath, config_filepath=None) -> dict:
+    """
+    Validates a generated strategy in-process: static contract checks, a sandboxed import,
+    then a smoke backtest on a tiny dataset. Stops at the first failing stage.
+    Returns {'ok', 'stage', 'errors', 'warnings', 'signals', 'elapsed_ms'}.
+    """
+    started = time.perf_counter()
+    report = {'strategy': strategy_filepath, 'ok': False, 'stage': 'read', 'errors': [], 'warnings': [],
+              'signals': {}}
+
+    def done():
+        report['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        return report
+
+    class_name = os.path.basename(strategy_filepath).replace(".py", "").capitalize()
+    try:
+        with open(strategy_filepath, 'r') as f:
+            source = f.read()
+    except OSError as e:
+        report['errors'].append(str(e))
+        return done()
+
+    report['stage'] = 'static'
+    report['errors'] = check_source(source, class_name)
+    if report['errors']:
+        return done()
+
+    report['stage'] = 'import'
+    try:
+        cls = sandbox_import(strategy_filepath, class_name)
+    except Exception as e:
+        report['errors'].append(f"{type(e).__name__}: {e}")
+        return done()
+
+    report['stage'] = 'smoke'
+    has_config = bool(config_filepath) and os.path.exists(config_filepath)
+    indicators = {}
+    if has_config:
+        try:
+            indicators = load_config_file(config_filepath).get('indicators', {})
+        except Exception as e:
+            report['errors'].append(f"config {config_filepath}: {type(e).__name__}: {e}")
+            return done()
+    try:
+        strategy = cls(indicators)
+    except Exception as e:
+        message = f"{type(e).__name__}: {e}"
+        if has_config:
+            report['errors'].append(f"constructor: {message}")
+            return done()
+        # Without a config the constructor may legitimately need indicator values
+        report['warnings'].append(f"smoke backtest skipped without a config ({message})")
+        strategy = None
+    if strategy is not None:
+        try:
+            report['signals'] = smoke_backtest(strategy)
+            if hasattr(strategy, 'generate_signals'):
+                mismatch = check_dual_mode(cls, indicators)
+                if mismatch:
+                    report['errors'].append(mismatch)
+                    return done()
+        except Exception as e:
+            report['errors'].append(f"{type(e).__name__}: {e}")
+            return done()
+    if not report['signals'] and not report['warnings']:
+        report['warnings'].append(f"no signals on the {SMOKE_CANDLES}-candle smoke dataset")
+
+    report['ok'] = True
+    report['stage'] = 'done'
+    return done()
+
+
+def _validate_in_child(conn, strategy_filepath, config_filepath):
+    try:
+        conn.send(validate_strategy(strategy_filepath, config_filepath))
+    except Exception as e:
+        conn.send({'strategy': strategy_filepath, 'ok': False, 'stage': 'crash', 'warnings': [], 'signals': {},
+                   'errors': [f"{type(e).__name__}: {e}"]})
+    finally:
+        conn.close()
+
+
+def validate_strategies(candidates, max_workers=None, timeout=5.0) -> list:
+    """
+    Validates many (strategy_filepath, config_filepath) candidates in parallel, each in its
+    own short-lived process so one that hangs (e.g. an infinite loop in process_candle) is
+    killed after `timeout` seconds without holding up the others. Reports are returned
+    in input order.
+    """
+    candidates = list(candidates)
+    max_workers = max_workers or os.cpu_count()
+    smoke_candles()  # built once, inherited by forked children
+    reports = [None] * len(candidates)
+    queue = list(enumerate(candidates))
+    running = {}  # connection -> (index, process, started)
+    while queue or running:
+        while queue and len(running) < max_workers:
+            index, (strategy, config) = queue.pop(0)
+            parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=_validate_in_child, args=(child_conn, strategy, config),
+                                              daemon=True)
+            process.start()
+            child_conn.close()
+            running[parent_conn] = (index, process, time.monotonic())
+        next_deadline = min(started for _, _, started in running.values()) + timeout
+        for conn in wait(list(running), timeout=max(0.0, next_deadline - time.monotonic())):
+            index, process, _ = running.pop(conn)
+            try:
+                reports[index] = conn.recv()
+            except EOFError:
+                reports[index] = {'strategy': candidates[index][0], 'ok': False, 'stage': 'crash', 'warnings': [],
+                                  'signals': {}, 'errors': [f"validator exited with code {process.exitcode}"]}
+            process.join()
+        now = time.monotonic()
+        for conn, (index, process, started) in list(running.items()):
+            if now - started >= timeout:
+                process.kill()
+                process.join()
+                del running[conn]
+                reports[index] = {'strategy': candidates[index][0], 'ok': False, 'stage': 'timeout', 'warnings': [],
+                                  'signals': {}, 'errors': [f"validation did not finish within {timeout}s"]}
+    return reports
@@ -1,11 +1,11 @@
-from .sma import SMAStrategy
-from .rsi import RSIStrategy
+from .sma import Sma
+from .rsi import Rsi
 from trading_bot.config import cfg
 
 # Registry mapping names to classes
 STRATEGY_MAP = {
-    'SMA': SMAStrategy,
-    'RSI': RSIStrategy
+    'SMA': Sma,
+    'RSI': Rsi
 }
 
 def get_strategy(strategy_name):
@@ -0,0 +1,331 @@
+"""
+Indicators in two synchronized forms: O(1) incremental updaters for live candles
+(process_candle) and batch functions over NumPy arrays for the fast backtest path
+(generate_signals). Both perform the same floating-point operations in the same order,
+so they produce identical values and therefore identical signals.
+"""
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+
+SIGNALS = ('BUY', 'SELL', 'SELL_SHORT', 'COVER_SHORT')
+
+
+# --- Incremental ---
+
+class SMA:
+    """Simple moving average from a running cumulative sum (same arithmetic as sma())."""
+    def __init__(self, period):
+        self.period = period
+        self.total = 0.0
+        self._totals = deque([0.0], maxlen=period + 1)
+
+    def update(self, value):
+        self.total += value
+        self._totals.append(self.total)
+        if len(self._totals) <= self.period:
+            return None
+        return (self.total - self._totals[0]) / self.period
+
+
+class EMA:
+    """Exponential moving average seeded with the SMA of the first `period` values."""
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self.value = None
+        self._seed = []
+
+    def update(self, value):
+        if self.value is None:
+            self._seed.append(value)
+            if len(self._seed) < self.period:
+                return None
+            self.value = sum(self._seed) / self.period
+            self._seed = None
+            return self.value
+        self.value += self.alpha * (value - self.value)
+        return self.value
+
+
+class RSI:
+    """Wilder's RSI: simple averages over the first `period` changes, then Wilder smoothing."""
+    def __init__(self, period):
+        self.period = period
+        self.avg_gain = None
+        self.avg_loss = None
+        self._previous = None
+        self._gains = []
+        self._losses = []
+
+    def update(self, value):
+        previous, self._previous = self._previous, value
+        if previous is None:
+            return None
+        change = value - previous
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+        if self.avg_gain is None:
+            self._gains.append(gain)
+            self._losses.append(loss)
+            if len(self._gains) < self.period:
+                return None
+            self.avg_gain = sum(self._gains) / self.period
+            self.avg_loss = sum(self._losses) / self.period
+        else:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+        return _rsi_value(self.avg_gain, self.avg_loss)
+
+
+class CutlerRSI:
+    """RSI from simple averages of the gains and losses over the last `period` changes."""
+    def __init__(self, period):
+        self.period = period
+        self._previous = None
+        self._changes = deque(maxlen=period)
+
+    def update(self, value):
+        previous, self._previous = self._previous, value
+        if previous is None:
+            return None
+        self._changes.append(value - previous)
+        if len(self._changes) < self.period:
+            return None
+        return _cutler_value(self._changes, self.period)
+
+
+def _cutler_value(changes, period):
+    avg_gain = sum(c for c in changes if c > 0) / period
+    avg_loss = sum(-c for c in changes if c < 0) / period
+    return _rsi_value(avg_gain, avg_loss)
+
+
+def _rsi_value(avg_gain, avg_loss):
+    if avg_loss == 0:
+        return 100.0
+    return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+
+# --- Batch (NaN until the indicator is warmed up) ---
+
+def cumulative_totals(values):
+    """[0, v0, v0 + v1, ...]: the running sums every SMA window is a difference of."""
+    return np.concatenate(([0.0], np.cumsum(np.asarray(values, dtype=float))))
+
+
+def sma_many(values, periods, totals=None) -> dict:
+    """{period: sma(values, period)} for several windows from one cumulative-sum pass."""
+    if totals is None:
+        totals = cumulative_totals(values)
+    n = len(totals) - 1
+    out = {}
+    for period in periods:
+        series = np.full(n, np.nan)
+        if n >= period:
+            series[period - 1:] = (totals[period:] - totals[:-period]) / period
+        out[period] = series
+    return out
+
+
+def sma(values, period):
+    return sma_many(values, [period])[period]
+
+
+def ema(values, period):
+    values = np.asarray(values, dtype=float).tolist()
+    out = np.full(len(values), np.nan)
+    if len(values) >= period:
+        # The recursion is inherently sequential; a scalar loop keeps the arithmetic identical to EMA
+        alpha = 2.0 / (period + 1)
+        value = sum(values[:period]) / period
+        out[period - 1] = value
+        for i in range(period, len(values)):
+            value += alpha * (values[i] - value)
+            out[i] = value
+    return out
+
+
+def rsi(values, period):
+    values = np.asarray(values, dtype=float).tolist()
+    out = np.full(len(values), np.nan)
+    if len(values) > period:
+        changes = [values[i] - values[i - 1] for i in range(1, len(values))]
+        gains = [c if c > 0 else 0.0 for c in changes]
+        losses = [-c if c < 0 else 0.0 for c in changes]
+        avg_gain = sum(gains[:period]) / period
+        avg_loss = sum(losses[:period]) / period
+        out[period] = _rsi_value(avg_gain, avg_loss)
+        for i in range(period, len(changes)):
+            avg_gain = (avg_gain * (period - 1) + gains[i]) / period
+            avg_loss = (avg_loss * (period - 1) + losses[i]) / period
+            out[i + 1] = _rsi_value(avg_gain, avg_loss)
+    return out
+
+
+def cutler_rsi(values, period):
+    values = np.asarray(values, dtype=float).tolist()
+    out = np.full(len(values), np.nan)
+    changes = [values[i] - values[i - 1] for i in range(1, len(values))]
+    # Every value re-sums its window, exactly like CutlerRSI; an IndicatorCache makes that a one-off per period
+    for i in range(period, len(changes) + 1):
+        out[i] = _cutler_value(changes[i - period:i], period)
+    return out
+
+
+KINDS = {
+    'sma': (SMA, sma),
+    'ema': (EMA, ema),
+    'rsi': (RSI, rsi),
+    'cutler_rsi': (CutlerRSI, cutler_rsi),
+}
+
+
+# --- Shared batch cache ---
+
+_active_cache = None
+
+
+class IndicatorCache:
+    """
+    Batch indicator series for one dataset, each distinct (kind, period) computed once.
+
+    Parameter sweeps run many configurations over the same closes. While a cache is
+    active (`use_indicator_cache`), IndicatorSet.compute takes its series from it instead
+    of recomputing them. The batch indicators are computed left to right, so the series
+    of a prefix of the dataset is a prefix of the full series: one cached array serves
+    every row count a sweep tries. All missing SMA windows come from a single cumulative
+    sum. Once `max_bytes` of series are held, new ones are computed but not kept.
+    """
+    def __init__(self, closes, max_bytes=256 * 2**20):
+        self.closes = np.array(closes, dtype=float)
+        self.closes.setflags(write=False)
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._series = {}
+        self._totals = None
+
+    def __len__(self):
+        return len(self._series)
+
+    def covers(self, closes) -> bool:
+        """True if `closes` is this dataset or a prefix of it."""
+        n = len(closes)
+        return n <= len(self.closes) and np.array_equal(closes, self.closes[:n])
+
+    def _compute(self, kind, periods) -> dict:
+        if kind == 'sma':
+            if self._totals is None:
+                self._totals = cumulative_totals(self.closes)
+            return sma_many(self.closes, periods, self._totals)
+        return {period: KINDS[kind][1](self.closes, period) for period in periods}
+
+    def _store(self, key, series):
+        series.setflags(write=False)
+        if self.nbytes + series.nbytes <= self.max_bytes:
+            self._series[key] = series
+            self.nbytes += series.nbytes
+
+    def prefetch(self, indicators):
+        """Computes every (kind, period) not cached yet, grouped by kind."""
+        missing = {(kind.lower(), int(period)) for kind, period in indicators} - self._series.keys()
+        for kind in {kind for kind, _ in missing}:
+            periods = sorted(period for k, period in missing if k == kind)
+            for period, series in self._compute(kind, periods).items():
+                self._store((kind, period), series)
+            self.misses += len(periods)
+
+    def get(self, kind, period, length=None):
+        """The read-only series of an indicator over the first `length` closes."""
+        key = (kind, period)
+        series = self._series.get(key)
+        if series is None:
+            self.misses += 1
+            series = self._compute(kind, [period])[period]
+            self._store(key, series)
+        else:
+            self.hits += 1
+        return series if length is None else series[:length]
+
+
+@contextmanager
+def use_indicator_cache(cache):
+    """Makes IndicatorSet.compute read from `cache` (None disables caching) within the block."""
+    global _active_cache
+    previous, _active_cache = _active_cache, cache
+    try:
+        yield cache
+    finally:
+        _active_cache = previous
+
+
+# --- Indicator sets and signals ---
+
+class IndicatorSet:
+    """
+    A named set of close-price indicators declared once, e.g.
+    {'fast': ('sma', 10), 'slow': ('sma', 50), 'rsi': ('rsi', 14)}.
+
+    `update(close)` advances every indicator by one candle and returns {name: value,
+    'close': close}, or None until all of them are warmed up. `batch(closes, rules)`
+    evaluates the same rules over whole arrays.
+    """
+    def __init__(self, spec: dict):
+        self.spec = {name: (kind.lower(), int(period)) for name, (kind, period) in spec.items()}
+        for name, (kind, _) in self.spec.items():
+            if kind not in KINDS:
+                raise ValueError(f"Unknown indicator type '{kind}' for '{name}'. Available: {list(KINDS)}")
+        self._live = {name: KINDS[kind][0](period) for name, (kind, period) in self.spec.items()}
+
+    def update(self, close):
+        values = {'close': close}
+        ready = True
+        for name, indicator in self._live.items():
+            value = indicator.update(close)
+            ready = ready and value is not None
+            values[name] = value
+        return values if ready else None
+
+    def compute(self, closes) -> dict:
+        closes = np.asarray(closes, dtype=float)
+        cache = _active_cache
+        if cache is not None and cache.covers(closes):
+            values = {name: cache.get(kind, period, len(closes)) for name, (kind, period) in self.spec.items()}
+        else:
+            values = {name: KINDS[kind][1](closes, period) for name, (kind, period) in self.spec.items()}
+        values['close'] = closes
+        return values
+
+    def batch(self, closes, rules) -> dict:
+        """
+        Evaluates `rules(values)` once over arrays and returns {signal: bool array}; a
+        signal can only fire where every indicator is warmed up, as in `update`.
+        """
+        values = self.compute(closes)
+        n = len(values['close'])
+        ready = np.ones(n, dtype=bool)
+        for name in self.spec:
+            ready &= ~np.isnan(values[name])
+        conditions = rules(values)
+        return {signal: np.broadcast_to(np.asarray(conditions[signal], dtype=bool), (n,)) & ready
+                for signal in SIGNALS}
+
+
+def position_signal(position, buy, sell, sell_short, cover_short):
+    """Picks the signal for the current position from the four rule outcomes."""
+    if position == 'long':
+        return 'SELL' if sell else None
+    if position == 'short':
+        return 'COVER_SHORT' if cover_short else None
+    if buy:
+        return 'BUY'
+    if sell_short:
+        return 'SELL_SHORT'
+    return None
+
+
+def select_signal(conditions: dict, position):
+    return position_signal(position, conditions['BUY'], conditions['SELL'],
+                           conditions['SELL_SHORT'], conditions['COVER_SHORT'])
@@ -1,4 +1,5 @@
 from .base import BaseStrategy
+from .indicators import IndicatorSet, select_signal
 
 class Sma(BaseStrategy):
     """
@@ -10,35 +11,25 @@ class Sma(BaseStrategy):
         self.long_window = long_window
         self.stop_loss_pct = stop_loss_pct
         self.take_profit_pct = take_profit_pct
+        # One spec for the live and the batch path; sweeps share the series through an IndicatorCache
+        self.indicators = IndicatorSet({'short_ma': ('sma', short_window), 'long_ma': ('sma', long_window)})
+
+    def rules(self, ind):
+        return {
+            'BUY': ind['short_ma'] > ind['long_ma'],
+            'SELL': ind['short_ma'] < ind['long_ma'],
+            'SELL_SHORT': ind['short_ma'] < ind['long_ma'],
+            'COVER_SHORT': ind['short_ma'] > ind['long_ma'],
+        }
 
     def process_candle(self, candle, position):
-        self.prices.append(candle['close'])
-        
-        # Maintain history size
-        if len(self.prices) > self.long_window:
-            self.prices.pop(0)
+        ind = self.indicators.update(candle['close'])
 
         # Not enough data
-        if len(self.prices) < self.long_window:
+        if ind is None:
             return None
 
-        # Calculate SMAs
-        short_ma = sum(self.prices[-self.short_window:]) / self.short_window
-        long_ma = sum(self.prices[-self.long_window:]) / self.long_window
-        
-        # Logic for long positions
-        if position == 'long':
-            if short_ma < long_ma:
-                return 'SELL'
-        # Logic for short positions
-        elif position == 'short':
-            if short_ma > long_ma:
-                return 'COVER_SHORT'
-        # No position open
-        else:
-            if short_ma > long_ma:
-                return 'BUY'
-            elif short_ma < long_ma:
-                return 'SELL_SHORT'
-        
-        return None
+        return select_signal(self.rules(ind), position)
+
+    def generate_signals(self, closes):
+        return self.indicators.batch(closes, self.rules)